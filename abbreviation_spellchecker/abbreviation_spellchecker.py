@@ -1,35 +1,94 @@
 from models import LanguageNgramModel, MissingLetterModel
+from model_store import save_models
 import numpy as np
-from heapq import heappush, heappop
-import pickle
+from heapq import heappush, heappop, nsmallest
 import re
+import time
 
-def generate_options(prefix_proba, prefix, suffix, lang_model, missed_model, optimism=0.5, cache=None):
-    """Generate options for the next letter in a sequence."""
-    options = []
-    for letter in lang_model.vocabulary_ + ['']:
-        if letter:  # Assume a missing letter
-            next_letter = letter
-            new_suffix = suffix
-            new_prefix = prefix + next_letter
-            proba_missing_state = - np.log(missed_model.predict_proba(prefix, letter))
-        else:  # Assume no missing letter
-            next_letter = suffix[0]
-            new_suffix = suffix[1:]
-            new_prefix = prefix + next_letter
-            proba_missing_state = - np.log((1 - missed_model.predict_proba(prefix, next_letter)))
-        proba_next_letter = - np.log(lang_model.single_proba(prefix, next_letter))
-        if cache:
-            proba_suffix = cache[len(new_suffix)] * optimism
-        else:
-            proba_suffix = - np.log(lang_model.single_proba(new_prefix, new_suffix)) * optimism
-        proba = prefix_proba + proba_next_letter + proba_missing_state + proba_suffix
-        options.append((proba, new_prefix, new_suffix, letter, proba_suffix))
+
+class SearchStats:
+    """Latency of noisy_channel searches, and how often they were cut short by their deadline or beam.
+
+    Example usage:
+        stats = SearchStats()
+        noisy_channel('wtr', lang_model, missed_model, time_budget=0.05, beam_width=200, stats=stats)
+        stats.summary()
+    """
+    def __init__(self):
+        self.seconds = []
+        self.deadline_hits = 0
+        self.beam_prunes = 0
+
+    def record(self, seconds, deadline_hit=False, beam_prunes=0):
+        self.seconds.append(seconds)
+        self.deadline_hits += int(deadline_hit)
+        self.beam_prunes += beam_prunes
+
+    def summary(self):
+        searches = len(self.seconds)
+        return {
+            'searches': searches,
+            'deadline hits': self.deadline_hits,
+            'deadline hit rate (%)': round(100 * self.deadline_hits / searches, 2) if searches else 0.0,
+            'beam prunes': self.beam_prunes,
+            'p50 ms': round(1000 * float(np.percentile(self.seconds, 50)), 2) if searches else None,
+            'p99 ms': round(1000 * float(np.percentile(self.seconds, 99)), 2) if searches else None,
+        }
+
+def generate_options(prefix_proba, prefix, suffix, lang_model, missed_model, optimism=0.5, cache=None, max_logprob=None):
+    """Generate options for the next letter in a sequence.
+
+    The costs of all the letters are computed at once as arrays. With max_logprob, the options
+    costing max_logprob or more are dropped before any option is built.
+    """
+    letters = lang_model.vocabulary_
+    next_letter_costs = -lang_model.log_proba_vector(prefix)
+
+    # Assume a missing letter: each letter of the vocabulary is inserted before the suffix
+    missing_costs = -np.log(missed_model.predict_proba_vector(prefix, letters))
+    if cache:
+        suffix_costs = np.full(len(letters), cache[len(suffix)] * optimism)
+    else:
+        suffix_costs = np.array([-lang_model.single_log_proba(prefix + letter, suffix) for letter in letters]) * optimism
+    costs = prefix_proba + next_letter_costs + missing_costs + suffix_costs
+
+    # Assume no missing letter: the next letter of the suffix is kept
+    next_letter = suffix[0]
+    new_suffix = suffix[1:]
+    if cache:
+        kept_suffix_cost = cache[len(new_suffix)] * optimism
+    else:
+        kept_suffix_cost = -lang_model.single_log_proba(prefix + next_letter, new_suffix) * optimism
+    kept_cost = (prefix_proba + next_letter_costs[lang_model.token_ids_[next_letter]]
+                 - np.log(1 - missed_model.predict_proba(prefix, next_letter)) + kept_suffix_cost)
+
+    if max_logprob is None:
+        kept = range(len(letters))
+    else:
+        kept = np.flatnonzero(costs < max_logprob)
+    options = [(costs[i], prefix + letters[i], suffix, letters[i], suffix_costs[i]) for i in kept]
+    if max_logprob is None or kept_cost < max_logprob:
+        options.append((kept_cost, prefix + next_letter, new_suffix, '', kept_suffix_cost))
     return options
 
 
-def noisy_channel(word, lang_model, missed_model, freedom=1.0, max_attempts=1000, optimism=0.1, verbose=True):
-    """Noisy channel model for spelling correction."""
+def noisy_channel(word, lang_model, missed_model, freedom=1.0, max_attempts=1000, optimism=0.1, verbose=True,
+                  time_budget=None, beam_width=None, stats=None):
+    """Noisy channel model for spelling correction.
+
+    An anytime search: with time_budget (seconds), it stops at the deadline and returns the best
+    correction found so far, the word itself at worst. With beam_width, only the beam_width most
+    promising options are kept whenever the heap grows past twice that size. The latency and
+    whether the deadline was hit are recorded in stats, a SearchStats.
+
+    The deadline is checked during the setup and before each expansion of the search, so a search
+    overruns it by at most one expansion (under 2 ms on the benchmark tokens), plus any time its
+    process is not scheduled, e.g. when more processes than CPUs search at once.
+    """
+    start_time = time.perf_counter()
+    deadline = start_time + time_budget if time_budget else None
+    deadline_hit = False
+    beam_prunes = 0
     query = word + ' '
     prefix = ' '
     prefix_proba = 0.0
@@ -44,15 +103,27 @@ def noisy_channel(word, lang_model, missed_model, freedom=1.0, max_attempts=1000
     if verbose:
         print('Baseline score is', best_logprob)
 
-    cache = {}
-    for i in range(len(query) + 1):
-        future_suffix = query[:i]
-        cache[len(future_suffix)] = -lang_model.single_log_proba('', future_suffix)  # Rough approximation
-        cache[len(future_suffix)] += -missed_model.single_log_proba('', future_suffix)  # Add missingness
+    # cost of the first i letters of the query, for every i: a rough approximation of the cost of any
+    # suffix of that length, the same sums as single_log_proba('', query[:i]) of both models
+    # accumulated in one pass over the query
+    cache = {0: -0.0}
+    lang_logprob = 0.0
+    missed_logprob = 0.0
+    for i, letter in enumerate(query):
+        if deadline is not None and time.perf_counter() >= deadline:
+            deadline_hit = True
+            break
+        lang_logprob += lang_model.log_proba_vector(query[:i])[lang_model.token_ids_[letter]]
+        missed_logprob += np.log(missed_model.predict_proba(query[:i], letter))  # Add missingness
+        cache[i + 1] = -lang_logprob + -missed_logprob
 
-    for i in range(max_attempts):
+    # without a complete cache the search would fail, the deadline hit in the setup ends it at once
+    for i in range(0 if deadline_hit else max_attempts):
         if not heap:
             break
+        if deadline is not None and time.perf_counter() >= deadline:
+            deadline_hit = True
+            break
         next_best = heappop(heap)
         if verbose:
             print(next_best)
@@ -65,10 +136,13 @@ def noisy_channel(word, lang_model, missed_model, freedom=1.0, max_attempts=1000
             prefix_proba = next_best[0] - next_best[4]
             prefix = next_best[1]
             suffix = next_best[2]
-            new_options = generate_options(prefix_proba, prefix, suffix, lang_model, missed_model, optimism, cache)
+            new_options = generate_options(prefix_proba, prefix, suffix, lang_model, missed_model, optimism, cache, best_logprob + freedom)
             for new_option in new_options:
-                if new_option[0] < best_logprob + freedom:
-                    heappush(heap, new_option)
+                heappush(heap, new_option)
+            if beam_width and len(heap) > 2 * beam_width:
+                # a sorted list is a valid heap
+                heap = nsmallest(beam_width, heap)
+                beam_prunes += 1
 
     if verbose:
         print('Heap size is', len(heap), 'after', i, 'iterations')
@@ -82,6 +156,9 @@ def noisy_channel(word, lang_model, missed_model, freedom=1.0, max_attempts=1000
 
     most_probable = min(candidates, key = lambda x: x[0])
 
+    if stats is not None:
+        stats.record(time.perf_counter() - start_time, deadline_hit, beam_prunes)
+
     return most_probable[1][1:-1]
 
 
@@ -104,11 +181,11 @@ def train_and_save_models(corpus_path, save_path):
     big_missing_model = MissingLetterModel(0, 0.1)
     big_missing_model.fit(missing_set)
 
-    with open(save_path, 'wb') as model_file:
-        pickle.dump((big_lang_model, big_missing_model, all_letters), model_file)
+    # a directory of memory-mapped arrays, see model_store.py
+    save_models(save_path, big_lang_model, big_missing_model, all_letters)
 
 if __name__ == "__main__":
     # train model
     corpus_path = "corpus\Corpus.txt"
-    save_path = "abbreviation_spellchecker.pkl"
+    save_path = "abbreviation_spellchecker.model"
     train_and_save_models(corpus_path, save_path)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import argparse
+import time
+
+from models import LanguageNgramModel, MissingLetterModel
+from model_store import load_any
+from abbreviation_spellchecker import SearchStats, noisy_channel
+
+# abbreviated tokens as they appear in the field names of data dictionaries (split on "_")
+FIELD_NAME_TOKENS = [
+    'cust', 'acct', 'amt', 'qty', 'desc', 'dt', 'nbr', 'num', 'addr', 'cd', 'flg', 'ind', 'pct',
+    'prd', 'prdn', 'wtr', 'gas', 'oil', 'prs', 'temp', 'dpth', 'lctn', 'equip', 'inspn', 'rpt',
+    'insp', 'flng', 'mtrl', 'thk', 'dia', 'rtng', 'cls', 'std', 'stat', 'sts', 'typ', 'ref', 'src',
+    'tgt', 'vol', 'wt', 'hrs', 'mnth', 'yr', 'bal', 'curr', 'rev', 'cost', 'svc', 'mgr', 'emp',
+    'dept', 'org', 'reg', 'zn', 'blk', 'fld', 'wel', 'pltfrm', 'pipln', 'vlv', 'pmp', 'comp', 'mtr',
+    'lvl', 'flw', 'rt', 'cap', 'prj', 'enty', 'key', 'nm', 'id', 'crt', 'upd', 'usr', 'ts', 'seq',
+]
+
+
+def load_tokens(tokens_path):
+    """One token per line, lower case letters only (the vocabulary of the model)."""
+    with open(tokens_path, encoding='utf-8') as f:
+        return [line.strip().lower() for line in f if line.strip()]
+
+
+def run_corrections(tokens, lang_model, missed_model, **bounds):
+    """Corrects every token like load_and_apply_models; returns (corrections, seconds)."""
+    start_time = time.perf_counter()
+    corrections = [noisy_channel(token, lang_model, missed_model, max_attempts=1000, optimism=0.9, freedom=3.0, verbose=False, **bounds) for token in tokens]
+    return corrections, time.perf_counter() - start_time
+
+
+def benchmark(model_path, tokens, cache_entries, time_budget=None, beam_width=None):
+    """Corrections per second of the same tokens with the context caches disabled, then enabled,
+    then with bounded searches when time_budget or beam_width is given."""
+    big_lang_model, big_missing_model, all_letters = load_any(model_path)
+
+    big_lang_model.set_cache(0)
+    big_missing_model.set_cache(0)
+    uncached, uncached_seconds = run_corrections(tokens, big_lang_model, big_missing_model)
+    print(f'Without cache: {len(tokens) / uncached_seconds:.1f} corrections per second')
+
+    big_lang_model.set_cache(cache_entries)
+    big_missing_model.set_cache(cache_entries)
+    cached, cached_seconds = run_corrections(tokens, big_lang_model, big_missing_model)
+    print(f'With cache ({cache_entries} entries): {len(tokens) / cached_seconds:.1f} corrections per second')
+    print('Language model cache:', big_lang_model.cache_stats())
+    print('Missing letter model cache:', big_missing_model.cache_stats())
+
+    assert cached == uncached, 'the cache changed the corrections'
+
+    if time_budget or beam_width:
+        stats = SearchStats()
+        bounded, bounded_seconds = run_corrections(tokens, big_lang_model, big_missing_model, time_budget=time_budget, beam_width=beam_width, stats=stats)
+        print(f'Bounded search (time budget {time_budget}s, beam width {beam_width}): {len(tokens) / bounded_seconds:.1f} corrections per second')
+        print('Search:', stats.summary())
+        print(f'{sum(a != b for a, b in zip(bounded, cached))} of {len(tokens)} corrections differ from the unbounded search')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure spelling corrections per second with and without the context caches.')
+    parser.add_argument('--model', default='abbreviation_spellchecker.pkl', help='model directory (see model_store.py) or pickled models')
+    parser.add_argument('--tokens', help='file of tokens to correct, one per line (default: built-in field name tokens)')
+    parser.add_argument('--cache-entries', type=int, default=4096, help='contexts kept by each model')
+    parser.add_argument('--time-budget', type=float, help='also measure searches stopped after this many seconds per word')
+    parser.add_argument('--beam-width', type=int, help='also measure searches keeping at most this many options')
+    args = parser.parse_args()
+
+    tokens = load_tokens(args.tokens) if args.tokens else FIELD_NAME_TOKENS
+    benchmark(args.model, tokens, args.cache_entries, args.time_budget, args.beam_width)
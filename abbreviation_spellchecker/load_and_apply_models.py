@@ -1,10 +1,10 @@
-import pickle
 from models import LanguageNgramModel, MissingLetterModel
+from model_store import load_any
 from abbreviation_spellchecker import noisy_channel, train_and_save_models
 
 def load_and_apply_models(input_string, model_path):
-    with open(model_path, 'rb') as model_file:
-        big_lang_model, big_missing_model, all_letters = pickle.load(model_file)
+    # a model directory (see model_store.py) or a pickle of an older train_and_save_models
+    big_lang_model, big_missing_model, all_letters = load_any(model_path)
 
     result = noisy_channel(input_string, big_lang_model, big_missing_model, max_attempts=1000, optimism=0.9, freedom=3.0, verbose=False)
     return result, big_lang_model, big_missing_model
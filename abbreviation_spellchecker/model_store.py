@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import pickle
+from collections import defaultdict, Counter
+
+import numpy as np
+
+from models import LanguageNgramModel, MissingLetterModel
+
+# a model directory holds the manifest plus, for every order of the language model, its contexts
+# as vocabulary codes (one row per context, one unsigned integer per letter, uint8 up to 256
+# letters) and its compiled count and log-probability arrays; np.load memory-maps them, so
+# processes opening the same directory share one copy through the page cache
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+
+
+def _file_name(order, part):
+    return f'lang_{order}_{part}.npy'
+
+
+def _lang_models(lang_model):
+    """The language model and its lower order children, highest order first."""
+    models = [lang_model]
+    while models[-1].recursive > 0 and models[-1].order > 0:
+        models.append(models[-1].child_)
+    return models
+
+
+def save_models(directory, lang_model, missed_model, all_letters):
+    """Write the models as a compact directory, see load_models. The language model is compiled first if needed."""
+    os.makedirs(directory, exist_ok=True)
+    if not hasattr(lang_model, 'counts_'):
+        lang_model.compile()
+
+    orders = []
+    for model in _lang_models(lang_model):
+        # contexts are read back through a fixed width string view, see _load_lang_model
+        invalid = [token for token in model.vocabulary_ if len(token) != 1 or token == '\0']
+        if invalid:
+            raise ValueError(f'Order {model.order} vocabulary has tokens that are not a single non-NUL character: {invalid[:5]}')
+        token_codes = {token: i for i, token in enumerate(model.vocabulary_)}
+        code_dtype = np.min_scalar_type(max(len(model.vocabulary_) - 1, 0))
+        contexts = np.array([[token_codes[token] for token in context] for context in model.context_ids_], dtype=code_dtype)
+        np.save(os.path.join(directory, _file_name(model.order, 'contexts')), contexts.reshape(len(model.context_ids_), model.order))
+        np.save(os.path.join(directory, _file_name(model.order, 'counts')), model.counts_)
+        np.save(os.path.join(directory, _file_name(model.order, 'log_proba')), model.log_proba_)
+        orders.append({'order': model.order, 'vocabulary': model.vocabulary_})
+
+    manifest = {
+        'version': FORMAT_VERSION,
+        'all_letters': all_letters,
+        'lang_model': {'smoothing': lang_model.smoothing, 'recursive': lang_model.recursive, 'orders': orders},
+        'missed_model': {
+            'order': missed_model.order,
+            'smoothing_missed': missed_model.smoothing_missed,
+            'smoothing_total': missed_model.smoothing_total,
+            'missed_counter': {context: dict(counter) for context, counter in missed_model.missed_counter_.items() if counter},
+            'total_counter': {context: dict(counter) for context, counter in missed_model.total_counter_.items() if counter},
+        },
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return directory
+
+
+def _load_lang_model(directory, smoothing, recursive, orders, mmap_mode):
+    child = None
+    # lowest order first, every model needs its child compiled
+    for entry in reversed(orders):
+        model = LanguageNgramModel(entry['order'], smoothing, recursive)
+        model.vocabulary_ = entry['vocabulary']
+        model.token_ids_ = {token: i for i, token in enumerate(model.vocabulary_)}
+
+        contexts = np.load(os.path.join(directory, _file_name(model.order, 'contexts')))
+        letters = np.array(model.vocabulary_, dtype='U1')
+        if model.order:
+            keys = np.ascontiguousarray(letters[contexts]).view(f'U{model.order}').ravel()
+            model.context_ids_ = {key: i for i, key in enumerate(keys.tolist())}
+        else:
+            model.context_ids_ = {'': i for i in range(len(contexts))}
+
+        # plain ndarray views of the mapped files: indexing a np.memmap is slower
+        model.counts_ = np.asarray(np.load(os.path.join(directory, _file_name(model.order, 'counts')), mmap_mode=mmap_mode))
+        model.log_proba_ = np.asarray(np.load(os.path.join(directory, _file_name(model.order, 'log_proba')), mmap_mode=mmap_mode))
+        if child is not None:
+            model.child_ = child
+            model.child_positions_ = np.array([child.token_ids_[token] for token in model.vocabulary_], dtype=int)
+        child = model
+    return child
+
+
+def load_models(directory, mmap_mode='r'):
+    """Open models written by save_models; returns (big_lang_model, big_missing_model, all_letters) like the pickle.
+
+    The language model comes back compiled, without the raw n-gram counts of fit.
+    """
+    with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest['version'] != FORMAT_VERSION:
+        raise ValueError(f'{directory} is a version {manifest["version"]} model, expected version {FORMAT_VERSION}')
+
+    lang = manifest['lang_model']
+    lang_model = _load_lang_model(directory, lang['smoothing'], lang['recursive'], lang['orders'], mmap_mode)
+
+    missed = manifest['missed_model']
+    missed_model = MissingLetterModel(missed['order'], missed['smoothing_missed'], missed['smoothing_total'])
+    missed_model.missed_counter_ = defaultdict(Counter, {context: Counter(counts) for context, counts in missed['missed_counter'].items()})
+    missed_model.total_counter_ = defaultdict(Counter, {context: Counter(counts) for context, counts in missed['total_counter'].items()})
+
+    return lang_model, missed_model, manifest['all_letters']
+
+
+def load_any(model_path):
+    """Models from a directory written by save_models, or from a pickle of train_and_save_models."""
+    if os.path.isdir(model_path):
+        return load_models(model_path)
+    with open(model_path, 'rb') as model_file:
+        big_lang_model, big_missing_model, all_letters = pickle.load(model_file)
+    # compiled now rather than during the first correction
+    if not hasattr(big_lang_model, 'counts_'):
+        big_lang_model.compile()
+    return big_lang_model, big_missing_model, all_letters
+
+
+def convert_pickle(pickle_path, directory):
+    """Convert a pickle of train_and_save_models to the model directory format."""
+    with open(pickle_path, 'rb') as model_file:
+        big_lang_model, big_missing_model, all_letters = pickle.load(model_file)
+    return save_models(directory, big_lang_model, big_missing_model, all_letters)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert a pickled spellchecker model to the memory-mappable model directory format.')
+    parser.add_argument('pickle_path', nargs='?', default='abbreviation_spellchecker.pkl')
+    parser.add_argument('directory', nargs='?', default='abbreviation_spellchecker.model')
+    args = parser.parse_args()
+
+    convert_pickle(args.pickle_path, args.directory)
+    print(f'Saved {args.directory}')
@@ -1,7 +1,122 @@
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, OrderedDict
 import numpy as np
 import pandas as pd
 
+# distributions of unseen contexts kept per model
+CONTEXT_CACHE_ENTRIES = 4096
+# characters of the corpus counted at a time by ngram_counts, bounds the memory of fit
+FIT_CHUNK_SIZE = 1 << 22
+
+
+def _encode(corpus):
+    """Code of every character of the corpus, as an index in its sorted alphabet."""
+    symbols = sorted(set(corpus))
+    points = np.frombuffer(corpus.encode('utf-32-le'), dtype=np.uint32)
+    table = np.zeros(int(points.max()) + 1 if len(points) else 1, dtype=np.uint8 if len(symbols) <= 256 else np.int64)
+    table[[ord(symbol) for symbol in symbols]] = np.arange(len(symbols))
+    return table[points], symbols
+
+
+def _decode(code, length, base, symbols):
+    letters = []
+    for _ in range(length):
+        code, digit = divmod(code, base)
+        letters.append(symbols[digit])
+    return ''.join(reversed(letters))
+
+
+def _merge(found, grams, counts, first):
+    """Add the n-grams of a chunk to the ones of the previous chunks."""
+    grams = np.concatenate([found[0], grams])
+    counts = np.concatenate([found[1], counts])
+    first = np.concatenate([found[2], first])
+    unique, inverse = np.unique(grams, return_inverse=True)
+    unique_counts = np.zeros(len(unique), dtype=np.int64)
+    np.add.at(unique_counts, inverse, counts)
+    unique_first = np.full(len(unique), np.iinfo(np.int64).max)
+    np.minimum.at(unique_first, inverse, first)
+    return unique, unique_counts, unique_first
+
+
+def ngram_counts(corpus, lowest, highest, chunk_size=FIT_CHUNK_SIZE):
+    """Count the n-grams of orders lowest..highest of a text in a single pass, like LanguageNgramModel.fit did order by order.
+
+    The corpus is encoded once; the (context, letter) n-grams of every order are integer codes
+    rolled from the codes of the previous order, counted with np.unique chunk by chunk.
+
+    Returns:
+        dict: order -> (counter_, unigrams_, vocabulary_) of a model of that order, with the same
+        counts, and keys in the same order, as counting character by character.
+    """
+    codes, symbols = _encode(corpus)
+    base = max(len(symbols), 1)
+    if base ** (highest + 1) >= 2 ** 63:
+        raise ValueError(f'{base} distinct characters are too many for {highest + 1}-grams coded as int64')
+
+    empty = np.zeros(0, dtype=np.int64)
+    found = {order: (empty, empty, empty) for order in range(lowest, highest + 1)}
+    for start in range(0, max(len(codes) - lowest, 0), chunk_size):
+        # the chunk's n-grams start in [start, start + chunk_size) and end up to highest letters later
+        window = codes[start:start + chunk_size + highest].astype(np.int64)
+        grams = window
+        for order in range(highest + 1):
+            if order:
+                grams = grams[:-1] * base + window[order:]
+            if order < lowest:
+                continue
+            chunk_grams = grams[:max(min(chunk_size, len(codes) - order - start), 0)]
+            unique, first, counts = np.unique(chunk_grams, return_index=True, return_counts=True)
+            found[order] = _merge(found[order], unique, counts, first + start)
+
+    result = {}
+    for order, (grams, counts, first) in found.items():
+        counter = defaultdict(Counter)
+        unigrams = Counter()
+        # in order of first occurrence, so dicts are filled in the order the letters loop did
+        for i in np.argsort(first, kind='stable'):
+            context_code, token_code = divmod(int(grams[i]), base)
+            token = symbols[token_code]
+            counter[_decode(context_code, order, base, symbols)][token] += int(counts[i])
+            unigrams[token] += int(counts[i])
+        result[order] = (counter, unigrams, sorted(unigrams))
+    return result
+
+
+class ContextCache:
+    """Bounded LRU cache of the distribution computed for a context, with hit statistics.
+
+    Keys are the last `order` characters of the context, the only ones a model looks at.
+    """
+    def __init__(self, max_entries=CONTEXT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit rate (%)': round(100 * self.hits / lookups, 2) if lookups else 0.0,
+        }
+
 
 class LanguageNgramModel:
     """Language model based on n-grams."""
@@ -12,33 +127,98 @@ class LanguageNgramModel:
         self.counter_ = defaultdict(Counter)
         self.unigrams_ = Counter()
         self.vocabulary_ = set()
+        self.cache_ = ContextCache()
+
+    def fit(self, corpus, chunk_size=FIT_CHUNK_SIZE):
+        """Estimate counts on a text, for this order and the lower orders of the children in one pass."""
+        lowest = 0 if self.recursive > 0 else self.order
+        self._fit_counts(ngram_counts(corpus, lowest, self.order, chunk_size))
 
-    def fit(self, corpus):
-        """Estimate counts on a text."""
-        for i, token in enumerate(corpus[self.order:]):
-            context = corpus[i:(i + self.order)]
-            self.counter_[context][token] += 1
-            self.unigrams_[token] += 1
-            self.vocabulary_.add(token)
-        self.vocabulary_ = sorted(list(self.vocabulary_))
+    def _fit_counts(self, counts):
+        self.counter_, self.unigrams_, self.vocabulary_ = counts[self.order]
         if self.recursive > 0 and self.order > 0:
             self.child_ = LanguageNgramModel(self.order - 1, self.smoothing, self.recursive)
-            self.child_.fit(corpus)
+            self.child_._fit_counts(counts)
+        self.compile()
 
-    def get_counts(self, context):
-        """Get smoothed count of each letter appearing after context."""
+    def compile(self):
+        """Precompute smoothed counts and log-probabilities of every context seen in fit.
+
+        Row context_ids_[context] of counts_ and log_proba_ holds the counts and log-probabilities
+        of each letter of vocabulary_ after that context, so a lookup is a single array index.
+        Contexts never seen are computed from the lower orders when asked for, and kept in cache_.
+        Models pickled before this step are compiled on first use.
+        """
+        has_child = self.recursive > 0 and self.order > 0
+        if has_child and not hasattr(self.child_, 'counts_'):
+            self.child_.compile()
+
+        self.token_ids_ = {token: i for i, token in enumerate(self.vocabulary_)}
+        # lookups of unseen contexts leave empty counters in the defaultdict
+        contexts = [context for context, freq_dict in self.counter_.items() if freq_dict]
+        self.context_ids_ = {context: i for i, context in enumerate(contexts)}
+
+        counts = np.array([[self.counter_[context][token] for token in self.vocabulary_] for context in contexts], dtype=float)
+        counts = counts.reshape(len(contexts), len(self.vocabulary_)) + self.smoothing
+        if has_child:
+            # letters of the child missing from vocabulary_ are dropped, as the pandas alignment did
+            self.child_positions_ = np.array([self.child_.token_ids_[token] for token in self.vocabulary_], dtype=int)
+            child_counts = np.array([self.child_.context_counts(context)[self.child_positions_] for context in contexts]).reshape(counts.shape)
+            counts += child_counts * self.recursive
+        self.counts_ = counts
+        self.log_proba_ = np.log(counts / counts.sum(axis=1, keepdims=True))
+        if not hasattr(self, 'cache_'):
+            self.cache_ = ContextCache()
+
+    def set_cache(self, max_entries=CONTEXT_CACHE_ENTRIES):
+        """Keep the log-probabilities of up to max_entries unseen contexts; 0 disables the cache."""
+        self.cache_ = ContextCache(max_entries) if max_entries else None
+
+    def cache_stats(self):
+        return self.cache_.stats() if getattr(self, 'cache_', None) is not None else None
+
+    def context_counts(self, context):
+        """Smoothed count of each letter of vocabulary_ appearing after context, as an array."""
+        if not hasattr(self, 'counts_'):
+            self.compile()
         if self.order:
             local = context[-self.order:]
         else:
             local = ''
-        freq_dict = self.counter_[local]
-        freq = pd.Series(index=self.vocabulary_)
-        for i, token in enumerate(self.vocabulary_):
-            freq[token] = freq_dict[token] + self.smoothing
+        i = self.context_ids_.get(local)
+        if i is not None:
+            return self.counts_[i]
+        counts = np.zeros(len(self.vocabulary_)) + self.smoothing
         if self.recursive > 0 and self.order > 0:
-            child_freq = self.child_.get_counts(context) * self.recursive
-            freq += child_freq
-        return freq
+            counts += self.child_.context_counts(context)[self.child_positions_] * self.recursive
+        return counts
+
+    def log_proba_vector(self, context):
+        """Log-probability of each letter of vocabulary_ appearing after context, as an array."""
+        if not hasattr(self, 'counts_'):
+            self.compile()
+        if self.order:
+            local = context[-self.order:]
+        else:
+            local = ''
+        i = self.context_ids_.get(local)
+        if i is not None:
+            return self.log_proba_[i]
+        # an unseen context goes through every lower order, the result only depends on local
+        cache = getattr(self, 'cache_', None)
+        if cache is not None:
+            log_proba = cache.get(local)
+            if log_proba is not None:
+                return log_proba
+        counts = self.context_counts(context)
+        log_proba = np.log(counts / counts.sum())
+        if cache is not None:
+            cache.put(local, log_proba)
+        return log_proba
+
+    def get_counts(self, context):
+        """Get smoothed count of each letter appearing after context."""
+        return pd.Series(self.context_counts(context), index=self.vocabulary_)
 
     def predict_proba(self, context):
         """Get smoothed probability of each letter appearing after context."""
@@ -49,7 +229,7 @@ class LanguageNgramModel:
         """Estimate log-probability that context is followed by continuation."""
         result = 0.0
         for token in continuation:
-            result += np.log(self.predict_proba(context)[token])
+            result += self.log_proba_vector(context)[self.token_ids_[token]]
             context += token
         return result
 
@@ -65,6 +245,7 @@ class MissingLetterModel:
         self.smoothing_total = smoothing_total
         self.missed_counter_ = defaultdict(Counter)
         self.total_counter_ = defaultdict(Counter)
+        self.cache_ = ContextCache()
 
     def fit(self, sentence_pairs):
         """Estimate counts for missing letters."""
@@ -75,15 +256,62 @@ class MissingLetterModel:
                     self.missed_counter_[context][original_letter] += 1
                 self.total_counter_[context][original_letter] += 1
 
-    def predict_proba(self, context, last_letter):
-        """Estimate probability that last_letter after context is missed."""
+    def set_cache(self, max_entries=CONTEXT_CACHE_ENTRIES):
+        """Keep the probabilities of up to max_entries contexts; 0 disables the cache."""
+        self.cache_ = ContextCache(max_entries) if max_entries else None
+
+    def cache_stats(self):
+        return self.cache_.stats() if getattr(self, 'cache_', None) is not None else None
+
+    def context_proba(self, context):
+        """Probability that each letter seen in fit is missed after context, as a dict."""
         if self.order:
             local = context[-self.order:]
         else:
             local = ''
-        missed_freq = self.missed_counter_[local][last_letter] + self.smoothing_missed
-        total_freq = self.total_counter_[local][last_letter] + self.smoothing_total
-        return missed_freq / total_freq
+        # models pickled before the cache get one on first use
+        if not hasattr(self, 'cache_'):
+            self.cache_ = ContextCache()
+        if self.cache_ is not None:
+            probas = self.cache_.get(local)
+            if probas is not None:
+                return probas
+        probas = self._local_proba(local)
+        if self.cache_ is not None:
+            self.cache_.put(local, probas)
+        return probas
+
+    def _local_proba(self, local):
+        missed_dict = self.missed_counter_.get(local, Counter())
+        total_dict = self.total_counter_.get(local, Counter())
+        return {
+            letter: (missed_dict[letter] + self.smoothing_missed) / (total_dict[letter] + self.smoothing_total)
+            for letter in total_dict
+        }
+
+    def predict_proba(self, context, last_letter):
+        """Estimate probability that last_letter after context is missed."""
+        proba = self.context_proba(context).get(last_letter)
+        if proba is None:  # never seen after this context
+            proba = self.smoothing_missed / self.smoothing_total
+        return proba
+
+    def predict_proba_vector(self, context, letters):
+        """Probability that each of letters is missed after context, as an array."""
+        local = context[-self.order:] if self.order else ''
+        key = (local, ''.join(letters))
+        cache = getattr(self, 'cache_', None)
+        if cache is not None:
+            probas = cache.get(key)
+            if probas is not None:
+                return probas
+        # computed without going through context_proba, so a miss is only counted once in cache_
+        local_proba = self._local_proba(local)
+        default = self.smoothing_missed / self.smoothing_total
+        probas = np.array([local_proba.get(letter, default) for letter in letters])
+        if cache is not None:
+            cache.put(key, probas)
+        return probas
 
     def single_log_proba(self, context, continuation, actual=None):
         """Estimate log-probability of continuaton being distorted to actual after context. 
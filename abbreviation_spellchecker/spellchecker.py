@@ -0,0 +1,138 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from models import ContextCache
+from model_store import load_any
+from abbreviation_spellchecker import SearchStats, noisy_channel
+
+# corrections kept by a Spellchecker, field names of a dictionary repeat the same tokens a lot
+CORRECTION_CACHE_ENTRIES = 100000
+# below this many words to correct, the pool costs more than it saves
+MIN_PARALLEL_WORDS = 16
+
+# models of each worker process, loaded once by _init_worker instead of being pickled with every task
+_LANG_MODEL = None
+_MISSED_MODEL = None
+_SEARCH_PARAMS = None
+
+
+def _init_worker(model_path, search_params):
+    global _LANG_MODEL, _MISSED_MODEL, _SEARCH_PARAMS
+
+    # a model directory is memory-mapped, so the workers share one copy of it whatever their number
+    _LANG_MODEL, _MISSED_MODEL, _ = load_any(model_path)
+    _SEARCH_PARAMS = search_params
+
+
+def _search(word, lang_model, missed_model, search_params):
+    """The correction of a word with its search statistics: (correction, seconds, deadline hit, beam prunes)."""
+    stats = SearchStats()
+    correction = noisy_channel(word, lang_model, missed_model, verbose=False, stats=stats, **search_params)
+    return correction, stats.seconds[0], stats.deadline_hits > 0, stats.beam_prunes
+
+
+def _correct_in_worker(word):
+    # the search statistics go back to the parent with the correction
+    return _search(word, _LANG_MODEL, _MISSED_MODEL, _SEARCH_PARAMS)
+
+
+class Spellchecker:
+    """Loads the models once and corrects words for as long as it lives.
+
+    With time_budget (seconds per word) and beam_width, every search is bounded (see
+    noisy_channel), for inline use in interactive queries; stats() tells how often the deadline
+    was hit and the p99 latency. processes is capped at the number of CPUs: the searches are CPU
+    bound, more processes would only preempt each other and overrun their time_budget.
+
+    Example usage:
+        with Spellchecker('abbreviation_spellchecker.model', processes=4) as spellchecker:
+            spellchecker.correct('wtr')  # 'water'
+            spellchecker.correct_many(['cust', 'acct', 'cust'])
+            spellchecker.normalize_field_names(['CUST_ACCT_NBR', 'WTR_DPTH'])
+    """
+    def __init__(self, model_path, processes=1, cache_entries=CORRECTION_CACHE_ENTRIES, max_attempts=1000, optimism=0.9, freedom=3.0,
+                 time_budget=None, beam_width=None):
+        self.model_path = model_path
+        self.processes = min(processes, os.cpu_count() or 1)
+        self.search_params = {
+            'max_attempts': max_attempts,
+            'optimism': optimism,
+            'freedom': freedom,
+            'time_budget': time_budget,
+            'beam_width': beam_width,
+        }
+        self.lang_model, self.missed_model, self.all_letters = load_any(model_path)
+        self.corrections = ContextCache(cache_entries)
+        self.search_stats = SearchStats()
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def pool(self):
+        """The worker processes, started on first use and kept until close."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker, initargs=(self.model_path, self.search_params))
+        return self._pool
+
+    def correctable(self, word):
+        """Only words made of the letters the model was trained on can be corrected."""
+        return bool(word) and set(word) <= set(self.all_letters)
+
+    def correct(self, word):
+        """Most probable correction of a word; other words are returned lower cased but unchanged."""
+        return self.correct_many([word])[0]
+
+    def correct_many(self, words, chunksize=None):
+        """Correct a batch of words, in their order.
+
+        Every distinct word is corrected once, from the cache when an earlier call corrected it,
+        and the others are spread over the worker processes. A correction cut short by the
+        time_budget is not cached, the next call searches that word again.
+        """
+        words = [word.lower() for word in words]
+        results = {}
+        missing = []
+        for word in dict.fromkeys(words):
+            correction = self.corrections.get(word) if self.correctable(word) else word
+            if correction is None:
+                missing.append(word)
+            else:
+                results[word] = correction
+
+        if self.processes > 1 and len(missing) >= MIN_PARALLEL_WORDS:
+            chunksize = chunksize or max(1, len(missing) // (4 * self.processes))
+            searches = self.pool().map(_correct_in_worker, missing, chunksize=chunksize)
+        else:
+            searches = (_search(word, self.lang_model, self.missed_model, self.search_params) for word in missing)
+
+        for word, (correction, seconds, deadline_hit, beam_prunes) in zip(missing, searches):
+            self.search_stats.record(seconds, deadline_hit, beam_prunes)
+            if not deadline_hit:
+                self.corrections.put(word, correction)
+            results[word] = correction
+        return [results[word] for word in words]
+
+    def normalize_field_names(self, field_names):
+        """Spell out every token of field names such as 'CUST_ACCT_NBR', in one batch: 'customer account number'."""
+        tokens = [re.findall(r'[a-z]+', str(name).lower()) for name in field_names]
+        corrections = iter(self.correct_many([token for name_tokens in tokens for token in name_tokens]))
+        return [' '.join(next(corrections) for _ in name_tokens) for name_tokens in tokens]
+
+    def stats(self):
+        """Correction cache statistics, and the latency and deadline hits of the searches."""
+        return {**self.corrections.stats(), **self.search_stats.summary()}
+
+
+if __name__ == "__main__":
+    with Spellchecker("abbreviation_spellchecker.pkl") as spellchecker:
+        print(spellchecker.normalize_field_names(['enty_key', 'WTR_DPTH', 'CUST_ACCT_NBR']))
@@ -0,0 +1,140 @@
+from heapq import heappush, heappop
+
+import numpy as np
+
+import abbreviation_spellchecker
+from abbreviation_spellchecker import SearchStats, generate_options, noisy_channel
+from models import LanguageNgramModel, MissingLetterModel
+
+CORPUS = ' water depth customer account number flow rate temperature ' * 20
+PAIRS = [('water', 'w-t-r'), ('depth', 'd-pth'), ('customer', 'cust----'), ('account', 'acc--nt')]
+WORDS = ['wtr', 'dpth', 'cstmr', 'acnt', 'flw', 'tmp']
+
+
+def fitted_models():
+    lang_model = LanguageNgramModel(3, smoothing=0.01, recursive=0.01)
+    lang_model.fit(CORPUS)
+    missed_model = MissingLetterModel(order=0, smoothing_missed=0.1)
+    missed_model.fit(PAIRS * 10)
+    return lang_model, missed_model
+
+
+def lang_log_proba(lang_model, context, continuation):
+    # per letter, from the smoothed counts checked against the baseline in test_models.py
+    result = 0.0
+    for token in continuation:
+        counts = lang_model.context_counts(context)
+        result += np.log(counts[lang_model.token_ids_[token]] / counts.sum())
+        context += token
+    return result
+
+
+def baseline_generate_options(prefix_proba, prefix, suffix, lang_model, missed_model, optimism=0.5, cache=None):
+    # generate_options before the costs were computed as arrays, one letter at a time
+    options = []
+    for letter in lang_model.vocabulary_ + ['']:
+        if letter:  # Assume a missing letter
+            next_letter = letter
+            new_suffix = suffix
+            new_prefix = prefix + next_letter
+            proba_missing_state = - np.log(missed_model.predict_proba(prefix, letter))
+        else:  # Assume no missing letter
+            next_letter = suffix[0]
+            new_suffix = suffix[1:]
+            new_prefix = prefix + next_letter
+            proba_missing_state = - np.log((1 - missed_model.predict_proba(prefix, next_letter)))
+        proba_next_letter = - lang_log_proba(lang_model, prefix, next_letter)
+        if cache:
+            proba_suffix = cache[len(new_suffix)] * optimism
+        else:
+            proba_suffix = - lang_log_proba(lang_model, new_prefix, new_suffix) * optimism
+        proba = prefix_proba + proba_next_letter + proba_missing_state + proba_suffix
+        options.append((proba, new_prefix, new_suffix, letter, proba_suffix))
+    return options
+
+
+def baseline_noisy_channel(word, lang_model, missed_model, freedom=1.0, max_attempts=1000, optimism=0.1):
+    # noisy_channel before the anytime search, returning the correction and every expansion
+    query = word + ' '
+    best_logprob = -lang_log_proba(lang_model, ' ', query) - missed_model.single_log_proba(' ', query)
+    heap = [(best_logprob * optimism, ' ', query, '', best_logprob * optimism)]
+    candidates = [(best_logprob, ' ' + query, '', None, 0.0)]
+    expansions = []
+
+    cache = {}
+    for i in range(len(query) + 1):
+        cache[i] = -lang_log_proba(lang_model, '', query[:i]) - missed_model.single_log_proba('', query[:i])
+
+    for i in range(max_attempts):
+        if not heap:
+            break
+        next_best = heappop(heap)
+        if next_best[2] == '':
+            if next_best[0] <= best_logprob + freedom:
+                candidates.append(next_best)
+                if next_best[0] < best_logprob:
+                    best_logprob = next_best[0]
+        else:
+            prefix_proba = next_best[0] - next_best[4]
+            new_options = [option for option in baseline_generate_options(prefix_proba, next_best[1], next_best[2], lang_model, missed_model, optimism, cache)
+                           if option[0] < best_logprob + freedom]
+            expansions.append(new_options)
+            for new_option in new_options:
+                heappush(heap, new_option)
+
+    return min(candidates, key=lambda x: x[0])[1][1:-1], expansions
+
+
+def assert_same_options(options, expected):
+    assert [option[1:4] for option in options] == [option[1:4] for option in expected]
+    assert np.allclose([option[0] for option in options], [option[0] for option in expected], rtol=1e-9, atol=0)
+    assert np.allclose([option[4] for option in options], [option[4] for option in expected], rtol=1e-9, atol=0)
+
+
+def test_generate_options_matches_the_baseline():
+    lang_model, missed_model = fitted_models()
+    cache = {i: 1.5 * i for i in range(10)}
+    for prefix, suffix in [(' ', 'wtr '), (' w', 'tr '), (' wa', 'tr '), (' dep', 'th '), (' nu', 'mbr ')]:
+        for option_cache in (None, cache):
+            options = generate_options(2.0, prefix, suffix, lang_model, missed_model, 0.1, option_cache)
+            expected = baseline_generate_options(2.0, prefix, suffix, lang_model, missed_model, 0.1, option_cache)
+            assert_same_options(options, expected)
+
+            # max_logprob only drops the options that cost as much or more
+            max_logprob = float(np.median([option[0] for option in expected]))
+            options = generate_options(2.0, prefix, suffix, lang_model, missed_model, 0.1, option_cache, max_logprob)
+            assert_same_options(options, [option for option in expected if option[0] < max_logprob])
+
+
+def test_noisy_channel_matches_the_baseline(monkeypatch):
+    lang_model, missed_model = fitted_models()
+    expansions = []
+
+    def recorded_generate_options(*args):
+        options = generate_options(*args)
+        expansions.append(options)
+        return options
+
+    monkeypatch.setattr(abbreviation_spellchecker, 'generate_options', recorded_generate_options)
+    stats = SearchStats()
+    for word in WORDS:
+        expansions.clear()
+        correction = noisy_channel(word, lang_model, missed_model, verbose=False, time_budget=60.0, stats=stats)
+        expected_correction, expected_expansions = baseline_noisy_channel(word, lang_model, missed_model)
+
+        assert correction == expected_correction
+        assert len(expansions) == len(expected_expansions)
+        for options, expected in zip(expansions, expected_expansions):
+            assert_same_options(options, expected)
+
+    assert stats.summary()['searches'] == len(WORDS)
+    assert stats.deadline_hits == 0
+
+
+def test_noisy_channel_cut_short_is_flagged():
+    lang_model, missed_model = fitted_models()
+    stats = SearchStats()
+    # the deadline passes during the setup, the word comes back unchanged
+    assert noisy_channel('wtr', lang_model, missed_model, verbose=False, time_budget=1e-9, stats=stats) == 'wtr'
+    assert stats.deadline_hits == 1
+    assert stats.summary()['deadline hit rate (%)'] == 100.0
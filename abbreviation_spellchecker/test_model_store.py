@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from models import LanguageNgramModel, MissingLetterModel
+from model_store import load_models, save_models
+
+PAIRS = [('water', 'w-t-r'), ('depth', 'd-pth'), ('customer', 'cust----'), ('account', 'acc--nt')]
+
+
+def fitted_models(corpus, order=3):
+    lang_model = LanguageNgramModel(order, smoothing=0.1, recursive=0.01)
+    lang_model.fit(corpus)
+    missed_model = MissingLetterModel(order=0)
+    missed_model.fit(PAIRS)
+    return lang_model, missed_model, ''.join(sorted(set(corpus)))
+
+
+def assert_round_trip(directory, corpus, order=3):
+    lang_model, missed_model, all_letters = fitted_models(corpus, order)
+    save_models(directory, lang_model, missed_model, all_letters)
+    loaded_lang, loaded_missed, loaded_letters = load_models(directory)
+
+    assert loaded_letters == all_letters
+    model, loaded = lang_model, loaded_lang
+    while True:
+        assert loaded.order == model.order and loaded.vocabulary_ == model.vocabulary_
+        assert loaded.context_ids_ == model.context_ids_
+        assert np.array_equal(loaded.counts_, model.counts_)
+        assert np.array_equal(loaded.log_proba_, model.log_proba_)
+        if not hasattr(model, 'child_'):
+            break
+        model, loaded = model.child_, loaded.child_
+
+    # seen and unseen contexts, the latter computed from the lower orders
+    for context in [' ', ' wa', 'ter', corpus[:5], 'zzzz']:
+        assert np.array_equal(loaded_lang.log_proba_vector(context), lang_model.log_proba_vector(context))
+    assert loaded_missed.context_proba('') == missed_model.context_proba('')
+
+
+def test_round_trip(tmp_path):
+    assert_round_trip(str(tmp_path / 'ascii.model'), ' water depth customer account number ' * 3)
+
+
+def test_round_trip_of_a_non_ascii_vocabulary(tmp_path):
+    assert_round_trip(str(tmp_path / 'latin.model'), ' profondeur d’eau, débit, précision été ' * 3)
+
+
+def test_round_trip_of_more_than_256_letters(tmp_path):
+    corpus = ''.join(chr(0x100 + i) for i in range(300)) * 2
+    assert_round_trip(str(tmp_path / 'wide.model'), corpus, order=2)
+
+
+def test_nul_letters_are_rejected(tmp_path):
+    lang_model, missed_model, all_letters = fitted_models(' water\0depth ')
+    with pytest.raises(ValueError):
+        save_models(str(tmp_path / 'nul.model'), lang_model, missed_model, all_letters)
@@ -0,0 +1,108 @@
+import random
+from collections import defaultdict, Counter
+
+import numpy as np
+
+from models import LanguageNgramModel, MissingLetterModel, ngram_counts
+
+PAIRS = [('water', 'w-t-r'), ('depth', 'd-pth'), ('customer', 'cust----'), ('account', 'acc--nt')]
+
+
+def test_missing_letter_cache_counts_each_lookup_once():
+    missed_model = MissingLetterModel(order=1)
+    missed_model.fit(PAIRS)
+
+    probas = missed_model.predict_proba_vector('wa', 'aetz')
+    assert missed_model.cache_stats()['misses'] == 1
+    assert np.array_equal(missed_model.predict_proba_vector('xa', 'aetz'), probas)
+    assert missed_model.cache_stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'hit rate (%)': 50.0}
+
+    # the same values, one letter at a time through context_proba
+    assert probas.tolist() == [missed_model.predict_proba('wa', letter) for letter in 'aetz']
+    assert missed_model.cache_stats()['misses'] == 2
+
+
+def baseline_counts(corpus, order):
+    # LanguageNgramModel.fit before ngram_counts, one order at a time, character by character
+    counter = defaultdict(Counter)
+    unigrams = Counter()
+    for i, token in enumerate(corpus[order:]):
+        counter[corpus[i:(i + order)]][token] += 1
+        unigrams[token] += 1
+    return counter, unigrams, sorted(unigrams)
+
+
+def assert_same_counts(corpus, lowest, highest, chunk_size):
+    counts = ngram_counts(corpus, lowest, highest, chunk_size)
+    assert sorted(counts) == list(range(lowest, highest + 1))
+    for order, (counter, unigrams, vocabulary) in counts.items():
+        expected_counter, expected_unigrams, expected_vocabulary = baseline_counts(corpus, order)
+        assert counter == expected_counter and vocabulary == expected_vocabulary
+        assert unigrams == expected_unigrams
+        # the order of the keys decides the rows of the compiled arrays
+        assert list(counter) == list(expected_counter)
+        assert [list(counter[context]) for context in counter] == [list(expected_counter[context]) for context in expected_counter]
+        assert list(unigrams) == list(expected_unigrams)
+
+
+def test_ngram_counts_match_the_baseline():
+    rng = random.Random(0)
+    corpus = ''.join(rng.choice('abcde ') for _ in range(3000))
+    for chunk_size in (7, 100, 1 << 22):
+        assert_same_counts(corpus, 0, 4, chunk_size)
+        assert_same_counts(corpus, 2, 3, chunk_size)
+
+
+def test_ngram_counts_of_short_and_wide_corpora():
+    assert_same_counts('', 0, 2, 4)
+    assert_same_counts('ab', 0, 4, 1)
+    assert_same_counts(' profondeur d’eau, débit ', 0, 3, 5)
+    assert_same_counts(''.join(chr(0x100 + i) for i in range(300)) * 2, 0, 2, 64)
+
+
+def test_fit_matches_the_baseline_counts():
+    corpus = ' water depth customer account number ' * 5
+    lang_model = LanguageNgramModel(3, smoothing=0.1, recursive=0.01)
+    lang_model.fit(corpus, chunk_size=11)
+    model = lang_model
+    for order in range(3, -1, -1):
+        assert model.order == order
+        assert (model.counter_, model.unigrams_, model.vocabulary_) == baseline_counts(corpus, order)
+        model = getattr(model, 'child_', None)
+
+
+def baseline_log_proba(model, context):
+    # LanguageNgramModel.get_counts and predict_proba before compile, one letter at a time
+    def get_counts(model, context):
+        local = context[-model.order:] if model.order else ''
+        freq_dict = model.counter_.get(local, Counter())
+        freq = {token: freq_dict[token] + model.smoothing for token in model.vocabulary_}
+        if model.recursive > 0 and model.order > 0:
+            child_freq = get_counts(model.child_, context)
+            for token in freq:
+                freq[token] += child_freq[token] * model.recursive
+        return freq
+
+    counts = get_counts(model, context)
+    total = sum(counts.values())
+    return [np.log(counts[token] / total) for token in model.vocabulary_]
+
+
+def test_log_proba_vector_matches_the_baseline():
+    rng = random.Random(1)
+    corpus = ' '.join(''.join(rng.choice('abcdef') for _ in range(rng.randint(2, 7))) for _ in range(300))
+    model = LanguageNgramModel(order=3, smoothing=0.5, recursive=0.01)
+    model.fit(corpus)
+
+    seen = [corpus[i:i + 3] for i in range(0, 60, 7)]
+    # contexts never seen in fit, at one or several orders, and shorter than the order
+    unseen = ['zzz', 'aqq', 'ab' + chr(0x3b1), 'fqf', 'a', '', 'long context zz']
+    for context in seen + unseen:
+        expected = baseline_log_proba(model, context)
+        for _ in range(2):
+            # the second lookup of an unseen context comes from the cache
+            assert np.allclose(model.log_proba_vector(context), expected, rtol=1e-12, atol=0)
+        assert np.allclose(model.predict_proba(context).values, np.exp(expected), rtol=1e-12, atol=0)
+        assert list(model.predict_proba(context).index) == model.vocabulary_
+    assert not any(context[-3:] in model.context_ids_ for context in unseen)
+    assert model.cache_stats()['hits'] >= len(unseen)
@@ -0,0 +1,33 @@
+from models import LanguageNgramModel, MissingLetterModel
+from model_store import save_models
+from spellchecker import Spellchecker
+
+CORPUS = ' water depth customer account number flow rate temperature ' * 20
+PAIRS = [('water', 'w-t-r'), ('depth', 'd-pth'), ('customer', 'cust----'), ('account', 'acc--nt')]
+
+
+def model_directory(tmp_path):
+    lang_model = LanguageNgramModel(3, smoothing=0.01, recursive=0.01)
+    lang_model.fit(CORPUS)
+    missed_model = MissingLetterModel(order=0, smoothing_missed=0.1)
+    missed_model.fit(PAIRS * 10)
+    return save_models(str(tmp_path / 'test.model'), lang_model, missed_model, ''.join(sorted(set(CORPUS))))
+
+
+def test_corrections_are_cached(tmp_path):
+    with Spellchecker(model_directory(tmp_path)) as spellchecker:
+        first = spellchecker.correct_many(['WTR', 'dpth', 'wtr'])
+        assert first[0] == first[2]
+        assert spellchecker.correct_many(['wtr', 'dpth']) == first[:2]
+        stats = spellchecker.stats()
+        assert stats['entries'] == 2 and stats['hits'] == 2 and stats['searches'] == 2
+
+
+def test_corrections_cut_short_are_not_cached(tmp_path):
+    with Spellchecker(model_directory(tmp_path), time_budget=1e-9) as spellchecker:
+        # the deadline passes during the setup, the word comes back unchanged
+        assert spellchecker.correct_many(['wtr', 'dpth']) == ['wtr', 'dpth']
+        assert spellchecker.correct('wtr') == 'wtr'
+        stats = spellchecker.stats()
+        assert stats['entries'] == 0
+        assert stats['searches'] == stats['deadline hits'] == 3
@@ -0,0 +1,87 @@
+import os
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from domain_index import StandardWarmer
+from ingest import content_hash, read_standard
+from job_queue import DEFAULT_USER, ScoringPool
+from result_cache import RESULT_CACHE_ENTRIES, RESULT_CACHE_TTL, ResultCache
+from scorers import jaccard_similarities
+
+# Streamlit re-runs the whole app script on every widget change; these helpers keep the expensive
+# parts in memory across re-runs and sessions of the same server process
+
+# parsed data standards kept, one per distinct uploaded file
+STANDARD_ENTRIES = 4
+
+# scoring threads shared by every session of the server, and their rate limit (unlimited when unset)
+APP_SCORING_WORKERS = 2
+APP_CALLS_PER_MINUTE = int(os.environ.get("CDE_CALLS_PER_MINUTE", 0)) or None
+
+def standard_key(uploaded_file):
+    """Hash of an uploaded data standard's content, the same file uploaded twice gets the same key."""
+    return content_hash(uploaded_file.getvalue())
+
+@st.cache_resource(max_entries=STANDARD_ENTRIES)
+def load_standard(standard_hash, _uploaded_file):
+    """
+    Reads an uploaded data standard once per content for every session.
+
+    The DataFrame is shared, not copied: callers must not modify it in place.
+    """
+    return read_standard(_uploaded_file)
+
+@st.cache_resource(max_entries=STANDARD_ENTRIES)
+def warm_standard(standard_hash, _standard):
+    """
+    Starts precomputing the features of every domain of a data standard in the background, once
+    per content for every session; see domain_index.StandardWarmer.
+    """
+    return StandardWarmer(_standard)
+
+@st.cache_data(ttl=RESULT_CACHE_TTL, max_entries=STANDARD_ENTRIES)
+def load_dictionary_units(dictionary_path, domain=None):
+    """
+    The (attribute, field description, domain) units of a stored data dictionary upload, see
+    cde_cli.load_dictionary. The path holds the content hash, so it is a valid cache key.
+    """
+    # import here so the single attribute pages don't load the batch modules
+    from cde_cli import load_dictionary
+
+    return load_dictionary(dictionary_path, domain)
+
+@st.cache_resource
+def shared_result_cache():
+    """Comparison results shared by every session, see result_cache.ResultCache."""
+    return ResultCache(RESULT_CACHE_ENTRIES, RESULT_CACHE_TTL)
+
+@st.cache_data(ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_ENTRIES)
+def jaccard_ranking(standard_hash, domain, normalized_input, _letters, _features=None):
+    """
+    Jaccard similarity of an attribute (see result_cache.normalize_input) with every data element
+    of a domain.
+
+    Cached by (data standard, domain, normalized attribute); `_letters` is the LETTERS_COLUMN of
+    that domain and is not hashed. With the domain's precomputed `_features` (see warm_standard),
+    its letter sets are reused instead of being built again.
+    """
+    if _features is not None:
+        return _features.jaccard(normalized_input)
+    return jaccard_similarities(normalized_input, _letters)
+
+@st.cache_resource
+def shared_scoring_pool():
+    """
+    Scoring threads every session submits its comparisons to, see job_queue.ScoringPool: the
+    sessions share the model quota fairly instead of each starting its own threads.
+    """
+    return ScoringPool(APP_SCORING_WORKERS, APP_CALLS_PER_MINUTE)
+
+def session_user():
+    """The user the session's comparisons are queued under: the name given in the sidebar, else the session."""
+    user = st.session_state.get("user", "").strip()
+    if user:
+        return user
+    ctx = get_script_run_ctx()
+    return f"{DEFAULT_USER}-{ctx.session_id[:8]}" if ctx is not None else DEFAULT_USER
@@ -0,0 +1,130 @@
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from normalize import LETTERS_COLUMN
+from outputs import TOP_MATCHES, write_scores
+from planner import CallCounter, record_run
+from scorers import get_scorer, jaccard_similarities
+from standard_diff import GLOSSARY_COLUMN, KEY_COLUMNS, SCORE_COLUMNS
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def candidate_rows(units, standard, prefilter_top=None):
+    """
+    Returns, for each (attribute, field description, domain) unit, the row numbers of the data
+    standard it is compared with.
+
+    Each domain is filtered once for all the units of that domain. With `prefilter_top`, only the
+    data elements closest to the field description by Jaccard similarity are kept, as the
+    "Jaccard + OpenAI" model of the app does.
+    """
+    domains = standard["DATA DOMAIN"].astype(object).fillna("").astype(str).str.strip().values
+    letters = standard[LETTERS_COLUMN]
+    domain_rows = {}
+
+    candidates = []
+    for _, field_desc, domain in units:
+        if domain not in domain_rows:
+            domain_rows[domain] = np.arange(len(standard)) if domain == "All" else np.flatnonzero(domains == domain)
+        rows = domain_rows[domain]
+
+        if prefilter_top and len(rows) > prefilter_top:
+            similarities = jaccard_similarities(field_desc, letters.iloc[rows]).values
+            rows = rows[np.argsort(-similarities, kind="stable")[:prefilter_top]]
+
+        candidates.append(rows)
+
+    return candidates
+
+def score_units(units, standard, score_many, prefilter_top=None):
+    """
+    Scores every unit against its candidate data elements, in the long score format.
+
+    Each distinct (field description, data element or glossary) comparison is scored once, however
+    many attributes share the description or domains share the data element.
+
+    Parameters:
+        units (list): (attribute, field description, domain), see cde_cli.load_dictionary.
+        standard (pandas.DataFrame): The data standard, read with ingest.read_standard.
+        score_many (callable): score_many(list of (field description, text)) -> list of scores,
+            None for a comparison that was not scored.
+        prefilter_top (int): Jaccard prefilter, see candidate_rows.
+
+    Returns:
+        tuple: (scores, report) where report counts the attributes, comparisons and the distinct
+        comparisons actually scored.
+    """
+    standard = standard.reset_index(drop=True)
+    keys = standard[KEY_COLUMNS].astype(object).fillna("").astype(str).values
+    elements = standard["DATA ELEMENT"].astype(object).fillna("").astype(str).values
+    glossaries = standard[GLOSSARY_COLUMN].astype(object).fillna("").astype(str).values
+
+    candidates = candidate_rows(units, standard, prefilter_top)
+
+    comparisons = {}
+    for (_, field_desc, _), rows in zip(units, candidates):
+        for row in rows:
+            comparisons.setdefault((field_desc, elements[row]), len(comparisons))
+            comparisons.setdefault((field_desc, glossaries[row]), len(comparisons))
+
+    results = score_many(list(comparisons))
+
+    rows_out = []
+    for (attribute, field_desc, _), rows in zip(units, candidates):
+        for row in rows:
+            element_score = results[comparisons[(field_desc, elements[row])]]
+            glossary_score = results[comparisons[(field_desc, glossaries[row])]]
+            if element_score is None or glossary_score is None:
+                continue
+            element_score = round(element_score, 4)
+            glossary_score = round(glossary_score, 4)
+            combined_score = round((element_score + glossary_score) / 2, 4)
+            rows_out.append((*keys[row], attribute, element_score, glossary_score, combined_score))
+
+    report = {
+        "attributes": len(units),
+        "comparisons": 2 * sum(len(rows) for rows in candidates),
+        "distinct comparisons scored": sum(result is not None for result in results),
+    }
+
+    return pd.DataFrame(rows_out, columns=SCORE_COLUMNS), report
+
+def run_bulk_job(job):
+    """
+    Runs a background "bulk" job (see job_queue): every attribute of an uploaded data dictionary
+    against the data standard, as one batch on the shared scoring pool.
+
+    Writes the long format scores next to the result workbook (summary and top matches sheets,
+    see outputs.write_workbook) and returns the workbook path.
+    """
+    # import here so the job worker only loads the dictionary filters of main.py when needed
+    from cde_cli import load_dictionary
+    from ingest import read_standard
+
+    params = job.params
+    units = load_dictionary(params["dictionary_path"], params.get("domain"))
+    standard = read_standard(params["standard_path"])
+    score_fn = CallCounter(get_scorer(params["scorer"]))
+
+    start_time = time.time()
+    scores, report = score_units(units, standard, lambda pairs: job.map(score_fn, pairs), params.get("prefilter_top"))
+
+    top_k = params.get("top_k", TOP_MATCHES)
+    result_path = job.result_path(".xlsx")
+    write_scores(scores, os.path.splitext(result_path)[0] + ".parquet", top_k)
+    write_scores(scores, result_path, top_k)
+
+    for name, value in report.items():
+        logger.info(f"Job {job.id} - {name}: {value}")
+
+    if not job.cancelled():
+        # keep the running time to calibrate later estimates
+        record_run(params["scorer"], job.pool.workers, score_fn.calls, time.time() - start_time)
+
+    return result_path
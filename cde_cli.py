@@ -0,0 +1,294 @@
+import argparse
+import csv
+import hashlib
+import logging
+import os
+import socket
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from dictionary_filter import load_rules
+from ingest import ingest_directory, read_dictionary, read_standard
+from outputs import TOP_MATCHES, read_scores, write_scores
+from planner import count_comparisons, plan_run, record_run
+from scorers import SCORER_NAMES, get_scorer
+from standard_diff import SCORE_COLUMNS
+from standard_store import build_store, open_store
+from topk import TopKAccumulator
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "full" keeps every score, "summary" only keeps the top matches of each attribute
+MODES = ["full", "summary"]
+
+# state of each worker process, set once by _init_worker instead of being pickled with every task
+_SCORER = None
+_STANDARD = None
+_TOP_K = TOP_MATCHES
+_SPILL_DIR = None
+
+def parse_shard(value):
+    """Parses a "--shard i/N" value into (i, N), where shards are numbered from 1 to N."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard must look like i/N, got '{value}'")
+
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Shard index must be between 1 and N, got '{value}'")
+
+    return index, count
+
+def unit_shard(attribute, domain, num_shards):
+    """
+    Returns the 1-based shard an (attribute, domain) unit of work belongs to.
+
+    The shard only depends on the attribute and domain names, so every machine computes the same
+    split without coordinating, whatever the order or size of its input files.
+    """
+    digest = hashlib.md5(f"{domain}\x1f{attribute}".encode("utf-8")).hexdigest()
+    return int(digest, 16) % num_shards + 1
+
+def load_dictionary(path, domain=None, limit=None, rules=None):
+    """
+    Loads, preprocesses and filters a data dictionary the same way main.py does.
+
+    Returns a list of (attribute, field description, domain) units of work. `domain` overrides the
+    dictionary's own "DATA DOMAIN " column; use "All" to compare against the whole data standard.
+    `rules` replaces the default dictionary filter rules, see dictionary_filter.DEFAULT_RULES.
+    """
+    from main import preprocess_data, filter_dictionary
+    from dictionary_filter import DEFAULT_RULES
+
+    data1 = read_dictionary(path)
+    preprocess_data(data1)
+    data1 = filter_dictionary(data1, rules or DEFAULT_RULES)
+
+    if domain:
+        data1["DATA DOMAIN "] = domain
+
+    data1["DATA DOMAIN "] = data1["DATA DOMAIN "].astype(object).fillna("All").astype(str).str.strip()
+    data1 = data1.drop_duplicates(subset=["FIELD NAME/DATA ATTRIBUTE(S)", "DATA DOMAIN "])
+
+    if limit:
+        data1 = data1.head(limit)
+
+    return list(zip(data1["FIELD NAME/DATA ATTRIBUTE(S)"], data1["FIELD DESCRIPTION"], data1["DATA DOMAIN "]))
+
+def _init_worker(scorer_name, store_path, top_k=TOP_MATCHES, spill_dir=None):
+    global _SCORER, _STANDARD, _TOP_K, _SPILL_DIR
+
+    _SCORER = get_scorer(scorer_name)
+    # memory-mapped, so workers share one copy of the data standard whatever their number
+    _STANDARD = open_store(store_path)
+    _TOP_K = top_k
+    _SPILL_DIR = spill_dir
+
+def score_rows(unit):
+    """Yields the long format score row of one attribute against each data element of its domain."""
+    attribute, field_desc, domain = unit
+
+    for data_domain, data_group, data_entity, data_element, glossary in _STANDARD.rows(domain):
+        element_score = round(_SCORER(field_desc, data_element), 4)
+        glossary_score = round(_SCORER(field_desc, glossary), 4)
+        combined_score = round((element_score + glossary_score) / 2, 4)
+        yield data_domain, data_group, data_entity, data_element, attribute, element_score, glossary_score, combined_score
+
+def score_unit(unit):
+    """Scores one attribute against every data element of its domain, in the long score format."""
+    return pd.DataFrame(list(score_rows(unit)), columns=SCORE_COLUMNS)
+
+def score_unit_top(unit):
+    """
+    Scores one attribute like score_unit but only returns its top matches.
+
+    Rows are streamed into a bounded heap as they are scored, so no score column is kept in
+    memory. When a spill directory is set every row is appended to this worker's csv in it, a
+    directory of its own for every run (see spill_run_dir).
+    """
+    top = TopKAccumulator(_TOP_K)
+
+    spill_file = None
+    if _SPILL_DIR:
+        spill_path = os.path.join(_SPILL_DIR, f"scores_{socket.gethostname()}_{os.getpid()}.csv")
+        write_header = not os.path.exists(spill_path)
+        spill_file = open(spill_path, "a", newline="", encoding="utf-8")
+        spill_writer = csv.writer(spill_file)
+        if write_header:
+            spill_writer.writerow(SCORE_COLUMNS)
+
+    try:
+        for row in score_rows(unit):
+            top.push(unit[0], row[-1], row)
+            if spill_file:
+                spill_writer.writerow(row)
+    finally:
+        if spill_file:
+            spill_file.close()
+
+    return [row for _, row in top.items(unit[0])]
+
+def spill_run_dir(spill_dir):
+    """
+    Creates the directory of this run in `spill_dir`, so the csv files the workers append to never
+    hold rows of an earlier run, nor of a shard running on another machine with the same spill_dir.
+    """
+    os.makedirs(spill_dir, exist_ok=True)
+    return tempfile.mkdtemp(prefix=f"run_{time.strftime('%Y%m%d_%H%M%S')}_{socket.gethostname()}_", dir=spill_dir)
+
+def run_units(units, standard, scorer_name, workers, mode="full", top_k=TOP_MATCHES, spill_dir=None):
+    """
+    Scores every unit in a process pool.
+
+    In "full" mode returns every long format score. In "summary" mode only the top_k rows of each
+    attribute are returned, so memory stays O(attributes x top_k) whatever the size of the data
+    standard; the full scores are written to a new run directory in `spill_dir` if one is given
+    (see spill_run_dir), otherwise discarded.
+    """
+    if spill_dir:
+        spill_dir = spill_run_dir(spill_dir)
+        logger.info(f"Writing every score to {spill_dir}")
+
+    # workers open the standard by path instead of each unpickling a copy of the DataFrame
+    with tempfile.TemporaryDirectory(prefix="cde_standard_") as store_path:
+        build_store(standard, store_path)
+        return _run_pool(units, store_path, scorer_name, workers, mode, top_k, spill_dir)
+
+def _run_pool(units, store_path, scorer_name, workers, mode, top_k, spill_dir):
+    initargs = (scorer_name, store_path, top_k, spill_dir)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        if mode == "summary":
+            # an attribute can come back from several units, keep its best rows over all of them
+            top = TopKAccumulator(top_k)
+            for rows in executor.map(score_unit_top, units):
+                for row in rows:
+                    top.push(row[4], row[-1], row)
+            rows = [row for attribute in top.keys() for _, row in top.items(attribute)]
+            return pd.DataFrame(rows, columns=SCORE_COLUMNS)
+
+        frames = list(executor.map(score_unit, units))
+
+    if not frames:
+        return pd.DataFrame(columns=SCORE_COLUMNS)
+
+    return pd.concat(frames, ignore_index=True)
+
+def cmd_run(args):
+    units = load_dictionary(args.dictionary, args.domain, args.limit, load_rules(args.filter_rules) if args.filter_rules else None)
+    standard = read_standard(args.standard)
+
+    if args.shard:
+        index, count = args.shard
+        units = [unit for unit in units if unit_shard(unit[0], unit[2], count) == index]
+        logger.info(f"Shard {index}/{count}: {len(units)} attribute x domain units")
+
+    start_time = time.time()
+    scores = run_units(units, standard, args.scorer, args.workers, args.mode, args.top_k, args.spill_dir)
+    write_scores(scores, args.output, args.top_k)
+
+    total_time_seconds = time.time() - start_time
+    # the workers are separate processes, but the CLI neither caches nor deduplicates,
+    # so every data element of a unit's domain costs its two scorer calls
+    comparisons = count_comparisons(units, standard)["comparisons"]
+    record_run(args.scorer, args.workers, comparisons, total_time_seconds)
+
+    logger.info(f"Scored {len(units)} attributes ({len(scores)} rows) in {total_time_seconds:.2f} seconds, written to {args.output}")
+
+def cmd_plan(args):
+    units = load_dictionary(args.dictionary, args.domain, args.limit, load_rules(args.filter_rules) if args.filter_rules else None)
+    standard = read_standard(args.standard)
+
+    prompt_overhead_chars = 0
+    max_completion_tokens = 0
+    if args.scorer == "openai":
+        from main import construct_prompt, MAX_TOKENS
+
+        prompt_overhead_chars = len(construct_prompt("", ""))
+        max_completion_tokens = MAX_TOKENS
+
+    plan = plan_run(units, standard, args.scorer, args.workers, prompt_overhead_chars, max_completion_tokens)
+
+    for name, value in plan.items():
+        print(f"{name}: {value if value is not None else 'unknown, no run recorded for this scorer'}")
+
+def merge_shards(shard_scores):
+    """
+    Combines the long format scores of several shards, in the order they were given.
+
+    A unit scored by more than one shard (e.g. a shard that was re-run) keeps the rows of the last
+    shard that has it; its rows are not deduplicated one by one, since the data standard may
+    repeat a (domain, group, entity, element) key. Units are told apart by attribute and data domain.
+    """
+    frames = [scores.assign(_SHARD=position) for position, scores in enumerate(shard_scores)]
+    if not frames:
+        return pd.DataFrame(columns=SCORE_COLUMNS)
+
+    scores = pd.concat(frames, ignore_index=True)
+    latest = scores.groupby(["DATA ATTRIBUTE", "DATA DOMAIN"], dropna=False)["_SHARD"].transform("max")
+    return scores[scores["_SHARD"] == latest].drop(columns="_SHARD").reset_index(drop=True)
+
+def cmd_merge(args):
+    scores = merge_shards([read_scores(path) for path in args.shards])
+    write_scores(scores, args.output)
+
+    logger.info(f"Merged {len(args.shards)} shards ({scores['DATA ATTRIBUTE'].nunique()} attributes) into {args.output}")
+
+def cmd_ingest(args):
+    report = ingest_directory(args.directory, args.output, args.workers)
+
+    for name, value in report.items():
+        logger.info(f"{name}: {value}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="CDE Advisor batch runner: compare data dictionary attributes with the data standard.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="score a data dictionary (or one shard of it) against the data standard")
+    run_parser.add_argument("--dictionary", required=True, help="data dictionary csv")
+    run_parser.add_argument("--standard", required=True, help="data standard csv")
+    run_parser.add_argument("--domain", help="data domain to compare against, 'All' for the whole standard (default: each attribute's own domain)")
+    run_parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    run_parser.add_argument("--scorer", choices=SCORER_NAMES, default="openai", help="similarity scorer")
+    run_parser.add_argument("--shard", type=parse_shard, help="only score shard i of N, e.g. 2/4")
+    run_parser.add_argument("--limit", type=int, help="only score the first N attributes")
+    run_parser.add_argument("--filter-rules", help="JSON file of dictionary filter rules (default: the rules of main.py)")
+    run_parser.add_argument("--mode", choices=MODES, default="full", help="'summary' only keeps the top matches of each attribute in memory and in the output")
+    run_parser.add_argument("--top-k", type=int, default=TOP_MATCHES, help="number of top matches kept per attribute in summary mode")
+    run_parser.add_argument("--spill-dir", help="in summary mode, also write every score to csv files in a new run directory of this directory")
+    run_parser.add_argument("--output", required=True, help="long format scores (.parquet, .csv.gz, .csv, .sqlite) or the summary and top matches only (.xlsx)")
+    run_parser.set_defaults(func=cmd_run)
+
+    plan_parser = subparsers.add_parser("plan", help="estimate comparisons, tokens and running time of a run without starting it")
+    plan_parser.add_argument("--dictionary", required=True, help="data dictionary csv")
+    plan_parser.add_argument("--standard", required=True, help="data standard csv")
+    plan_parser.add_argument("--domain", help="data domain to compare against, 'All' for the whole standard (default: each attribute's own domain)")
+    plan_parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    plan_parser.add_argument("--scorer", choices=SCORER_NAMES, default="openai", help="similarity scorer")
+    plan_parser.add_argument("--limit", type=int, help="only count the first N attributes")
+    plan_parser.add_argument("--filter-rules", help="JSON file of dictionary filter rules (default: the rules of main.py)")
+    plan_parser.set_defaults(func=cmd_plan)
+
+    ingest_parser = subparsers.add_parser("ingest", help="combine a directory of data dictionaries into one table usable as --dictionary")
+    ingest_parser.add_argument("directory", help="directory scanned (recursively) for xlsx/xlsm/csv data dictionaries")
+    ingest_parser.add_argument("--output", required=True, help="combined parquet table, files already in it are skipped")
+    ingest_parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    ingest_parser.set_defaults(func=cmd_ingest)
+
+    merge_parser = subparsers.add_parser("merge", help="combine shard outputs into the final result")
+    merge_parser.add_argument("shards", nargs="+", help="long format scores written by 'run --shard'")
+    merge_parser.add_argument("--output", required=True, help="long format scores (.parquet, .csv.gz, .csv, .sqlite) or the summary and top matches only (.xlsx)")
+    merge_parser.set_defaults(func=cmd_merge)
+
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import json
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# rules of main.py: keep critical data elements with a specific, non-empty field description
+DEFAULT_RULES = [
+    {
+        "name": "not a critical data element",
+        "action": "include",
+        "column": "CRITICAL DATA ELEMENT (CDE)",
+        "equals": ["Yes"],
+    },
+    {
+        "name": "missing field description",
+        "action": "exclude",
+        "column": "FIELD DESCRIPTION",
+        "missing": True,
+    },
+    {
+        "name": "generic field description",
+        "action": "exclude",
+        "column": "FIELD DESCRIPTION",
+        "terms": ['key', 'description', 'date', 'status', 'code', 'ID', 'System', 'Number', 'Label', 'Caption', 'NaN'],
+    },
+]
+
+class TermMatcher:
+    """
+    Aho-Corasick automaton telling whether a text contains any of a list of terms (case-insensitive).
+
+    A text is scanned once whatever the number of terms, so matching stays linear in the text
+    length when the term list grows to hundreds of entries.
+    """
+    def __init__(self, terms):
+        self.transitions = [{}]
+        self.fail = [0]
+        self.terminal = [False]
+
+        for term in terms:
+            term = str(term).lower()
+            if not term:
+                continue
+            state = 0
+            for char in term:
+                if char not in self.transitions[state]:
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.terminal.append(False)
+                    self.transitions[state][char] = len(self.transitions) - 1
+                state = self.transitions[state][char]
+            self.terminal[state] = True
+
+        # breadth first, so the failure link of a state's parent is known before the state
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.transitions[fallback].get(char, 0)
+                self.terminal[next_state] = self.terminal[next_state] or self.terminal[self.fail[next_state]]
+                queue.append(next_state)
+
+    def search(self, text):
+        """Returns True when `text` contains one of the terms."""
+        transitions, fail, terminal = self.transitions, self.fail, self.terminal
+        state = 0
+        for char in text.lower():
+            while state and char not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(char, 0)
+            if terminal[state]:
+                return True
+        return False
+
+def load_rules(path):
+    """Loads a list of filter rules from a JSON file, see DEFAULT_RULES for the format."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def rule_mask(data, rule):
+    """
+    Returns the boolean mask of the rows a rule matches.
+
+    A rule looks at one "column" and matches rows whose value:
+        - "equals": is one of the listed values,
+        - "missing": is empty (true) or not empty (false),
+        - "terms": contains one of the listed terms, ignoring case.
+    Each distinct value is only tested once.
+    """
+    column = data[rule["column"]]
+
+    if "equals" in rule:
+        values = rule["equals"] if isinstance(rule["equals"], list) else [rule["equals"]]
+        return column.isin(values).values
+
+    if "missing" in rule:
+        missing = column.isna().values
+        return missing if rule["missing"] else ~missing
+
+    if "terms" in rule:
+        matcher = TermMatcher(rule["terms"])
+        codes, uniques = pd.factorize(column)
+        unique_hits = np.fromiter((matcher.search(str(value)) for value in uniques), dtype=bool, count=len(uniques))
+        # missing values (code -1) never contain a term
+        return np.append(unique_hits, False)[codes]
+
+    raise ValueError(f"Rule '{rule.get('name')}' needs one of 'equals', 'missing' or 'terms'")
+
+def apply_rules(data, rules=DEFAULT_RULES):
+    """
+    Filters data dictionary rows with include/exclude rules.
+
+    A row is kept when it matches every "include" rule and no "exclude" rule.
+
+    Returns:
+        tuple: (filtered rows, report) where report maps each rule name to the number of rows it
+        rejects on its own, plus the number of rows read and kept.
+    """
+    keep = np.ones(len(data), dtype=bool)
+    report = {"rows read": len(data)}
+
+    for rule in rules:
+        mask = rule_mask(data, rule)
+        report[rule["name"]] = int(mask.sum()) if rule["action"] == "exclude" else int((~mask).sum())
+
+        if rule["action"] == "include":
+            keep &= mask
+        elif rule["action"] == "exclude":
+            keep &= ~mask
+        else:
+            raise ValueError(f"Rule '{rule['name']}' action must be 'include' or 'exclude'")
+
+    report["rows kept"] = int(keep.sum())
+
+    return data[keep], report
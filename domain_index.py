@@ -0,0 +1,168 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from normalize import LETTERS_COLUMN
+from resources import SENTENCE_TRANSFORMER_MODEL, resource_path, sentence_transformer
+from scorers import jaccard_from_sets, letter_set
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ALL_DOMAINS = "All"
+
+# readiness of the features of a domain
+DOMAIN_STATUSES = ["queued", "building", "ready", "failed"]
+
+def filter_domain(standard, domain):
+    # Apply the condition
+    if ALL_DOMAINS in domain:
+        return standard
+
+    # Filter the dataframe based on the selected category
+    return standard[standard["DATA DOMAIN"].str.strip() == domain].reset_index(drop=True)
+
+def domain_options(standard):
+    """The data domains offered by the apps, "All" first."""
+    return [ALL_DOMAINS] + standard["DATA DOMAIN"].unique().tolist()
+
+def local_models_configured():
+    """True when the sentence_transformers model is in the local bundle (see resources.py), so it loads without network."""
+    return os.path.isdir(resource_path("sentence_transformers", SENTENCE_TRANSFORMER_MODEL))
+
+def _text(series):
+    return series.astype(object).fillna("").astype(str).tolist()
+
+class DomainFeatures:
+    """
+    What a comparison against one data domain needs, computed once: the domain's rows, the
+    (data element, glossary, data group, data entity) sent to the model, the letter sets of the
+    Jaccard prefilter and, with a local model, the embeddings of the data elements and glossaries.
+    """
+    def __init__(self, standard, domain, embeddings=None):
+        self.domain = domain
+        self.standard = filter_domain(standard, domain)
+        self.info = list(zip(
+            self.standard["DATA ELEMENT"],
+            self.standard["BUSINESS DEFINITION/ GLOSSARY"],
+            self.standard["DATA GROUP"],
+            self.standard["DATA ENTITY"],
+        ))
+
+        # one letter set per distinct letters value, and the value of every row
+        codes, uniques = pd.factorize(self.standard[LETTERS_COLUMN])
+        self.letter_codes = codes
+        self.letter_sets = [frozenset(value) for value in uniques]
+
+        self.element_embeddings = None
+        self.glossary_embeddings = None
+        if embeddings is not None:
+            positions = self._positions(standard, domain)
+            self.element_embeddings = embeddings[0][positions]
+            self.glossary_embeddings = embeddings[1][positions]
+
+    @staticmethod
+    def _positions(standard, domain):
+        if ALL_DOMAINS in domain:
+            return np.arange(len(standard))
+        return np.flatnonzero((standard["DATA DOMAIN"].str.strip() == domain).values)
+
+    def jaccard(self, text):
+        """Same values as scorers.jaccard_similarities(text, self.standard[LETTERS_COLUMN]), from the prebuilt letter sets."""
+        query = letter_set(str(text))
+        similarities = np.array([jaccard_from_sets(query, letters) for letters in self.letter_sets], dtype=float)
+        return pd.Series(similarities[self.letter_codes], index=self.standard.index)
+
+    def embedding_similarities(self, text):
+        """
+        Cosine similarity of `text` with every data element and glossary of the domain, averaged
+        like the combined score; None without a local model.
+        """
+        if self.element_embeddings is None:
+            return None
+        query = sentence_transformer().encode([str(text)], normalize_embeddings=True)[0]
+        return pd.Series((self.element_embeddings @ query + self.glossary_embeddings @ query) / 2, index=self.standard.index)
+
+class StandardWarmer:
+    """
+    Builds the DomainFeatures of every domain of a data standard in a background thread, as
+    soon as the standard is uploaded, "All" first and then the domains in the order they are
+    offered; the first comparison of a domain then finds everything ready.
+
+    A domain asked for before its turn is built right away by the caller (once: a domain being
+    built in the background is waited for).
+
+    Example usage:
+        warmer = StandardWarmer(standard)
+        features = warmer.features("Upstream")
+        standard_info = features.info
+    """
+    def __init__(self, standard, encode=None):
+        self.standard = standard
+        self.domains = domain_options(standard)
+        self.encode = local_models_configured() if encode is None else encode
+        self.status = {domain: "queued" for domain in self.domains}
+        self._features = {}
+        self._embeddings = None
+        self._locks = {domain: threading.Lock() for domain in self.domains}
+        self._embeddings_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._warm, name="warm-standard", daemon=True)
+        self.thread.start()
+
+    def _warm(self):
+        start_time = time.time()
+        for domain in self.domains:
+            try:
+                self.features(domain)
+            except Exception:
+                logger.exception(f"Precomputing the features of the {domain} data domain failed")
+        logger.info(f"Features of {len(self.domains)} data domains ready in {time.time() - start_time:.1f} seconds")
+
+    def embeddings(self):
+        # every domain is a slice of the embeddings of the whole standard, encoded once
+        with self._embeddings_lock:
+            if self._embeddings is None and self.encode:
+                try:
+                    model = sentence_transformer()
+                    self._embeddings = tuple(
+                        model.encode(_text(self.standard[column]), normalize_embeddings=True, show_progress_bar=False)
+                        for column in ["DATA ELEMENT", "BUSINESS DEFINITION/ GLOSSARY"]
+                    )
+                except Exception:
+                    # the other features don't need the model
+                    logger.exception("Encoding the data standard failed, continuing without embeddings")
+                    self.encode = False
+            return self._embeddings
+
+    def features(self, domain):
+        """The DomainFeatures of `domain`, built now when the background thread didn't get to it yet."""
+        features = self._features.get(domain)
+        if features is not None:
+            return features
+
+        lock = self._locks.get(domain)
+        if lock is None:
+            # not a domain of the standard (e.g. from an older session), built without caching it
+            return DomainFeatures(self.standard, domain)
+
+        with lock:
+            if domain not in self._features:
+                self.status[domain] = "building"
+                try:
+                    self._features[domain] = DomainFeatures(self.standard, domain, self.embeddings())
+                except Exception:
+                    self.status[domain] = "failed"
+                    raise
+                self.status[domain] = "ready"
+        return self._features[domain]
+
+    def ready(self, domain):
+        return self.status.get(domain) == "ready"
+
+    def ready_count(self):
+        return sum(status == "ready" for status in self.status.values())
@@ -0,0 +1,311 @@
+import glob
+import hashlib
+import io
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from normalize import DICTIONARY_TEXT_COLUMNS, normalize_dictionary, normalize_standard, normalized_column
+
+# set up logging
+logger = logging.getLogger(__name__)
+
+# parsed input files are kept here as parquet, named after the hash of their content
+CACHE_DIR = ".cde_cache"
+
+# bump when the cached representation changes so old cache files are not reused
+CACHE_VERSION = "2"
+
+# columns the pipeline uses, everything else in the input files is never parsed
+STANDARD_COLUMNS = ["DATA DOMAIN", "DATA GROUP", "DATA ENTITY", "DATA ELEMENT", "BUSINESS DEFINITION/ GLOSSARY"]
+DICTIONARY_COLUMNS = [
+    "FIELD NAME/DATA ATTRIBUTE(S)",
+    "FIELD DESCRIPTION",
+    "TABLE NAME",
+    "TABLE DESCRIPTION/SUB FOLDER NAME ",
+    "CRITICAL DATA ELEMENT (CDE)",
+    "DATA DOMAIN ",
+]
+
+# few distinct values repeated over thousands of rows
+CATEGORICAL_COLUMNS = ["DATA DOMAIN", "DATA GROUP", "DATA ENTITY"]
+
+# other spellings of the dictionary headers seen in client workbooks, matched after canonical_key
+HEADER_ALIASES = {
+    "FIELD NAME": "FIELD NAME/DATA ATTRIBUTE(S)",
+    "DATA ATTRIBUTE(S)": "FIELD NAME/DATA ATTRIBUTE(S)",
+    "ATTRIBUTE DESCRIPTION": "FIELD DESCRIPTION",
+    "TABLE DESCRIPTION": "TABLE DESCRIPTION/SUB FOLDER NAME ",
+    "CDE": "CRITICAL DATA ELEMENT (CDE)",
+    "CRITICAL DATA ELEMENT": "CRITICAL DATA ELEMENT (CDE)",
+}
+
+# columns added to every row of a directory ingestion
+SOURCE_COLUMNS = ["SOURCE FILE", "SOURCE SHEET", "SOURCE HASH"]
+
+# input files picked up by ingest_directory
+DICTIONARY_PATTERNS = ["*.xlsx", "*.xlsm", "*.csv"]
+
+# rows of an Excel sheet searched for the header row, client templates often start with a title block
+HEADER_SEARCH_ROWS = 20
+
+def read_source(source):
+    """
+    Returns (name, content bytes) of an input file.
+
+    `source` is a path or a file-like object with a name, such as the UploadedFile returned by
+    st.file_uploader.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return os.fspath(source), f.read()
+
+    if hasattr(source, "getvalue"):
+        return source.name, source.getvalue()
+
+    source.seek(0)
+    return source.name, source.read()
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+def canonical_key(header):
+    # compare headers ignoring case, repeated and trailing whitespace, e.g. "DATA DOMAIN " == "Data Domain"
+    return re.sub(r"\s+", " ", str(header)).strip().upper()
+
+def header_mapping(columns):
+    """Maps the canonical key of each accepted header spelling to its column in `columns`."""
+    mapping = {canonical_key(column): column for column in columns}
+    for alias, column in HEADER_ALIASES.items():
+        if column in columns:
+            mapping.setdefault(canonical_key(alias), column)
+    return mapping
+
+def _select_columns(table, mapping):
+    """Renames the recognized headers of a parsed table to their canonical column names."""
+    renamed = {}
+    for header in table.columns:
+        column = mapping.get(canonical_key(header))
+        # keep the first occurrence when a sheet repeats a column
+        if column is not None and column not in renamed.values():
+            renamed[header] = column
+    return table[list(renamed)].rename(columns=renamed)
+
+def find_header_row(preview, mapping, key_column):
+    """
+    Returns the first row of a sheet preview holding `key_column` and at least one other
+    recognized header, None if there is none.
+    """
+    for row_number, row in enumerate(preview.itertuples(index=False, name=None)):
+        recognized = {mapping[canonical_key(value)] for value in row if not pd.isna(value) and canonical_key(value) in mapping}
+        if key_column in recognized and len(recognized) >= 2:
+            return row_number
+    return None
+
+def parse_sheets(content, columns):
+    """
+    Parses the sheets of an Excel workbook that hold `columns`.
+
+    Only a preview of each sheet is read to find its header row; sheets without the first of
+    `columns` (e.g. the field name of a data dictionary) are never parsed.
+
+    Returns:
+        list: (sheet name, table) pairs.
+    """
+    mapping = header_mapping(columns)
+    workbook = pd.ExcelFile(io.BytesIO(content))
+
+    tables = []
+    for sheet_name in workbook.sheet_names:
+        preview = workbook.parse(sheet_name, header=None, nrows=HEADER_SEARCH_ROWS)
+        header_row = find_header_row(preview, mapping, columns[0])
+        if header_row is None:
+            continue
+
+        table = workbook.parse(sheet_name, header=header_row, usecols=lambda header: canonical_key(header) in mapping)
+        tables.append((sheet_name, _select_columns(table, mapping)))
+
+    return tables
+
+def parse_table(name, content, columns):
+    """Parses csv, Excel or parquet content, only reading `columns` (missing columns are skipped)."""
+    mapping = header_mapping(columns)
+
+    def wanted(header):
+        return canonical_key(header) in mapping
+
+    if name.lower().endswith(".parquet"):
+        table = pd.read_parquet(io.BytesIO(content))
+        table = table[[header for header in table.columns if wanted(header)]]
+    elif name.lower().endswith((".xlsx", ".xlsm", ".xls")):
+        table = pd.read_excel(io.BytesIO(content), usecols=wanted)
+    else:
+        table = pd.read_csv(io.BytesIO(content), usecols=wanted)
+
+    return _select_columns(table, mapping)
+
+def to_columnar(table, categorical=()):
+    """Converts the repeated-value columns to categoricals before the table is cached."""
+    for column in categorical:
+        if column in table.columns:
+            table[column] = table[column].astype("category")
+    return table
+
+def read_table(source, columns, categorical=(), cache_dir=CACHE_DIR, normalize=None):
+    """
+    Reads the needed columns of a csv/Excel file through the columnar cache.
+
+    The first read of a file parses it and writes the result to `cache_dir` as parquet, keyed by
+    the hash of the file content (not its name or date) and the requested columns. Later reads of
+    the same content load the parquet file instead of parsing the csv/Excel again.
+
+    Parameters:
+        source (str or file-like): Path or uploaded file.
+        columns (list): Columns to read.
+        categorical (list): Columns stored with a categorical dtype.
+        normalize (callable): Adds the normalized text columns before the table is cached.
+        cache_dir (str): Cache directory, None to always parse the file.
+
+    Returns:
+        pandas.DataFrame: The requested columns, in the order of `columns`, followed by the
+        columns added by `normalize`.
+    """
+    name, content = read_source(source)
+
+    cache_path = None
+    if cache_dir:
+        key_parts = [CACHE_VERSION, *columns, "", *categorical, "", normalize.__name__ if normalize else ""]
+        key = content_hash(content + "\x1f".join(key_parts).encode("utf-8"))
+        cache_path = os.path.join(cache_dir, f"{key}.parquet")
+
+        if os.path.exists(cache_path):
+            return pd.read_parquet(cache_path)
+
+    table = parse_table(name, content, columns)
+    table = table[[column for column in columns if column in table.columns]]
+    table = to_columnar(table, categorical)
+    if normalize:
+        table = normalize(table)
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary name first so a concurrent reader never sees half a file
+        temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+        table.to_parquet(temporary_path, index=False)
+        os.replace(temporary_path, cache_path)
+        logger.info(f"Cached {name} as {cache_path}")
+
+    return table
+
+def read_standard(source, cache_dir=CACHE_DIR):
+    """Reads a PETRONAS data standard (csv or xlsx) through the columnar cache."""
+    return read_table(source, STANDARD_COLUMNS, CATEGORICAL_COLUMNS, cache_dir, normalize_standard)
+
+def read_dictionary(source, cache_dir=CACHE_DIR):
+    """Reads a data dictionary (csv, xlsx or a table written by ingest_directory) through the columnar cache."""
+    return read_table(source, DICTIONARY_COLUMNS, cache_dir=cache_dir, normalize=normalize_dictionary)
+
+def _ingest_file(path, content_hash_value):
+    """Parses one data dictionary file into the combined schema, run in a worker process."""
+    name, content = read_source(path)
+
+    if name.lower().endswith(".csv"):
+        sheets = [("", parse_table(name, content, DICTIONARY_COLUMNS))]
+    else:
+        sheets = parse_sheets(content, DICTIONARY_COLUMNS)
+
+    tables = []
+    for sheet_name, table in sheets:
+        table = table.reindex(columns=DICTIONARY_COLUMNS)
+        table = table.dropna(how="all").reset_index(drop=True)
+        table = normalize_dictionary(table)
+        table["SOURCE FILE"] = os.path.basename(name)
+        table["SOURCE SHEET"] = sheet_name
+        table["SOURCE HASH"] = content_hash_value
+        tables.append(table)
+
+    if not tables:
+        return pd.DataFrame(columns=DICTIONARY_COLUMNS + SOURCE_COLUMNS)
+
+    return pd.concat(tables, ignore_index=True)
+
+def renormalize(table):
+    """
+    Rebuilds the normalized columns of a combined table from its original text columns.
+
+    Tables ingested before normalize._to_pandas built the columns by position could hold normalized
+    text shifted to other rows whenever a sheet had blank rows. Returns (table, True when any changed).
+    """
+    columns = [normalized_column(column) for column in DICTIONARY_TEXT_COLUMNS if normalized_column(column) in table.columns]
+    rebuilt = normalize_dictionary(table.drop(columns=columns).reset_index(drop=True))
+    rebuilt = rebuilt[list(table.columns)]
+    changed = not rebuilt[columns].astype(object).equals(table[columns].reset_index(drop=True).astype(object))
+    return rebuilt, changed
+
+def ingest_directory(directory, output_path, workers=None):
+    """
+    Combines every data dictionary of a directory into one parquet table.
+
+    Each xlsx/xlsm/csv file is parsed in a process pool, reading only the sheets and columns the
+    pipeline uses. Header spellings are mapped to DICTIONARY_COLUMNS (see header_mapping) and
+    every row records its source file, sheet and content hash. Files whose content hash is
+    already in `output_path` are skipped, so re-running after adding files only parses the new ones.
+
+    The normalized columns of the rows already in `output_path` are rebuilt (see renormalize) and
+    the table rewritten when they differ.
+
+    Returns:
+        dict: number of files found, skipped, ingested and failed, rows added, and whether the
+        normalized columns of the existing rows were repaired.
+    """
+    paths = sorted({path for pattern in DICTIONARY_PATTERNS for path in glob.glob(os.path.join(directory, "**", pattern), recursive=True)})
+    # skip Excel lock files left by open workbooks
+    paths = [path for path in paths if not os.path.basename(path).startswith("~$")]
+
+    existing = None
+    repaired = False
+    ingested_hashes = set()
+    if os.path.exists(output_path):
+        existing = pd.read_parquet(output_path)
+        ingested_hashes = set(existing["SOURCE HASH"])
+        existing, repaired = renormalize(existing)
+
+    pending = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            file_hash = content_hash(f.read())
+        # the same content under two names is only ingested once
+        if file_hash not in ingested_hashes and file_hash not in pending.values():
+            pending[path] = file_hash
+
+    report = {"files found": len(paths), "files skipped": len(paths) - len(pending), "files ingested": 0, "files failed": 0, "rows added": 0, "normalized columns repaired": repaired}
+
+    tables = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_ingest_file, path, file_hash): path for path, file_hash in pending.items()}
+        for future, path in futures.items():
+            try:
+                table = future.result()
+            except Exception as e:
+                logger.error(f"Could not ingest {path}: {str(e)}")
+                report["files failed"] += 1
+                continue
+
+            logger.info(f"Ingested {path}: {len(table)} rows")
+            report["files ingested"] += 1
+            report["rows added"] += len(table)
+            tables.append(table)
+
+    if tables or repaired:
+        combined = pd.concat(([existing.astype(object)] if existing is not None else []) + [table.astype(object) for table in tables], ignore_index=True)
+        combined = to_columnar(combined, ["DATA DOMAIN ", "SOURCE FILE", "SOURCE SHEET", "SOURCE HASH"])
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        temporary_path = f"{output_path}.{os.getpid()}.tmp"
+        combined.to_parquet(temporary_path, index=False)
+        os.replace(temporary_path, output_path)
+
+    return report
@@ -0,0 +1,495 @@
+import argparse
+import importlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import closing
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOBS_DB_PATH = "results/jobs.sqlite"
+# job results, and the uploaded files jobs read (the Streamlit upload is gone after a refresh)
+JOBS_DIR = "results/jobs"
+UPLOADS_DIR = "results/uploads"
+
+JOB_STATUSES = ["queued", "running", "done", "failed", "cancelled"]
+FINISHED_STATUSES = ["done", "failed", "cancelled"]
+
+# "module:function" running each kind of job, imported by the worker on first use
+JOB_HANDLERS = {
+    "compare": "main_streamlit_finalized:run_compare_job",
+    "bulk": "bulk:run_bulk_job",
+}
+
+# scheduling classes, served in this order: short interactive comparisons go before bulk runs
+PRIORITIES = ["interactive", "bulk"]
+JOB_PRIORITIES = {"compare": "interactive", "bulk": "bulk"}
+DEFAULT_USER = "anonymous"
+
+# per-user quotas: jobs of one user running at the same time, and waiting in the queue
+MAX_RUNNING_JOBS_PER_USER = 2
+MAX_QUEUED_JOBS_PER_USER = 5
+
+# seconds between two looks at the queue, and between two progress/cancel updates of a job
+POLL_SECONDS = 1
+# jobs run at the same time by the worker, they all share the same scoring pool
+MAX_RUNNING_JOBS = 4
+# threads of the shared scoring pool, and comparisons queued per job ahead of them
+SCORING_WORKERS = 2
+MAX_IN_FLIGHT = 2 * SCORING_WORKERS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result_path TEXT,
+    error TEXT
+)
+"""
+
+class QuotaExceededException(Exception):
+    pass
+
+def connect(db_path=JOBS_DB_PATH):
+    """Opens the job store, creating it if needed. Statements commit on their own (autocommit), close it after use."""
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    connection = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    # readers (the Streamlit sessions) don't block the worker's writes
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(SCHEMA)
+    return connection
+
+def _job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    return job
+
+def store_upload(name, content):
+    """Saves an uploaded file under its content hash so a job can read it later; returns its path."""
+    from ingest import content_hash
+
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    path = os.path.join(UPLOADS_DIR, content_hash(content) + os.path.splitext(name)[1].lower())
+    if not os.path.exists(path):
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(content)
+        os.replace(temporary_path, path)
+    return path
+
+def submit_job(kind, params, user=DEFAULT_USER, db_path=JOBS_DB_PATH):
+    """
+    Queues a job of a kind of JOB_HANDLERS; `params` must be JSON serializable. Returns the job id.
+
+    An optional params["comparisons"] (the planned size of the job) is used to estimate the wait
+    of the jobs queued behind it, see queue_position.
+
+    Raises:
+        QuotaExceededException: when the user already has MAX_QUEUED_JOBS_PER_USER jobs waiting.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}', choose one of {list(JOB_HANDLERS)}")
+
+    job_id = uuid.uuid4().hex
+    with closing(connect(db_path)) as connection:
+        queued = connection.execute("SELECT COUNT(*) FROM jobs WHERE user = ? AND status = 'queued'", (user,)).fetchone()[0]
+        if queued >= MAX_QUEUED_JOBS_PER_USER:
+            raise QuotaExceededException(f"{user} already has {queued} jobs waiting, please wait for one of them to start or cancel one")
+        connection.execute(
+            "INSERT INTO jobs (id, kind, user, status, params, created) VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, kind, user, json.dumps(params), time.time()),
+        )
+    logger.info(f"Queued {kind} job {job_id} of {user}")
+    return job_id
+
+def get_job(job_id, db_path=JOBS_DB_PATH):
+    with closing(connect(db_path)) as connection:
+        return _job(connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+def list_jobs(user=None, db_path=JOBS_DB_PATH, limit=50):
+    """Most recent jobs first, of one user or of everyone."""
+    with closing(connect(db_path)) as connection:
+        if user is None:
+            rows = connection.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        else:
+            rows = connection.execute("SELECT * FROM jobs WHERE user = ? ORDER BY created DESC LIMIT ?", (user, limit)).fetchall()
+    return [_job(row) for row in rows]
+
+def cancel_job(job_id, db_path=JOBS_DB_PATH):
+    """Cancels a queued job right away; a running job stops at its next progress update and keeps its partial result."""
+    with closing(connect(db_path)) as connection:
+        connection.execute("UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'", (time.time(), job_id))
+        connection.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+
+def _claim_order(queued, running):
+    """
+    Queued jobs in the order they are started: interactive jobs first, then the jobs of the users
+    with the fewest jobs running (and queued ahead), oldest first. One user's many jobs are thus
+    interleaved with the other users' jobs instead of starting one after the other.
+
+    Parameters:
+        queued (list): queued job rows, oldest first.
+        running (dict): number of running jobs of each user.
+    """
+    ranks = []
+    ahead = defaultdict(int, running)
+    for created_rank, row in enumerate(queued):
+        ranks.append((PRIORITIES.index(JOB_PRIORITIES.get(row["kind"], "bulk")), ahead[row["user"]], created_rank))
+        ahead[row["user"]] += 1
+    return [row for _, row in sorted(zip(ranks, queued), key=lambda pair: pair[0])]
+
+def _queue_state(connection):
+    queued = connection.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created").fetchall()
+    running = dict(connection.execute("SELECT user, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY user").fetchall())
+    return queued, running
+
+def claim_next_job(db_path=JOBS_DB_PATH):
+    """
+    Marks the next queued job (see _claim_order) as running and returns it, or None when no queued
+    job may start: the queue is empty or its users already run MAX_RUNNING_JOBS_PER_USER jobs.
+    """
+    with closing(connect(db_path)) as connection:
+        # an immediate transaction, so two workers never claim the same job
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            queued, running = _queue_state(connection)
+            row = next((row for row in _claim_order(queued, running) if running.get(row["user"], 0) < MAX_RUNNING_JOBS_PER_USER), None)
+            if row is not None:
+                connection.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), row["id"]))
+    return _job(row)
+
+def job_throughput(db_path=JOBS_DB_PATH, recent_jobs=20):
+    """Comparisons per second of the worker over its recent finished jobs, None before the first one."""
+    with closing(connect(db_path)) as connection:
+        rows = connection.execute(
+            "SELECT done, finished - started FROM jobs WHERE status IN ('done', 'cancelled') AND done > 0 AND started IS NOT NULL "
+            "ORDER BY finished DESC LIMIT ?",
+            (recent_jobs,),
+        ).fetchall()
+    seconds = sum(row[1] for row in rows)
+    return sum(row[0] for row in rows) / seconds if seconds > 0 else None
+
+def queue_position(job_id, db_path=JOBS_DB_PATH):
+    """
+    Where a queued job stands in the queue.
+
+    The wait is estimated from the comparisons left in the running jobs and planned for the jobs
+    started before it (their params["comparisons"]), at the throughput of the recent jobs. Jobs
+    share the scoring pool, so this is an upper bound once the job is running alongside them.
+
+    Returns:
+        tuple: (jobs started before it, estimated wait in seconds or None when unknown), or None
+        when the job is not queued.
+    """
+    with closing(connect(db_path)) as connection:
+        queued, running = _queue_state(connection)
+        remaining = connection.execute("SELECT COALESCE(SUM(MAX(total - done, 0)), 0) FROM jobs WHERE status = 'running'").fetchone()[0]
+
+    order = _claim_order(queued, running)
+    position = next((i for i, row in enumerate(order) if row["id"] == job_id), None)
+    if position is None:
+        return None
+
+    planned = sum(json.loads(row["params"]).get("comparisons", 0) for row in order[:position])
+    throughput = job_throughput(db_path)
+    wait_seconds = (remaining + planned) / throughput if throughput else None
+    return position, wait_seconds
+
+def requeue_interrupted_jobs(db_path=JOBS_DB_PATH):
+    """Puts back in the queue the jobs that were running when the worker stopped."""
+    with closing(connect(db_path)) as connection:
+        count = connection.execute("UPDATE jobs SET status = 'queued', started = NULL, done = 0 WHERE status = 'running'").rowcount
+    if count:
+        logger.info(f"Re-queued {count} interrupted jobs")
+
+def _finish(job_id, status, db_path, result_path=None, error=None):
+    with closing(connect(db_path)) as connection:
+        connection.execute(
+            "UPDATE jobs SET status = ?, finished = ?, result_path = ?, error = ? WHERE id = ?",
+            (status, time.time(), result_path, error, job_id),
+        )
+
+class RateLimiter:
+    """Spaces calls so that at most `calls_per_minute` start in any minute, across every thread."""
+    def __init__(self, calls_per_minute=None):
+        self.interval = 60 / calls_per_minute if calls_per_minute else 0
+        self.next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(slot - now)
+
+class ScoringPool:
+    """
+    Scoring threads shared by every user, so all their comparisons together stay under one rate limit.
+
+    Calls wait in one queue per (priority, user). A free thread takes the next call of the highest
+    priority (see PRIORITIES) waiting; within a priority, the user with the fewest calls served
+    goes first (fair queuing), so one user's large run is interleaved with the other users'
+    comparisons instead of making them wait until it is done. A user who was idle starts level
+    with the users already waiting, not with the credit of the time they were idle.
+
+    Example usage:
+        pool = ScoringPool(workers=2, calls_per_minute=300)
+        future = pool.submit(score_fn, "Pump speed", "PUMP SPEED", user="alice", priority="interactive")
+        score = future.result()
+    """
+    def __init__(self, workers=SCORING_WORKERS, calls_per_minute=None):
+        self.workers = workers
+        self.limiter = RateLimiter(calls_per_minute)
+        self.queues = defaultdict(deque)
+        self.served = defaultdict(int)
+        # completion times of the recent calls, to measure the throughput
+        self.completions = deque(maxlen=100)
+        self._condition = threading.Condition()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"scoring-{i}", daemon=True).start()
+
+    def submit(self, fn, *args, user=DEFAULT_USER, priority="bulk"):
+        """Queues fn(*args) for `user`; returns a Future, which can be cancelled until a thread picks it up."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}', choose one of {PRIORITIES}")
+
+        future = Future()
+        with self._condition:
+            if not any(self.queues[(level, user)] for level in PRIORITIES):
+                # level with the users waiting, so an idle user doesn't take over the pool
+                waiting = [self.served[other] for (_, other), queue in self.queues.items() if queue and other != user]
+                if waiting:
+                    self.served[user] = max(self.served[user], min(waiting))
+            self.queues[(priority, user)].append((future, fn, args))
+            self._condition.notify()
+        return future
+
+    def map(self, fn, items, user=DEFAULT_USER, priority="interactive"):
+        """Calls fn(item) for every item, like Executor.map, and returns the results in order."""
+        futures = [self.submit(fn, item, user=user, priority=priority) for item in items]
+        return [future.result() for future in futures]
+
+    def _next_call(self):
+        waiting = [(PRIORITIES.index(priority), self.served[user], priority, user) for (priority, user), queue in self.queues.items() if queue]
+        if not waiting:
+            return None
+        _, _, priority, user = min(waiting)
+        self.served[user] += 1
+        return self.queues[(priority, user)].popleft()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                call = self._next_call()
+                while call is None:
+                    self._condition.wait()
+                    call = self._next_call()
+
+            future, fn, args = call
+            # skipped when cancelled while it was waiting
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            self.limiter.wait()
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            self.completions.append(time.monotonic())
+
+    def calls_ahead(self, user, priority="interactive"):
+        """Calls of the other users that a new call of `user` would wait for, cancelled calls included."""
+        with self._condition:
+            levels = PRIORITIES[:PRIORITIES.index(priority) + 1]
+            own = len(self.queues[(priority, user)])
+            ahead = 0
+            for (level, other), queue in self.queues.items():
+                if other == user:
+                    continue
+                if level in levels[:-1]:
+                    ahead += len(queue)
+                elif level == priority:
+                    # round robin: each other user gets about as many turns as this one has calls waiting
+                    ahead += min(len(queue), own + 1)
+            return ahead
+
+    def throughput(self):
+        """Calls completed per second over the recent calls, None before there are two."""
+        completions = list(self.completions)
+        if len(completions) < 2 or completions[-1] == completions[0]:
+            return None
+        return (len(completions) - 1) / (completions[-1] - completions[0])
+
+class Job:
+    """
+    A running job as seen by its handler: its parameters, progress reporting and cancellation.
+
+    Example usage (a handler in JOB_HANDLERS):
+        def run_compare_job(job):
+            scores = job.map(score_fn, pairs)
+            path = job.result_path(".csv")
+            ...
+            return path
+    """
+    def __init__(self, row, pool, db_path=JOBS_DB_PATH):
+        self.id = row["id"]
+        self.user = row["user"]
+        self.priority = JOB_PRIORITIES.get(row["kind"], "bulk")
+        self.params = row["params"]
+        self.pool = pool
+        self.db_path = db_path
+        self._cancelled = False
+        self._last_update = 0.0
+
+    def result_path(self, extension):
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        return os.path.join(JOBS_DIR, f"{self.id}{extension}")
+
+    def update(self, done, total, force=False):
+        """Saves the progress (at most once per POLL_SECONDS) and picks up a cancel request."""
+        now = time.monotonic()
+        if not force and now - self._last_update < POLL_SECONDS:
+            return
+        self._last_update = now
+        with closing(connect(self.db_path)) as connection:
+            connection.execute("UPDATE jobs SET done = ?, total = ? WHERE id = ?", (done, total, self.id))
+            row = connection.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (self.id,)).fetchone()
+        self._cancelled = bool(row["cancel_requested"])
+
+    def cancelled(self):
+        return self._cancelled
+
+    def map(self, fn, items):
+        """
+        Calls fn(*item) for every item on the shared scoring pool, at most MAX_IN_FLIGHT at a time,
+        queued under the job's user and priority.
+
+        Returns:
+            list: results in the order of `items`; None for the items not scored because the job
+            was cancelled.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        pending = {}
+        queued = iter(enumerate(items))
+        done = 0
+
+        def dispatch():
+            for i, item in queued:
+                pending[self.pool.submit(fn, *item, user=self.user, priority=self.priority)] = i
+                if len(pending) >= MAX_IN_FLIGHT:
+                    return
+
+        self.update(0, len(items), force=True)
+        dispatch()
+        while pending:
+            completed, _ = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in completed:
+                results[pending.pop(future)] = future.result()
+                done += 1
+
+            self.update(done, len(items))
+            if self.cancelled():
+                # the queued calls are dropped, the ones already being scored finish in the background
+                for future in pending:
+                    future.cancel()
+                break
+            dispatch()
+
+        self.update(done, len(items), force=True)
+        return results
+
+def _handler(kind):
+    module_name, function_name = JOB_HANDLERS[kind].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def run_job(row, pool, db_path=JOBS_DB_PATH):
+    job = Job(row, pool, db_path)
+    start_time = time.time()
+    try:
+        result_path = _handler(row["kind"])(job)
+    except Exception as e:
+        logger.exception(f"Job {job.id} failed")
+        _finish(job.id, "failed", db_path, error=str(e))
+        return
+
+    status = "cancelled" if job.cancelled() else "done"
+    _finish(job.id, status, db_path, result_path=result_path)
+    logger.info(f"Job {job.id} {status} in {time.time() - start_time:.1f} seconds")
+
+def run_worker(db_path=JOBS_DB_PATH, workers=SCORING_WORKERS, calls_per_minute=None, max_jobs=MAX_RUNNING_JOBS):
+    """
+    Runs queued jobs until interrupted.
+
+    Up to `max_jobs` jobs run at once (at most MAX_RUNNING_JOBS_PER_USER per user), each in its
+    own thread; their comparisons all go through one ScoringPool of `workers` threads limited to
+    `calls_per_minute`, shared fairly between the users. Run a single worker per job store.
+    """
+    requeue_interrupted_jobs(db_path)
+    pool = ScoringPool(workers, calls_per_minute)
+    running = {}
+
+    logger.info(f"Worker started on {db_path}: {workers} scoring threads, {calls_per_minute or 'unlimited'} calls per minute")
+    while True:
+        running = {job_id: thread for job_id, thread in running.items() if thread.is_alive()}
+        while len(running) < max_jobs:
+            row = claim_next_job(db_path)
+            if row is None:
+                break
+            logger.info(f"Starting {row['kind']} job {row['id']} of {row['user']}")
+            thread = threading.Thread(target=run_job, args=(row, pool, db_path), name=f"job-{row['id'][:8]}", daemon=True)
+            thread.start()
+            running[row["id"]] = thread
+        time.sleep(POLL_SECONDS)
+
+def main():
+    parser = argparse.ArgumentParser(description="Background jobs of the CDE Advisor app.")
+    parser.add_argument("--db", default=JOBS_DB_PATH, help="job store (SQLite)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = subparsers.add_parser("worker", help="run queued jobs until interrupted")
+    worker_parser.add_argument("--workers", type=int, default=SCORING_WORKERS, help="scoring threads shared by every job")
+    worker_parser.add_argument("--calls-per-minute", type=int, help="rate limit of the scoring calls of all jobs together")
+    worker_parser.add_argument("--max-jobs", type=int, default=MAX_RUNNING_JOBS, help="jobs run at the same time")
+
+    list_parser = subparsers.add_parser("list", help="show the most recent jobs")
+    list_parser.add_argument("--user", help="only the jobs of this user")
+
+    cancel_parser = subparsers.add_parser("cancel", help="cancel a job")
+    cancel_parser.add_argument("job_id")
+
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        run_worker(args.db, args.workers, args.calls_per_minute, args.max_jobs)
+    elif args.command == "list":
+        for job in list_jobs(args.user, args.db):
+            print(f"{job['id']}  {job['kind']:8} {job['user']:12} {job['status']:9} {job['done']}/{job['total']}")
+    else:
+        cancel_job(args.job_id, args.db)
+
+if __name__ == "__main__":
+    main()
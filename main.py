@@ -5,6 +5,10 @@ import logging
 from concurrent.futures import ProcessPoolExecutor
 from functools import partial
 
+from dictionary_filter import DEFAULT_RULES, apply_rules
+from ingest import read_dictionary, read_standard
+from normalize import DICTIONARY_TEXT_COLUMNS, normalize_dictionary, normalized_column
+
 # set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -133,11 +137,25 @@ def remove_duplicates(df, column_name):
     return df_unique
 
 def preprocess_data(data):
-    data["FIELD NAME/DATA ATTRIBUTE(S)"] = data["FIELD NAME/DATA ATTRIBUTE(S)"].str.lower().str.replace(r'[^a-zA-Z\s]', ' ', regex=True)
-    data["FIELD DESCRIPTION"] = data["FIELD DESCRIPTION"].str.replace(r'System generated field:', '', case=False, regex=True) # only for field desc
-    data["FIELD DESCRIPTION"] = data["FIELD DESCRIPTION"].str.lower().str.replace(r'[^a-zA-Z\s]', ' ', regex=True)
-    data["TABLE NAME"] = data["TABLE NAME"].str.lower().str.replace(r'[^a-zA-Z\s]', ' ', regex=True)
-    data["TABLE DESCRIPTION/SUB FOLDER NAME "] = data["TABLE DESCRIPTION/SUB FOLDER NAME "].str.lower().str.replace(r'[^a-zA-Z\s]', ' ', regex=True)
+    # use the normalized columns kept by the ingestion cache, only normalizing when they are missing
+    normalize_dictionary(data)
+    for column in DICTIONARY_TEXT_COLUMNS:
+        data[column] = data[normalized_column(column)]
+
+def filter_dictionary(data1, rules=DEFAULT_RULES):
+    """
+    Keeps the critical data elements of a data dictionary that have a usable field description.
+
+    By default rows not flagged "Yes" in "CRITICAL DATA ELEMENT (CDE)" are dropped, as are rows whose
+    "FIELD DESCRIPTION" is empty or mentions a generic term such as 'key' or 'date'. See
+    dictionary_filter.DEFAULT_RULES for the rule format.
+    """
+    data1, report = apply_rules(data1, rules)
+
+    for name, hits in report.items():
+        logger.info(f"Dictionary filter - {name}: {hits}")
+
+    return data1.reset_index()
 
 def main():
 
@@ -145,10 +163,10 @@ def main():
 
     # load and read csv for both data dictionary and data standard
     data1_path = "data/Data Document PRPC Track2- GE APM Ver.01 - zarif.csv"
-    data1 = pd.read_csv(data1_path)
+    data1 = read_dictionary(data1_path)
 
     data2_path = "data/PETRONAS Data Standard - All -  July 2023.csv" 
-    data2 = pd.read_csv(data2_path)
+    data2 = read_standard(data2_path)
 
     # use remove duplicates
     # column_to_check = "FIELD NAME/DATA ATTRIBUTE(S)"
@@ -163,15 +181,8 @@ def main():
     # preprocess data1
     preprocess_data(data1)
 
-    # List of strings to exclude
-    strings_to_exclude = ['key', 'description', 'date', 'status', 'code', 'ID', 'System', 'Number', 'Label', 'Caption', 'NaN']
-
-    # Combine strings into a regular expression pattern
-    exclude_pattern = '|'.join(map(re.escape, strings_to_exclude))
-
     # Filter data dictionary
-    data1 = data1[data1["CRITICAL DATA ELEMENT (CDE)"] == "Yes"]
-    data1 = data1[~(data1["FIELD DESCRIPTION"].str.contains(exclude_pattern, case=False, na=False) | data1["FIELD DESCRIPTION"].isna())].reset_index()
+    data1 = filter_dictionary(data1)
     # data1 = data1[data1["FIELD NAME/DATA ATTRIBUTE(S)" == "MI_EQUIP000_CAT_PROF_C"]]
     print(data1["FIELD DESCRIPTION"])
 
@@ -1,16 +1,14 @@
 import re
 import time
 import logging
-from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 import streamlit as st
 import openai
-import nltk
-from nltk.stem import PorterStemmer
-from nltk.corpus import stopwords
 
-nltk.download('stopwords')
+from app_cache import jaccard_ranking, load_standard, session_user, shared_scoring_pool, standard_key
+from normalize import LETTERS_COLUMN
+from result_cache import normalize_input
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -27,21 +25,6 @@ LOG_PROBS = 0
 class RateLimitExceededException(Exception):
     pass
 
-def jaccard_similarity(str1, str2):
-    # Remove punctuations, symbols, and convert to lowercase
-    str1 = re.sub(r'[^\w\s]', '', str1).lower()
-    str2 = re.sub(r'[^\w\s]', '', str2).lower()
-
-    # Create sets of individual letters
-    set1 = set(''.join(str1.split()))
-    set2 = set(''.join(str2.split()))
-
-    # Calculate Jaccard similarity
-    intersection = len(set1.intersection(set2))
-    union = len(set1.union(set2))
-    similarity = intersection / union if union > 0 else 0
-    return similarity
-
 def configure_openai():
     openai.api_type = "azure"
     openai.api_base = "https://ptsg5edhopenai01.openai.azure.com/"
@@ -158,8 +141,9 @@ def main():
             st.success("File uploaded successfully!")
             st.write("")
 
-            # read excel file
-            standard = pd.read_excel(uploaded_file)
+            # read excel file, parsed once per content and shared by every session
+            standard_hash = standard_key(uploaded_file)
+            standard = load_standard(standard_hash, uploaded_file)
 
             # Create a dropdown for the user to choose from multiple values
             filter_standard_options = standard["DATA DOMAIN"].unique().tolist()
@@ -210,10 +194,8 @@ def main():
 
                     start_time = time.time()
 
-                    # Use ThreadPoolExecutor for parallel processing
-                    with ThreadPoolExecutor(max_workers = 2) as executor:
-                        # Use the executor to process each data element concurrently, semantic similarity matching
-                        scores = list(executor.map(lambda x: openai_similarity(data_input, x[0], x[1], x[2], x[3]), standard_info))
+                    # Use the scoring threads shared by every session, this user's comparisons take turns with the other users'
+                    scores = shared_scoring_pool().map(lambda x: openai_similarity(data_input, x[0], x[1], x[2], x[3]), standard_info, user=session_user())
 
                     # Sort the scores in descending order based on the inner tuple's second element
                     sorted_scores = sorted(scores, key=lambda x: x[2], reverse=True)
@@ -230,10 +212,10 @@ def main():
 
             else:
                 # Calculate Jaccard similarity scores for each data element in 'standard_filtered'
-                jaccard_scores = standard_filtered['DATA ELEMENT'].apply(lambda elem: jaccard_similarity(data_input, elem))
+                jaccard_scores = jaccard_ranking(standard_hash, filter_standard, normalize_input(data_input), standard_filtered[LETTERS_COLUMN])
                 
                 # Add the Jaccard similarity scores as a new column to 'standard_filtered'
-                standard_filtered['JACCARD_SCORE'] = jaccard_scores
+                standard_filtered = standard_filtered.assign(JACCARD_SCORE=jaccard_scores)
 
                 # Sort 'standard_filtered' based on Jaccard similarity scores in descending order
                 sorted_standard_filtered = standard_filtered.sort_values(by='JACCARD_SCORE', ascending=False).reset_index().head(150)
@@ -259,10 +241,8 @@ def main():
 
                     start_time = time.time()
 
-                    # Use ThreadPoolExecutor for parallel processing
-                    with ThreadPoolExecutor(max_workers = 2) as executor:
-                        # Use the executor to process each data element concurrently, semantic similarity matching
-                        scores = list(executor.map(lambda x: openai_similarity(data_input, x[0], x[1], x[2], x[3]), standard_info))
+                    # Use the scoring threads shared by every session, this user's comparisons take turns with the other users'
+                    scores = shared_scoring_pool().map(lambda x: openai_similarity(data_input, x[0], x[1], x[2], x[3]), standard_info, user=session_user())
 
                     # Sort the scores in descending order based on the inner tuple's second element
                     sorted_scores = sorted(scores, key=lambda x: x[2], reverse=True)
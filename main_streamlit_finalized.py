@@ -1,16 +1,24 @@
+import os
 import re
 import time
 import logging
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, wait
 
 import pandas as pd
 import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import openai
-import nltk
-from nltk.stem import PorterStemmer
-from nltk.corpus import stopwords
 
-nltk.download('stopwords')
+from app_cache import jaccard_ranking, load_dictionary_units, load_standard, session_user, shared_result_cache, shared_scoring_pool, standard_key, warm_standard
+from domain_index import domain_options, filter_domain
+from ingest import read_standard
+from job_queue import FINISHED_STATUSES, SCORING_WORKERS, QuotaExceededException, cancel_job, get_job, queue_position, store_upload, submit_job
+from normalize import LETTERS_COLUMN
+from result_cache import normalize_input, result_key
+from scorers import SCORER_NAMES
+from planner import CallCounter, plan_run, record_run, PREFILTER_TOP
+from topk import TopKAccumulator
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -20,21 +28,18 @@ logger = logging.getLogger(__name__)
 MAX_TOKENS = 50
 TEMPERATURE = 0.5
 NUM_COMPLETIONS = 1
-
-def jaccard_similarity(str1, str2):
-    # Remove punctuations, symbols, and convert to lowercase
-    str1 = re.sub(r'[^\w\s]', '', str1).lower()
-    str2 = re.sub(r'[^\w\s]', '', str2).lower()
-
-    # Create sets of individual letters
-    set1 = set(''.join(str1.split()))
-    set2 = set(''.join(str2.split()))
-
-    # Calculate Jaccard similarity
-    intersection = len(set1.intersection(set2))
-    union = len(set1.union(set2))
-    similarity = intersection / union if union > 0 else 0
-    return similarity
+MAX_WORKERS = 2
+# comparisons queued ahead of the workers; the rest are only submitted as these complete, so a
+# cancelled run leaves little to cancel
+MAX_IN_FLIGHT = 2 * MAX_WORKERS
+# seconds between checks that the browser session is still open
+SESSION_CHECK_SECONDS = 1
+# seconds between two looks at a background job's progress
+JOB_POLL_SECONDS = 2
+
+# scorer settings of each model, part of the result cache key so a prompt change is never answered from the cache
+OPENAI_CONFIG = {"engine": "CDE-Advisor", "prompt": "v2", "max_tokens": 15, "temperature": 0}
+JACCARD_OPENAI_CONFIG = {"engine": "CDE-Advisor", "prompt": "v1", "max_tokens": MAX_TOKENS, "temperature": TEMPERATURE, "prefilter_top": PREFILTER_TOP}
 
 def configure_openai():
     openai.api_type = "azure"
@@ -156,6 +161,361 @@ def openai_similarity_v2(word1, word2, word3, group, entity):
     except Exception as e:
         return word1, word2, 0, str(e)
 
+def show_matches(scores, num_matches):
+    # Sort the scores in descending order based on the inner tuple's second element
+    sorted_scores = sorted(scores, key=lambda x: x[2], reverse=True)
+
+    # Display the top highest scored comparisons and their corresponding data elements
+    for i, (word1, word2, score, word3, group, entity) in enumerate(sorted_scores[:num_matches]):
+        st.text(f"{i+1}. Data Element: {word2}\n Similarity Score: {score}\n Glossary: {word3}. \n Data Group: {group}\n Data Entity: {entity}\n")
+
+# what the user compares with the data standard
+COMPARE_MODES = ["A data attribute", "A data dictionary"]
+
+# scoring function, prompt and settings of each model
+MODEL_SCORERS = {
+    "OpenAI": (openai_similarity_v2, construct_prompt_v2, OPENAI_CONFIG),
+    "Jaccard + OpenAI": (openai_similarity, construct_prompt, JACCARD_OPENAI_CONFIG),
+}
+
+# columns of the matches written by a background job, in the order of the openai_similarity tuples
+MATCH_COLUMNS = ["DATA ATTRIBUTE", "DATA ELEMENT", "SIMILARITY SCORE", "BUSINESS DEFINITION/ GLOSSARY", "DATA GROUP", "DATA ENTITY"]
+
+def candidate_info(standard_filtered, model, data_input, standard_hash, domain, features=None):
+    """
+    Returns the (data element, glossary, data group, data entity) of the data elements a model
+    compares: every data element of the domain for "OpenAI", the PREFILTER_TOP closest ones by
+    Jaccard similarity for "Jaccard + OpenAI".
+
+    `features` are the precomputed domain_index.DomainFeatures of the domain, when available.
+    """
+    if model != "Jaccard + OpenAI" and features is not None:
+        return features.info
+
+    if model == "Jaccard + OpenAI":
+        # Calculate Jaccard similarity scores for each data element in 'standard_filtered'
+        jaccard_scores = jaccard_ranking(standard_hash, domain, normalize_input(data_input), standard_filtered[LETTERS_COLUMN], features)
+
+        # Sort 'standard_filtered' based on Jaccard similarity scores in descending order
+        standard_filtered = standard_filtered.assign(JACCARD_SCORE=jaccard_scores)
+        standard_filtered = standard_filtered.sort_values(by='JACCARD_SCORE', ascending=False).reset_index().head(PREFILTER_TOP)
+
+    return list(zip(
+        standard_filtered["DATA ELEMENT"],
+        standard_filtered["BUSINESS DEFINITION/ GLOSSARY"],
+        standard_filtered["DATA GROUP"],
+        standard_filtered["DATA ENTITY"],
+    ))
+
+def run_compare_job(job):
+    """Runs a background "compare" job (see job_queue) like the Compare button; returns the path of its matches csv."""
+    params = job.params
+    configure_openai()
+
+    standard_filtered = filter_domain(read_standard(params["standard_path"]), params["domain"])
+    standard_info = candidate_info(standard_filtered, params["model"], params["data_input"], params["standard_hash"], params["domain"])
+    score_fn = MODEL_SCORERS[params["model"]][0]
+
+    scores = job.map(lambda *x: score_fn(params["data_input"], *x), standard_info)
+
+    # failed comparisons come back as (word1, word2, 0, error), cancelled ones as None
+    matches = [score for score in scores if score is not None and len(score) == 6]
+    result = pd.DataFrame(matches, columns=MATCH_COLUMNS).sort_values("SIMILARITY SCORE", ascending=False, kind="stable")
+
+    result_path = job.result_path(".csv")
+    result.to_csv(result_path, index=False)
+    return result_path
+
+def job_param():
+    # st.query_params replaces the experimental query parameter functions in newer Streamlit releases
+    if hasattr(st, "query_params"):
+        return st.query_params.get("job")
+    return st.experimental_get_query_params().get("job", [None])[0]
+
+def set_job_param(job_id):
+    if hasattr(st, "query_params"):
+        if job_id:
+            st.query_params["job"] = job_id
+        else:
+            st.query_params.pop("job", None)
+    else:
+        st.experimental_set_query_params(**({"job": job_id} if job_id else {}))
+
+def queue_job(kind, params):
+    # follow the job from this page, unless the user's quota of waiting jobs is used up; returns
+    # False when the job was refused (on success the page is re-run and this never returns)
+    try:
+        set_job_param(submit_job(kind, params, user=session_user()))
+    except QuotaExceededException as e:
+        st.error(f"**{e}.**")
+        return False
+    st.rerun()
+    return True
+
+def start_comparison(background, job_params, compare):
+    """
+    Queues the comparison as a background job (with the params returned by `job_params`) when it
+    runs in the background, otherwise runs `compare` in this page.
+
+    A job refused by the per-user quota is not run in the page instead, or the quota would not
+    limit the shared scoring pool at all.
+
+    Returns:
+        bool: False when the job was refused.
+    """
+    if background:
+        return queue_job("compare", job_params())
+    compare()
+    return True
+
+def format_wait(seconds):
+    if seconds is None:
+        return "unknown"
+    if seconds < 60:
+        return f"{seconds:.0f} seconds"
+    return f"{seconds / 60:.0f} minutes"
+
+def show_bulk_form(uploaded_file, standard, standard_hash, domain):
+    """Uploads a data dictionary and submits all its attributes as one background "bulk" job (see bulk.py)."""
+    dictionary_file = st.file_uploader("**Please upload the Data Dictionary**", type = ["xlsx", "csv"])
+    if dictionary_file is None:
+        return
+
+    use_dictionary_domains = st.checkbox("Compare each attribute with the data domain given in the data dictionary", value=True)
+    scorer = st.selectbox("**Choose Model**", SCORER_NAMES, index = 0)
+    prefilter = st.checkbox(f"Only compare the {PREFILTER_TOP} closest data elements by Jaccard similarity", value=scorer == "openai")
+    top_k = st.slider("**Select the number of top matches kept per attribute (between 1 and 10)**", min_value=1, max_value=10, value=3)
+
+    dictionary_path = store_upload(dictionary_file.name, dictionary_file.getvalue())
+    bulk_domain = None if use_dictionary_domains else domain
+    units = load_dictionary_units(dictionary_path, bulk_domain)
+    st.write(f"{len(units)} distinct data attributes to compare.")
+
+    # estimate the size of the job before it is submitted
+    prompt_overhead_chars, max_completion_tokens = 0, 0
+    if scorer == "openai":
+        # prompt of the batch scorer (main.py), not the one of this app
+        from main import MAX_TOKENS as BATCH_MAX_TOKENS, construct_prompt as batch_construct_prompt
+        prompt_overhead_chars, max_completion_tokens = len(batch_construct_prompt("", "")), BATCH_MAX_TOKENS
+    plan = plan_run(units, standard, scorer, SCORING_WORKERS, prompt_overhead_chars, max_completion_tokens, prefilter_top=PREFILTER_TOP if prefilter else None)
+    show_plan(plan)
+
+    if st.button("Submit"):
+        params = {
+            "dictionary_path": dictionary_path,
+            "dictionary_name": dictionary_file.name,
+            "standard_path": store_upload(uploaded_file.name, uploaded_file.getvalue()),
+            "standard_hash": standard_hash,
+            "domain": bulk_domain,
+            "scorer": scorer,
+            "prefilter_top": PREFILTER_TOP if prefilter else None,
+            "top_k": top_k,
+            "comparisons": plan["comparisons"],
+        }
+        queue_job("bulk", params)
+
+def show_bulk_result(job):
+    # summary sheet of the result workbook, plus the workbook and every score to download
+    summary = pd.read_excel(job["result_path"], sheet_name="summary")
+    st.dataframe(summary, hide_index=True)
+
+    with open(job["result_path"], "rb") as f:
+        st.download_button("Download summary and top matches (xlsx)", data=f.read(), file_name=f"result_{job['id'][:8]}.xlsx")
+
+    scores_path = os.path.splitext(job["result_path"])[0] + ".parquet"
+    if os.path.exists(scores_path):
+        with open(scores_path, "rb") as f:
+            st.download_button("Download all scores (parquet)", data=f.read(), file_name=f"scores_{job['id'][:8]}.parquet")
+
+def show_job(job_id):
+    """Shows a background job: its progress while it runs (polling the job store), its matches once finished."""
+    st.divider()
+    job = get_job(job_id)
+    if job is None:
+        st.warning(f"Background job {job_id} not found.")
+        set_job_param(None)
+        return
+
+    params = job["params"]
+    st.header("Background Job:")
+    if job["kind"] == "bulk":
+        domain = params["domain"] or "own"
+        st.write(f"Every attribute of '{params['dictionary_name']}' against its {domain} data domain ({params['scorer']}): **{job['status']}**")
+    else:
+        st.write(f"'{params['data_input']}' against the {params['domain']} data domain ({params['model']}): **{job['status']}**")
+
+    if job["status"] == "failed":
+        st.error(job["error"])
+
+    if job["result_path"] and os.path.exists(job["result_path"]):
+        if job["kind"] == "bulk":
+            show_bulk_result(job)
+        else:
+            result = pd.read_csv(job["result_path"])
+            show_matches(list(result.itertuples(index=False, name=None)), params["num_matches"])
+            st.download_button("Download all scores", data=result.to_csv(index=False), file_name=f"matches_{job_id[:8]}.csv", mime="text/csv")
+
+        if job["status"] == "cancelled":
+            st.caption(f"Cancelled after {job['done']}/{job['total']} comparisons.")
+
+    if st.button("Close"):
+        set_job_param(None)
+        st.rerun()
+
+    if job["status"] in FINISHED_STATUSES:
+        return
+
+    if job["total"]:
+        st.progress(job["done"] / job["total"], text=f"{job['done']}/{job['total']} comparisons done")
+    elif job["status"] == "queued":
+        position = queue_position(job_id)
+        if position is not None and position[0]:
+            st.caption(f"{position[0]} jobs will start before this one, estimated wait {format_wait(position[1])}.")
+        else:
+            st.caption("Next in the queue, waiting for the worker (python job_queue.py worker) to start it.")
+    else:
+        st.caption("Starting...")
+
+    if st.button("Cancel job"):
+        cancel_job(job_id)
+
+    # poll the job store until the job is finished
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
+
+def show_readiness(warmer):
+    # the domains whose features are precomputed, see domain_index.StandardWarmer
+    ready = warmer.ready_count()
+    with st.expander(f"Data domains ready: {ready}/{len(warmer.domains)}", expanded=False):
+        for domain in warmer.domains:
+            st.write(f"{'✅' if warmer.ready(domain) else '⏳'} {domain} ({warmer.status[domain]})")
+
+def stop_early(num_matches, reason):
+    # button callback, runs before the re-run that interrupts the comparison
+    st.session_state["stopped_scores"] = list(st.session_state.get("partial_scores", []))
+    st.session_state["stopped_matches"] = num_matches
+    st.session_state["stopped_reason"] = reason
+
+def session_active():
+    """False once the browser session running this script has ended (tab closed or navigated away)."""
+    ctx = get_script_run_ctx()
+    if ctx is None or not runtime.exists():
+        return True
+    return runtime.get_instance().is_active_session(ctx.session_id)
+
+def score_progressively(key, score_fn, standard_info, num_matches):
+    """
+    Scores the data elements with `score_fn` unless another run (of any session) already did.
+
+    Results are shown as they complete: a leaderboard of the current top matches and a progress
+    bar with the throughput and remaining time. The scores received so far are kept in
+    st.session_state["partial_scores"], so the user can accept them, or cancel the run, before
+    it is complete.
+
+    Comparisons go through the scoring pool shared by every session (see
+    app_cache.shared_scoring_pool), queued under the session's user, which takes its fair turn
+    with the other users; the user's position and estimated wait are shown until the first
+    results come. At most MAX_IN_FLIGHT comparisons are queued at a time. When the run is
+    accepted, cancelled or its session ends, nothing more is submitted and queued comparisons
+    are cancelled; only the ones already being scored finish. Only complete, error free results
+    are cached.
+
+    Returns:
+        tuple: (scores in data standard order, True when they come from the cache, True when
+        every data element was scored)
+    """
+    cache = shared_result_cache()
+    scores = cache.get(key)
+    if scores is not None:
+        return scores, True, True
+
+    standard_info = list(standard_info)
+    total = len(standard_info)
+    results = [None] * total
+    partial_scores = st.session_state["partial_scores"] = []
+    top = TopKAccumulator(num_matches)
+
+    buttons = st.empty()
+    accept_column, cancel_column = buttons.columns(2)
+    accept_column.button("Accept current matches", on_click=stop_early, args=(num_matches, "accepted"))
+    cancel_column.button("Cancel", on_click=stop_early, args=(num_matches, "cancelled"))
+    progress = st.progress(0.0, text=f"0/{total} data elements compared")
+    leaderboard = st.empty()
+
+    start_time = time.time()
+    pool = shared_scoring_pool()
+    user = session_user()
+    pending = {}
+    queued = iter(enumerate(standard_info))
+    done = 0
+
+    def dispatch():
+        for i, x in queued:
+            pending[pool.submit(score_fn, *x, user=user, priority="interactive")] = i
+            if len(pending) >= MAX_IN_FLIGHT:
+                return
+
+    try:
+        dispatch()
+
+        while pending:
+            if not session_active():
+                logger.info(f"Session ended, comparison stopped after {done}/{total} data elements")
+                break
+
+            completed, _ = wait(pending, timeout=SESSION_CHECK_SECONDS, return_when=FIRST_COMPLETED)
+            for future in completed:
+                score = future.result()
+                results[pending.pop(future)] = score
+                partial_scores.append(score)
+                if len(score) == 6:
+                    top.push("matches", score[2], score)
+                done += 1
+            dispatch()
+
+            if not done:
+                # still waiting for the first turn of this user
+                ahead = pool.calls_ahead(user)
+                throughput = pool.throughput()
+                wait_seconds = ahead / throughput if throughput else None
+                progress.progress(0.0, text=f"Waiting: {ahead} comparisons of other users ahead, estimated wait {format_wait(wait_seconds)}")
+            elif completed:
+                elapsed = time.time() - start_time
+                rate = done / elapsed if elapsed else 0.0
+                remaining = (total - done) / rate if rate else 0.0
+                progress.progress(done / total, text=f"{done}/{total} data elements compared, {rate:.1f} per second, about {remaining:.0f} seconds left")
+                leaderboard.text("\n".join(f"{i+1}. {item[1]} ({score:.4f})" for i, (score, item) in enumerate(top.items("matches"))))
+    finally:
+        # accepting or cancelling re-runs the script and interrupts this loop: free the workers
+        # for other users right away instead of waiting for the queued comparisons
+        for future in pending:
+            future.cancel()
+
+    buttons.empty()
+    progress.empty()
+    leaderboard.empty()
+
+    scores = [score for score in results if score is not None]
+    complete = len(scores) == total
+
+    # failed comparisons come back as (word1, word2, 0, error)
+    if complete and all(len(score) == 6 for score in scores):
+        cache.put(key, scores)
+
+    return scores, False, complete
+
+def show_plan(plan):
+    # show the estimated comparisons, tokens and running time of the selected domain and model
+    if plan["estimated minutes"] is None:
+        estimated_time = "unknown"
+    else:
+        estimated_time = f"{plan['estimated minutes']} minutes"
+
+    st.info(
+        f"**Estimate:** {plan['comparisons']} comparisons, about {plan['prompt tokens'] + plan['completion tokens']} tokens "
+        f"({plan['prompt tokens']} prompt + {plan['completion tokens']} completion), running time about {estimated_time} with {plan['workers']} workers."
+    )
+
 def main():
 
     # set page configuration 
@@ -191,6 +551,7 @@ def main():
     st.sidebar.header("How to Use")
     st.sidebar.markdown("Please filter out the domain of the data dictionary and enter the data attribute/ data attribute description in the text area below. Choose the number of matches to be displayed using the slider.")
     st.sidebar.markdown("The semantic similarity score and glossary will be displayed on for each of the corresponding data element.")
+    st.sidebar.text_input("**Your name**", key="user", help="Comparisons and background jobs are queued under this name, every user gets a fair share of the model.")
     st.sidebar.divider()
     st.sidebar.info("**Data Scientist: [@zariffwafiy](https://github.com/zariffwafiy)**", icon="🧠")
     
@@ -204,69 +565,78 @@ def main():
         st.success("File uploaded successfully!")
         st.write("")
 
-        # read excel file
-        standard = pd.read_excel(uploaded_file)
+        # read excel file, parsed once per content and shared by every session
+        standard_hash = standard_key(uploaded_file)
+        standard = load_standard(standard_hash, uploaded_file)
+
+        # start precomputing the features of every domain, so the first comparison of each is fast
+        warmer = warm_standard(standard_hash, standard)
 
         # Create a dropdown for the user to choose from multiple values
-        filter_standard_options = standard["DATA DOMAIN"].unique().tolist()
-        filter_standard_options = ["All"] + filter_standard_options
+        filter_standard_options = domain_options(standard)
 
         # Create a dropdown for the user to choose from multiple values
         filter_standard = st.selectbox("**Choose Data Domain**", filter_standard_options, index = 0)
+        show_readiness(warmer)
         st.write("")
 
-        # Apply the condition
-        if "All" in filter_standard:
-            standard_filtered = standard
-
-        else:
-            # Get the first part before "("
-            selected_category = filter_standard
-
-            # Filter the dataframe based on the selected category
-            standard_filtered = standard[standard["DATA DOMAIN"].str.strip() == selected_category].reset_index(drop=True)
-
-        data_input = st.text_area("**Enter Data Attribute/ Data Attribute Description:**")
-
-        num_matches_slider = st.slider("**Select the number of top matches to display (between 1 and 10)**", min_value=1, max_value=10, value=3)
-
-        # choose model
-        models = ["OpenAI", "Jaccard + OpenAI"]
-        model = st.selectbox("**Choose Model**", models,  index = 0)
+        # waits for the domain's features when they are still being built
+        features = warmer.features(filter_standard)
+        standard_filtered = features.standard
 
-        if model == "OpenAI":
+        # one attribute typed in, or every attribute of an uploaded data dictionary as a background job
+        mode = st.radio("**Compare**", COMPARE_MODES, horizontal=True)
 
-            # data standard column "DATA ELEMENT"
-            standard_elements = standard_filtered["DATA ELEMENT"].tolist()
-        
-            # data standard columns "BUSINESS DEFINITION/ GLOSSARY"
-            standard_glossary = standard_filtered["BUSINESS DEFINITION/ GLOSSARY"].tolist()
+        if mode == "A data dictionary":
+            show_bulk_form(uploaded_file, standard, standard_hash, filter_standard)
 
-            # data standard column "DATA GROUP"
-            standard_group = standard_filtered["DATA GROUP"].tolist()
-
-            # data standard column "DATA ENTITY"
-            standard_entity = standard_filtered["DATA ENTITY"].tolist()
-
-            # standard info
-            standard_info = zip(standard_elements, standard_glossary, standard_group, standard_entity)
-
-            if st.button("Compare"):
+        else:
+            data_input = st.text_area("**Enter Data Attribute/ Data Attribute Description:**")
+
+            num_matches_slider = st.slider("**Select the number of top matches to display (between 1 and 10)**", min_value=1, max_value=10, value=3)
+
+            # choose model
+            models = list(MODEL_SCORERS)
+            model = st.selectbox("**Choose Model**", models,  index = 0)
+            score_fn, prompt_fn, scorer_config = MODEL_SCORERS[model]
+
+            # matches of a comparison accepted or cancelled while it was still running
+            if "stopped_scores" in st.session_state:
+                reason = st.session_state.pop("stopped_reason")
+                st.header("Accepted Matches:" if reason == "accepted" else "Partial Matches:")
+                show_matches(st.session_state.pop("stopped_scores"), st.session_state.pop("stopped_matches"))
+                st.caption(f"Comparison {reason} before every data element was compared.")
+
+            # data elements sent to the model, with their glossary, data group and data entity
+            standard_info = candidate_info(standard_filtered, model, data_input, standard_hash, filter_standard, features)
+
+            # estimate the size of the comparison before it is started
+            plan = plan_run([(data_input, data_input, "All")], standard_filtered, "openai", MAX_WORKERS, prompt_overhead_chars=len(prompt_fn("", "", "")), max_completion_tokens=scorer_config["max_tokens"], prefilter_top=scorer_config.get("prefilter_top"), pairs_per_element=1)
+            show_plan(plan)
+
+            background = st.checkbox("Run in the background (the results stay available after a page refresh)")
+
+            def job_params():
+                return {
+                    "standard_path": store_upload(uploaded_file.name, uploaded_file.getvalue()),
+                    "standard_hash": standard_hash,
+                    "domain": filter_standard,
+                    "data_input": data_input,
+                    "model": model,
+                    "num_matches": num_matches_slider,
+                    "comparisons": plan["comparisons"],
+                }
+
+            def compare():
                 st.header("Top Matches:")
 
                 start_time = time.time()
 
-                # Use ThreadPoolExecutor for parallel processing
-                with ThreadPoolExecutor(max_workers = 2) as executor:
-                    # Use the executor to process each data element concurrently, semantic similarity matching
-                    scores = list(executor.map(lambda x: openai_similarity_v2(data_input, x[0], x[1], x[2], x[3]), standard_info))
-
-                # Sort the scores in descending order based on the inner tuple's second element
-                sorted_scores = sorted(scores, key=lambda x: x[2], reverse=True)
-
-                # Display the top 3 highest scored comparisons and their corresponding data elements
-                for i, (word1, word2, score, word3, group, entity) in enumerate(sorted_scores[:num_matches_slider]):
-                    st.text(f"{i+1}. Data Element: {word2}\n Similarity Score: {score}\n Glossary: {word3}. \n Data Group: {group}\n Data Entity: {entity}\n")
+                # the same attribute against the same domain and standard is only scored once
+                key = result_key(standard_hash, filter_standard, data_input, scorer_config)
+                score_element = CallCounter(lambda *x: score_fn(data_input, *x))
+                scores, from_cache, complete = score_progressively(key, score_element, standard_info, num_matches_slider)
+                show_matches(scores, num_matches_slider)
 
                 # Display the total running time in minutes and seconds
                 total_time_seconds = time.time() - start_time
@@ -274,58 +644,23 @@ def main():
                 remaining_seconds = total_time_seconds % 60
                 st.write(f"Running Time: {minutes} minutes and {remaining_seconds: .2f} seconds") 
 
-        else:
-            # Calculate Jaccard similarity scores for each data element in 'standard_filtered'
-            jaccard_scores = standard_filtered['DATA ELEMENT'].apply(lambda elem: jaccard_similarity(data_input, elem))
-            
-            # Add the Jaccard similarity scores as a new column to 'standard_filtered'
-            standard_filtered['JACCARD_SCORE'] = jaccard_scores
-
-            # Sort 'standard_filtered' based on Jaccard similarity scores in descending order
-            sorted_standard_filtered = standard_filtered.sort_values(by='JACCARD_SCORE', ascending=False).reset_index().head(150)
-            print(sorted_standard_filtered[["DATA ELEMENT", "JACCARD_SCORE"]])
-
-            # data standard column "DATA ELEMENT"
-            standard_elements = sorted_standard_filtered["DATA ELEMENT"].tolist()
-        
-            # data standard columns "BUSINESS DEFINITION/ GLOSSARY"
-            standard_glossary = sorted_standard_filtered["BUSINESS DEFINITION/ GLOSSARY"].tolist()
-
-            # data group columns "DATA GROUP"
-            standard_group = sorted_standard_filtered["DATA GROUP"].tolist()
-
-            # data entity columns "DATA ENTITY"
-            standard_entity = sorted_standard_filtered["DATA ENTITY"].tolist()
-
-            # element glossary pairs
-            standard_info = zip(standard_elements, standard_glossary, standard_group, standard_entity)
+                if from_cache:
+                    st.caption("Answered from the results of an earlier run.")
+                elif complete:
+                    # keep the running time to calibrate later estimates
+                    record_run("openai", MAX_WORKERS, score_element.calls, total_time_seconds)
 
             if st.button("Compare"):
-                st.header("Top Matches:")
-
-                start_time = time.time()
-
-                # Use ThreadPoolExecutor for parallel processing
-                with ThreadPoolExecutor(max_workers = 2) as executor:
-                    # Use the executor to process each data element concurrently, semantic similarity matching
-                    scores = list(executor.map(lambda x: openai_similarity(data_input, x[0], x[1], x[2], x[3]), standard_info))
-
-                # Sort the scores in descending order based on the inner tuple's second element
-                sorted_scores = sorted(scores, key=lambda x: x[2], reverse=True)
-
-                # Display the top 3 highest scored comparisons and their corresponding data elements
-                for i, (word1, word2, score, word3, group, entity) in enumerate(sorted_scores[:num_matches_slider]):
-                    st.text(f"{i+1}. Data Element: {word2}\n Similarity Score: {score}\n Glossary: {word3}. \n Data Group: {group}\n Data Entity: {entity}\n")
-
-                # Display the total running time in minutes and seconds
-                total_time_seconds = time.time() - start_time
-                minutes = int(total_time_seconds // 60)
-                remaining_seconds = total_time_seconds % 60
-                st.write(f"Running Time: {minutes} minutes and {remaining_seconds: .2f} seconds") 
+                start_comparison(background, job_params, compare)
 
     else: 
         st.write("No file detected, please upload a file")
 
+    # background job followed by this page, found again from the URL after a refresh
+    job_id = job_param()
+    if job_id:
+        show_job(job_id)
+
 if __name__ == "__main__":
     configure_openai()
     main()
\ No newline at end of file
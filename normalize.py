@@ -0,0 +1,84 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# normalized copies of the text columns are stored next to the originals under this suffix
+NORMALIZED_SUFFIX = " NORMALIZED"
+
+# text columns cleaned the way preprocess_data in main.py does
+DICTIONARY_TEXT_COLUMNS = [
+    "FIELD NAME/DATA ATTRIBUTE(S)",
+    "FIELD DESCRIPTION",
+    "TABLE NAME",
+    "TABLE DESCRIPTION/SUB FOLDER NAME ",
+]
+STANDARD_TEXT_COLUMNS = ["DATA ELEMENT", "BUSINESS DEFINITION/ GLOSSARY"]
+
+# boilerplate removed from a column before it is normalized
+PREFIXES_TO_REMOVE = {
+    "FIELD DESCRIPTION": r"(?i)System generated field:",
+}
+
+# letters of each data element used by the Jaccard similarity, see letters_text
+LETTERS_COLUMN = "DATA ELEMENT LETTERS"
+
+def normalized_column(column):
+    return f"{column.strip()}{NORMALIZED_SUFFIX}"
+
+def _to_arrow(series):
+    return pa.array(series.astype(object), type=pa.string(), from_pandas=True)
+
+def _to_pandas(array, index):
+    # by position: a Series given to pd.Series would be aligned on its own 0..n-1 index instead
+    return pd.Series(array.to_pandas().to_numpy(dtype=object), index=index, dtype=object)
+
+def normalize_columns(table, columns):
+    """
+    Adds a normalized copy of each text column: lower case with anything but letters and
+    whitespace replaced by a space, as preprocess_data in main.py does.
+
+    All columns are concatenated into a single Arrow array and cleaned by one pass of compiled
+    kernels, instead of one pandas str chain (and one object column) per column and step.
+    Columns that are missing or already normalized are skipped.
+
+    Returns:
+        pandas.DataFrame: `table`, with the "<column> NORMALIZED" columns added.
+    """
+    columns = [column for column in columns if column in table.columns and normalized_column(column) not in table.columns]
+    if not columns:
+        return table
+
+    arrays = []
+    for column in columns:
+        array = _to_arrow(table[column])
+        if column in PREFIXES_TO_REMOVE:
+            array = pc.replace_substring_regex(array, pattern=PREFIXES_TO_REMOVE[column], replacement="")
+        arrays.append(array)
+
+    combined = pc.utf8_lower(pa.concat_arrays(arrays))
+    combined = pc.replace_substring_regex(combined, pattern=r"[^a-z\s]", replacement=" ")
+
+    offset = 0
+    for column in columns:
+        table[normalized_column(column)] = _to_pandas(combined.slice(offset, len(table)), table.index)
+        offset += len(table)
+
+    return table
+
+def letters_text(series):
+    """
+    Returns the text the Jaccard similarity compares: lower case, without punctuation, symbols
+    or whitespace. The Jaccard similarity is computed on the set of its characters.
+    """
+    array = pc.utf8_lower(_to_arrow(series.fillna("")))
+    array = pc.replace_substring_regex(array, pattern=r"[^\p{L}\p{N}_]", replacement="")
+    return _to_pandas(array, series.index)
+
+def normalize_dictionary(table):
+    return normalize_columns(table, DICTIONARY_TEXT_COLUMNS)
+
+def normalize_standard(table):
+    table = normalize_columns(table, STANDARD_TEXT_COLUMNS)
+    if "DATA ELEMENT" in table.columns and LETTERS_COLUMN not in table.columns:
+        table[LETTERS_COLUMN] = letters_text(table["DATA ELEMENT"])
+    return table
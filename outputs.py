@@ -0,0 +1,104 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from standard_diff import KEY_COLUMNS, SCORE_COLUMNS
+
+# number of top matches kept in the summary sheet
+TOP_MATCHES = 3
+
+# output formats, chosen from the file extension of the output path
+FORMATS = {
+    ".parquet": "parquet",
+    ".csv.gz": "csv.gz",
+    ".csv": "csv",
+    ".sqlite": "sqlite",
+    ".db": "sqlite",
+    ".xlsx": "xlsx",
+}
+
+def output_format(path):
+    for extension, name in FORMATS.items():
+        if path.lower().endswith(extension):
+            return name
+    raise ValueError(f"Unknown output format for '{path}', use one of {', '.join(FORMATS)}")
+
+def summarize(scores, top_matches=TOP_MATCHES):
+    """Builds the summary sheet: the top data elements and their combined score for every attribute."""
+    rows = []
+    for attribute, group in scores.groupby("DATA ATTRIBUTE", sort=False):
+        top = group.nlargest(top_matches, "COMBINED SCORE")
+        row = {"DATA ATTRIBUTE": attribute}
+        for i, (data_element, score) in enumerate(zip(top["DATA ELEMENT"], top["COMBINED SCORE"])):
+            row[f"Data Element {i + 1}"] = data_element
+            row[f"Score {i + 1}"] = score
+        rows.append(row)
+
+    columns = ["DATA ATTRIBUTE"]
+    for i in range(top_matches):
+        columns += [f"Data Element {i + 1}", f"Score {i + 1}"]
+
+    return pd.DataFrame(rows, columns=columns)
+
+def top_matches_of(scores, top_matches=TOP_MATCHES):
+    """Returns the long format rows of the top matches of every attribute, best first."""
+    scores = scores.sort_values(["DATA ATTRIBUTE", "COMBINED SCORE"], ascending=[True, False], kind="stable")
+    return scores.groupby("DATA ATTRIBUTE", sort=False).head(top_matches).reset_index(drop=True)
+
+def write_workbook(scores, output_path, top_matches=TOP_MATCHES):
+    """
+    Writes the small Excel export: the summary sheet and the long format rows of the top matches.
+
+    Full score matrices are not written to Excel, they are slow to write and a dictionary with
+    more attributes than Excel's 16,384 columns cannot fit; use a parquet, csv.gz or sqlite output.
+    """
+    with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
+        summarize(scores, top_matches).to_excel(writer, sheet_name="summary", index=False)
+        top_matches_of(scores, top_matches).to_excel(writer, sheet_name="top_matches", index=False)
+
+def write_sqlite(scores, output_path, top_matches=TOP_MATCHES):
+    """Writes the scores and summary as the "scores" and "summary" tables of a SQLite database."""
+    with sqlite3.connect(output_path) as connection:
+        scores.to_sql("scores", connection, if_exists="replace", index=False, chunksize=10000)
+        summarize(scores, top_matches).to_sql("summary", connection, if_exists="replace", index=False)
+        connection.execute('CREATE INDEX IF NOT EXISTS scores_attribute ON scores ("DATA ATTRIBUTE", "COMBINED SCORE" DESC)')
+
+def write_scores(scores, output_path, top_matches=TOP_MATCHES):
+    """
+    Writes long format scores (one row per attribute x data element, see SCORE_COLUMNS).
+
+    The format follows the extension of `output_path`: .parquet, .csv.gz, .csv, .sqlite/.db, or
+    .xlsx for the summary and top matches only.
+    """
+    fmt = output_format(output_path)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    if fmt == "parquet":
+        scores.to_parquet(output_path, index=False)
+    elif fmt == "csv.gz":
+        scores.to_csv(output_path, index=False, compression="gzip")
+    elif fmt == "csv":
+        scores.to_csv(output_path, index=False)
+    elif fmt == "sqlite":
+        write_sqlite(scores, output_path, top_matches)
+    else:
+        write_workbook(scores, output_path, top_matches)
+
+def read_scores(path):
+    """Reads long format scores written by write_scores (parquet, csv.gz, csv or sqlite)."""
+    fmt = output_format(path)
+
+    if fmt == "parquet":
+        scores = pd.read_parquet(path)
+    elif fmt in ("csv", "csv.gz"):
+        scores = pd.read_csv(path)
+    elif fmt == "sqlite":
+        with sqlite3.connect(path) as connection:
+            scores = pd.read_sql("SELECT * FROM scores", connection)
+    else:
+        raise ValueError(f"'{path}' only holds the top matches, write shards as parquet, csv.gz, csv or sqlite")
+
+    scores[KEY_COLUMNS] = scores[KEY_COLUMNS].astype(object).fillna("").astype(str)
+    scores[SCORE_COLUMNS[-3:]] = scores[SCORE_COLUMNS[-3:]].astype(float)
+    return scores
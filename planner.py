@@ -0,0 +1,187 @@
+import math
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# every finished run is appended here and used to calibrate the throughput model,
+# COMPARISONS being the scorer calls the run actually made (no cached or deduplicated ones)
+RUN_HISTORY_PATH = "results/run_history.csv"
+RUN_HISTORY_COLUMNS = ["TIMESTAMP", "SCORER", "WORKERS", "COMPARISONS", "SECONDS"]
+
+# hand-measured runs of the Streamlit app with 3 workers (notes/testing for temperaturefreedom .txt),
+# used until enough runs are recorded
+SEED_RUNS = [
+    # (scorer, workers, comparisons, seconds)
+    ("openai", 3, 771, 3 * 60),
+    ("openai", 3, 1402, 6 * 60),
+    ("openai", 3, 2714, 13 * 60),
+    ("openai", 3, 2981, 14 * 60),
+    ("openai", 3, 134, 1 * 60),
+    ("openai", 3, 926, 4 * 60),
+    ("openai", 3, 2112, 10 * 60),
+    ("openai", 3, 696, 3 * 60),
+    ("openai", 3, 1390, 7 * 60),
+    ("openai", 3, 1652, 8 * 60),
+    ("openai", 3, 877, 4 * 60),
+    ("openai", 3, 263, 2 * 60),
+]
+
+# the OpenAI tokenizer averages roughly 4 characters per token on English text
+CHARS_PER_TOKEN = 4
+
+# number of data elements kept by the Jaccard prefilter of the "Jaccard + OpenAI" model
+PREFILTER_TOP = 150
+
+def estimate_tokens(text):
+    """Rough token count of a text, without needing the tokenizer."""
+    return math.ceil(len(str(text)) / CHARS_PER_TOKEN)
+
+class CallCounter:
+    """Wraps a scorer and counts the calls it actually makes, the unit of the run history."""
+
+    def __init__(self, score_fn):
+        self.score_fn = score_fn
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock:
+            self.calls += 1
+        return self.score_fn(*args)
+
+def record_run(scorer, workers, comparisons, seconds, history_path=RUN_HISTORY_PATH):
+    """
+    Appends a finished run to the run history used by the planner.
+
+    comparisons is the number of scorer calls the run made: answers taken from a cache or
+    shared by deduplicated comparisons are not counted, since they take no scorer time.
+    """
+    if not comparisons or seconds <= 0:
+        return
+
+    record = pd.DataFrame([[time.strftime("%Y-%m-%d %H:%M:%S"), scorer, workers or os.cpu_count(), comparisons, round(seconds, 2)]], columns=RUN_HISTORY_COLUMNS)
+    os.makedirs(os.path.dirname(history_path) or ".", exist_ok=True)
+    record.to_csv(history_path, mode="a", header=not os.path.exists(history_path), index=False)
+
+def load_history(scorer, history_path=RUN_HISTORY_PATH):
+    """Returns the recorded runs of a scorer, falling back to SEED_RUNS when none were recorded."""
+    runs = pd.DataFrame(columns=RUN_HISTORY_COLUMNS)
+    if os.path.exists(history_path):
+        runs = pd.read_csv(history_path)
+        runs = runs[runs["SCORER"] == scorer]
+
+    if runs.empty:
+        seeds = [run for run in SEED_RUNS if run[0] == scorer]
+        runs = pd.DataFrame([[None, *run] for run in seeds], columns=RUN_HISTORY_COLUMNS)
+
+    return runs
+
+def fit_throughput(runs):
+    """
+    Fits comparisons per second = rate * workers ** scaling on past runs.
+
+    With runs at a single worker count the scaling cannot be estimated and is assumed linear.
+    The scaling is kept between 0 (workers don't help, e.g. rate limited) and 1 (linear).
+
+    Returns:
+        tuple: (rate, scaling), or None when there is no run to calibrate on.
+    """
+    runs = runs[(runs["SECONDS"] > 0) & (runs["COMPARISONS"] > 0)]
+    if runs.empty:
+        return None
+
+    workers = runs["WORKERS"].astype(float).values
+    throughput = runs["COMPARISONS"].astype(float).values / runs["SECONDS"].astype(float).values
+
+    if len(np.unique(workers)) > 1:
+        scaling, _ = np.polyfit(np.log(workers), np.log(throughput), 1)
+        scaling = float(min(max(scaling, 0.0), 1.0))
+    else:
+        scaling = 1.0
+
+    # weight every run by its size, so short runs dominated by start-up time count less
+    rate = runs["COMPARISONS"].sum() / (runs["SECONDS"].astype(float).values * workers ** scaling).sum()
+
+    return float(rate), scaling
+
+def count_comparisons(units, standard, prefilter_top=None, pairs_per_element=2):
+    """
+    Counts the comparisons of a run.
+
+    Parameters:
+        units (list): (attribute, field description, domain) units of work, see cde_cli.load_dictionary.
+        standard (pandas.DataFrame): The data standard.
+        prefilter_top (int): Number of data elements kept per attribute by a prefilter, None to keep all.
+        pairs_per_element (int): Comparisons per data element, 2 for data element + glossary.
+
+    Returns:
+        dict: attribute and unique description counts, the comparisons of the run and how many of
+        them repeat an earlier attribute's (field description, domain). Runs score every attribute,
+        so "comparisons" (and the estimates built on it) includes the repeated ones.
+    """
+    domains = standard["DATA DOMAIN"].astype(object).fillna("").astype(str).str.strip()
+    domain_sizes = domains.value_counts().to_dict()
+
+    comparisons = 0
+    repeated_comparisons = 0
+    descriptions = set()
+    for _, field_desc, domain in units:
+        elements = len(standard) if domain == "All" else domain_sizes.get(domain, 0)
+        if prefilter_top:
+            elements = min(elements, prefilter_top)
+        comparisons += elements * pairs_per_element
+        if (field_desc, domain) in descriptions:
+            repeated_comparisons += elements * pairs_per_element
+        descriptions.add((field_desc, domain))
+
+    return {
+        "attributes": len(units),
+        "unique descriptions": len(descriptions),
+        "comparisons": comparisons,
+        "comparisons of repeated descriptions": repeated_comparisons,
+    }
+
+def plan_run(units, standard, scorer, workers, prompt_overhead_chars=0, max_completion_tokens=0, prefilter_top=None, pairs_per_element=2, history_path=RUN_HISTORY_PATH):
+    """
+    Estimates the size, token usage and wall-clock time of a run before it starts.
+
+    Parameters:
+        units (list): (attribute, field description, domain) units of work.
+        standard (pandas.DataFrame): The data standard.
+        scorer (str): Scorer name the throughput model is calibrated for.
+        workers (int): Number of parallel workers.
+        prompt_overhead_chars (int): Length of the prompt template without the compared texts, 0 for local scorers.
+        max_completion_tokens (int): Completion token limit per request, 0 for local scorers.
+        prefilter_top (int): Data elements kept per attribute by a prefilter, None to keep all.
+        pairs_per_element (int): Comparisons per data element.
+
+    Returns:
+        dict: comparison counts, prompt/completion tokens and estimated minutes (None when uncalibrated).
+    """
+    plan = count_comparisons(units, standard, prefilter_top, pairs_per_element)
+
+    prompt_tokens = 0
+    if prompt_overhead_chars:
+        # average text sizes on each side of the comparison
+        description_tokens = np.mean([estimate_tokens(field_desc) for _, field_desc, _ in units]) if units else 0
+        element_text = pd.concat([standard["DATA ELEMENT"], standard["BUSINESS DEFINITION/ GLOSSARY"]]).fillna("")
+        element_tokens = element_text.astype(str).str.len().mean() / CHARS_PER_TOKEN if len(element_text) else 0
+        prompt_tokens = int(plan["comparisons"] * (prompt_overhead_chars / CHARS_PER_TOKEN + description_tokens + element_tokens))
+
+    plan["prompt tokens"] = prompt_tokens
+    plan["completion tokens"] = plan["comparisons"] * max_completion_tokens
+
+    workers = workers or os.cpu_count()
+    plan["workers"] = workers
+
+    model = fit_throughput(load_history(scorer, history_path))
+    if model is None:
+        plan["estimated minutes"] = None
+    else:
+        rate, scaling = model
+        plan["estimated minutes"] = round(plan["comparisons"] / (rate * workers ** scaling) / 60, 1)
+
+    return plan
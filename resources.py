@@ -0,0 +1,76 @@
+import argparse
+import logging
+import os
+from functools import lru_cache
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# local copies of the NLP models and corpora, so the apps never download anything at startup
+RESOURCE_DIR = os.environ.get("CDE_RESOURCE_DIR", "resources")
+
+SPACY_MODEL = "en_core_web_lg"
+SENTENCE_TRANSFORMER_MODEL = "paraphrase-MiniLM-L6-v2"
+NLTK_PACKAGES = ["stopwords"]
+
+def resource_path(*parts):
+    return os.path.join(RESOURCE_DIR, *parts)
+
+@lru_cache(maxsize=None)
+def spacy_model(name=SPACY_MODEL):
+    """
+    Loads a spaCy model on first use, from the bundle when it holds a copy of it.
+
+    spaCy is only imported here, so modules that may need it don't pay for it at import time.
+    """
+    import spacy
+
+    path = resource_path("spacy", name)
+    return spacy.load(path if os.path.isdir(path) else name)
+
+@lru_cache(maxsize=None)
+def sentence_transformer(name=SENTENCE_TRANSFORMER_MODEL):
+    """Loads a sentence_transformers model on first use, from the bundle when it holds a copy of it."""
+    from sentence_transformers import SentenceTransformer
+
+    path = resource_path("sentence_transformers", name)
+    return SentenceTransformer(path if os.path.isdir(path) else name)
+
+@lru_cache(maxsize=None)
+def stopwords(language="english"):
+    """English stopwords of NLTK, read from the bundle (see download_resources) without any network call."""
+    import nltk
+
+    nltk.data.path.insert(0, resource_path("nltk_data"))
+    from nltk.corpus import stopwords as nltk_stopwords
+
+    return frozenset(nltk_stopwords.words(language))
+
+def download_resources():
+    """Fills the bundle once, on a machine with network access; copy RESOURCE_DIR to the servers."""
+    import nltk
+    import spacy
+    import spacy.cli
+    from sentence_transformers import SentenceTransformer
+
+    for package in NLTK_PACKAGES:
+        nltk.download(package, download_dir=resource_path("nltk_data"))
+    logger.info(f"NLTK data saved to {resource_path('nltk_data')}")
+
+    spacy.cli.download(SPACY_MODEL)
+    spacy.load(SPACY_MODEL).to_disk(resource_path("spacy", SPACY_MODEL))
+    logger.info(f"spaCy model saved to {resource_path('spacy', SPACY_MODEL)}")
+
+    SentenceTransformer(SENTENCE_TRANSFORMER_MODEL).save(resource_path("sentence_transformers", SENTENCE_TRANSFORMER_MODEL))
+    logger.info(f"sentence_transformers model saved to {resource_path('sentence_transformers', SENTENCE_TRANSFORMER_MODEL)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local bundle of NLP resources.")
+    parser.add_argument("command", choices=["download"], help="'download' fills the bundle at CDE_RESOURCE_DIR (default: resources)")
+    parser.parse_args()
+
+    download_resources()
+
+if __name__ == "__main__":
+    main()
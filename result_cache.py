@@ -0,0 +1,74 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# number of comparison results kept, and how long they stay valid (the model may be redeployed)
+RESULT_CACHE_ENTRIES = 2000
+RESULT_CACHE_TTL = 24 * 60 * 60
+
+def normalize_input(text):
+    """Normalizes a typed attribute so the same attribute reuses its results: case and spacing are ignored."""
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+def result_key(standard_hash, domain, text, scorer_config):
+    """
+    Cache key of one comparison: the data standard content, the data domain, the normalized
+    attribute and the scorer configuration (model, prompt version, temperature, ...).
+    """
+    return (standard_hash, domain, normalize_input(text), tuple(sorted(scorer_config.items())))
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of comparison results with a time to live.
+
+    One instance is shared by every session of a Streamlit app (see st.cache_resource), so an
+    attribute scored by one user is answered from memory for the next one.
+
+    Example usage:
+        cache = ResultCache(max_entries=2000, ttl=3600)
+        key = result_key(standard_hash, "All", "Pump speed", {"model": "CDE-Advisor"})
+        scores = cache.get(key)
+        if scores is None:
+            scores = score(...)
+            cache.put(key, scores)
+    """
+    def __init__(self, max_entries=RESULT_CACHE_ENTRIES, ttl=RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value of `key`, or None when it is missing or expired."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit rate (%)": round(100 * self.hits / lookups, 2) if lookups else 0.0,
+        }
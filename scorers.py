@@ -0,0 +1,61 @@
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+# names accepted by get_scorer
+SCORER_NAMES = ["openai", "jaccard"]
+
+def jaccard_similarity(str1, str2):
+    # Remove punctuations, symbols, and convert to lowercase
+    str1 = re.sub(r'[^\w\s]', '', str1).lower()
+    str2 = re.sub(r'[^\w\s]', '', str2).lower()
+
+    # Create sets of individual letters
+    set1 = set(''.join(str1.split()))
+    set2 = set(''.join(str2.split()))
+
+    # Calculate Jaccard similarity
+    intersection = len(set1.intersection(set2))
+    union = len(set1.union(set2))
+    similarity = intersection / union if union > 0 else 0
+    return similarity
+
+@lru_cache(maxsize=100000)
+def letter_set(text):
+    """Letters compared by jaccard_similarity, computed once per distinct text."""
+    return frozenset(''.join(re.sub(r'[^\w\s]', '', text).lower().split()))
+
+def jaccard_from_sets(set1, set2):
+    union = len(set1 | set2)
+    return len(set1 & set2) / union if union > 0 else 0
+
+def jaccard_similarities(text, letters):
+    """
+    Jaccard similarity of `text` with every value of a letters column (see normalize.letters_text).
+
+    The letter set of each distinct value is only built once.
+    """
+    query = letter_set(str(text))
+    unique_letters = pd.unique(letters)
+    similarities = {value: jaccard_from_sets(query, frozenset(value)) for value in unique_letters}
+    return letters.map(similarities).astype(float)
+
+def get_scorer(name):
+    """
+    Returns the scoring function for `name`, called as score_fn(field_description, text) -> float.
+
+    "openai" configures the OpenAI client on first use, so it has to be called once in every
+    process that scores pairs.
+    """
+    if name == "openai":
+        # import here so the offline scorers don't need the OpenAI client
+        from main import configure_openai, openai_similarity
+
+        configure_openai()
+        return openai_similarity
+
+    if name == "jaccard":
+        return lambda word1, word2: jaccard_from_sets(letter_set(str(word1)), letter_set(str(word2)))
+
+    raise ValueError(f"Unknown scorer '{name}', choose one of {SCORER_NAMES}")
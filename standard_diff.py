@@ -0,0 +1,229 @@
+import argparse
+import logging
+
+import pandas as pd
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# columns that identify the same data element across data standard releases
+KEY_COLUMNS = ["DATA DOMAIN", "DATA GROUP", "DATA ENTITY", "DATA ELEMENT"]
+GLOSSARY_COLUMN = "BUSINESS DEFINITION/ GLOSSARY"
+
+# long format used to keep scores between runs
+SCORE_COLUMNS = KEY_COLUMNS + ["DATA ATTRIBUTE", "ELEMENT SCORE", "GLOSSARY SCORE", "COMBINED SCORE"]
+
+def _normalize_text(series):
+    # compare text ignoring case and repeated/trailing whitespace
+    return series.astype(object).fillna("").astype(str).str.strip().str.replace(r'\s+', ' ', regex=True).str.lower()
+
+def _keyed(standard):
+    """
+    Returns a copy of the data standard with normalized key columns and an occurrence number,
+    so that repeated (domain, group, entity, element) rows are still matched one to one.
+    """
+    keyed = standard.copy()
+    for column in KEY_COLUMNS:
+        keyed[column] = keyed[column].astype(object).fillna("").astype(str).str.strip()
+    keyed["_OCCURRENCE"] = keyed.groupby(KEY_COLUMNS).cumcount()
+    keyed["_GLOSSARY"] = _normalize_text(keyed[GLOSSARY_COLUMN])
+    return keyed
+
+def diff_standards(old_standard, new_standard):
+    """
+    Compares two releases of the data standard.
+
+    Rows are matched by (DATA DOMAIN, DATA GROUP, DATA ENTITY, DATA ELEMENT). A matched row whose
+    business definition/glossary text differs (ignoring case and whitespace) is reported as changed.
+
+    Parameters:
+        old_standard (pandas.DataFrame): The previously scored data standard.
+        new_standard (pandas.DataFrame): The newly released data standard.
+
+    Returns:
+        pandas.DataFrame: The new standard's key and glossary columns plus a "CHANGE" column with
+        one of "added", "changed" or "unchanged", followed by the "removed" rows of the old standard.
+    """
+    old_keyed = _keyed(old_standard)
+    new_keyed = _keyed(new_standard)
+
+    merged = new_keyed[KEY_COLUMNS + ["_OCCURRENCE", "_GLOSSARY", GLOSSARY_COLUMN]].merge(
+        old_keyed[KEY_COLUMNS + ["_OCCURRENCE", "_GLOSSARY"]],
+        on=KEY_COLUMNS + ["_OCCURRENCE"],
+        how="outer",
+        suffixes=("", "_OLD"),
+        indicator=True,
+    )
+
+    merged["CHANGE"] = "unchanged"
+    merged.loc[merged["_merge"] == "left_only", "CHANGE"] = "added"
+    merged.loc[merged["_merge"] == "right_only", "CHANGE"] = "removed"
+    both = merged["_merge"] == "both"
+    merged.loc[both & (merged["_GLOSSARY"] != merged["_GLOSSARY_OLD"]), "CHANGE"] = "changed"
+
+    return merged[KEY_COLUMNS + [GLOSSARY_COLUMN, "CHANGE"]].reset_index(drop=True)
+
+def scores_from_workbook(workbook_path, standard):
+    """
+    Converts a result workbook written by main.py into the long score format.
+
+    The "field_desc_vs_data_element" and "field_desc_vs_glossary" sheets hold one row per data
+    element of the (domain filtered) data standard that was scored, in the same order, and one
+    column per data attribute. `standard` must be that same filtered data standard.
+    """
+    element_sheet = pd.read_excel(workbook_path, sheet_name="field_desc_vs_data_element")
+    glossary_sheet = pd.read_excel(workbook_path, sheet_name="field_desc_vs_glossary")
+
+    if len(element_sheet) != len(standard):
+        raise ValueError(f"Workbook has {len(element_sheet)} data elements but the data standard has {len(standard)} rows")
+
+    keys = _keyed(standard.reset_index(drop=True))[KEY_COLUMNS]
+    attributes = [column for column in element_sheet.columns if column != "DATA ELEMENT"]
+
+    frames = []
+    for attribute in attributes:
+        frame = keys.copy()
+        frame["DATA ATTRIBUTE"] = attribute
+        frame["ELEMENT SCORE"] = element_sheet[attribute].values
+        frame["GLOSSARY SCORE"] = glossary_sheet[attribute].values
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=SCORE_COLUMNS)
+
+    scores = pd.concat(frames, ignore_index=True)
+    scores["COMBINED SCORE"] = round((scores["ELEMENT SCORE"] + scores["GLOSSARY SCORE"]) / 2, 4)
+    return scores[SCORE_COLUMNS]
+
+def rescore_incremental(attributes, new_standard, old_standard, previous_scores, score_fn):
+    """
+    Scores a dictionary against a new data standard release, reusing the previous release's scores.
+
+    Only the pairs affected by the release are sent to `score_fn`:
+        - added data elements are scored against every attribute,
+        - data elements with a changed glossary only have their glossary score recomputed,
+        - attributes missing from `previous_scores` are scored against every data element.
+    Scores of removed data elements are dropped.
+
+    Parameters:
+        attributes (pandas.DataFrame): "DATA ATTRIBUTE" and "FIELD DESCRIPTION" of the (preprocessed) dictionary.
+        new_standard (pandas.DataFrame): The new data standard release, already filtered by domain.
+        old_standard (pandas.DataFrame): The release `previous_scores` was computed on.
+        previous_scores (pandas.DataFrame): Scores in the long format (see SCORE_COLUMNS).
+        score_fn (callable): score_fn(field_description, text) -> float, e.g. main.openai_similarity.
+
+    Returns:
+        tuple: (scores, report) where scores is in the long format for every attribute x data element
+        of the new release, and report is a dict counting the reused and re-scored comparisons.
+    """
+    diff = diff_standards(old_standard, new_standard)
+    current = diff[diff["CHANGE"] != "removed"].reset_index(drop=True)
+    current["_OCCURRENCE"] = current.groupby(KEY_COLUMNS).cumcount()
+
+    previous = previous_scores.copy()
+    for column in KEY_COLUMNS:
+        previous[column] = previous[column].astype(object).fillna("").astype(str).str.strip()
+    previous["_OCCURRENCE"] = previous.groupby(KEY_COLUMNS + ["DATA ATTRIBUTE"]).cumcount()
+    previous_attributes = set(previous["DATA ATTRIBUTE"])
+
+    report = {
+        "data elements added": int((diff["CHANGE"] == "added").sum()),
+        "data elements removed": int((diff["CHANGE"] == "removed").sum()),
+        "glossaries changed": int((diff["CHANGE"] == "changed").sum()),
+        "data elements unchanged": int((diff["CHANGE"] == "unchanged").sum()),
+        "comparisons total": 0,
+        "comparisons reused": 0,
+        "comparisons scored": 0,
+    }
+
+    frames = []
+    for attribute, field_desc in zip(attributes["DATA ATTRIBUTE"], attributes["FIELD DESCRIPTION"]):
+        frame = current[KEY_COLUMNS + ["_OCCURRENCE", GLOSSARY_COLUMN, "CHANGE"]].copy()
+        frame["DATA ATTRIBUTE"] = attribute
+
+        if attribute in previous_attributes:
+            frame = frame.merge(
+                previous[KEY_COLUMNS + ["_OCCURRENCE", "DATA ATTRIBUTE", "ELEMENT SCORE", "GLOSSARY SCORE"]],
+                on=KEY_COLUMNS + ["_OCCURRENCE", "DATA ATTRIBUTE"],
+                how="left",
+            )
+        else:
+            frame["ELEMENT SCORE"] = float("nan")
+            frame["GLOSSARY SCORE"] = float("nan")
+
+        # each data element counts as two comparisons, the element name and its glossary
+        rescore_element = frame["ELEMENT SCORE"].isna()
+        rescore_glossary = frame["GLOSSARY SCORE"].isna() | (frame["CHANGE"] == "changed")
+
+        # scores are assigned as plain lists: an empty apply result would not keep the float dtype
+        frame.loc[rescore_element, "ELEMENT SCORE"] = [
+            round(score_fn(field_desc, data_element), 4) for data_element in frame.loc[rescore_element, "DATA ELEMENT"]
+        ]
+        frame.loc[rescore_glossary, "GLOSSARY SCORE"] = [
+            round(score_fn(field_desc, glossary), 4) for glossary in frame.loc[rescore_glossary, GLOSSARY_COLUMN]
+        ]
+
+        scored = int(rescore_element.sum() + rescore_glossary.sum())
+        report["comparisons total"] += 2 * len(frame)
+        report["comparisons scored"] += scored
+        report["comparisons reused"] += 2 * len(frame) - scored
+
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=SCORE_COLUMNS), report
+
+    scores = pd.concat(frames, ignore_index=True)
+    scores["COMBINED SCORE"] = round((scores["ELEMENT SCORE"] + scores["GLOSSARY SCORE"]) / 2, 4)
+
+    total = report["comparisons total"]
+    report["work skipped (%)"] = round(100 * report["comparisons reused"] / total, 2) if total else 0.0
+
+    return scores[SCORE_COLUMNS], report
+
+def main():
+    # import here so the diff can be used without the OpenAI client configured
+    from main import configure_openai, openai_similarity, preprocess_data, filter_dictionary
+    from ingest import read_dictionary, read_standard
+    from outputs import read_scores, write_scores
+
+    parser = argparse.ArgumentParser(description="Re-score a data dictionary against a new data standard release, reusing previous results.")
+    parser.add_argument("--dictionary", required=True, help="data dictionary csv")
+    parser.add_argument("--old-standard", required=True, help="data standard csv the previous results were computed on")
+    parser.add_argument("--new-standard", required=True, help="newly released data standard csv")
+    parser.add_argument("--previous", required=True, help="previous scores, a main.py result workbook (.xlsx) or long format scores (.parquet, .csv.gz, .csv, .sqlite)")
+    parser.add_argument("--output", required=True, help="long format scores to write (.parquet, .csv.gz, .csv, .sqlite)")
+    args = parser.parse_args()
+
+    configure_openai()
+
+    data1 = read_dictionary(args.dictionary)
+    preprocess_data(data1)
+    data1 = filter_dictionary(data1)
+
+    # only use the data domain of the data dictionary, as main.py does
+    domain = data1["DATA DOMAIN "].iloc[0]
+    old_standard = read_standard(args.old_standard)
+    old_standard = old_standard[old_standard["DATA DOMAIN"].isin([domain])].reset_index(drop=True)
+    new_standard = read_standard(args.new_standard)
+    new_standard = new_standard[new_standard["DATA DOMAIN"].isin([domain])].reset_index(drop=True)
+
+    if args.previous.endswith(".xlsx"):
+        previous_scores = scores_from_workbook(args.previous, old_standard)
+    else:
+        previous_scores = read_scores(args.previous)
+
+    attributes = pd.DataFrame({
+        "DATA ATTRIBUTE": data1["FIELD NAME/DATA ATTRIBUTE(S)"],
+        "FIELD DESCRIPTION": data1["FIELD DESCRIPTION"],
+    })
+
+    scores, report = rescore_incremental(attributes, new_standard, old_standard, previous_scores, openai_similarity)
+    write_scores(scores, args.output)
+
+    for name, value in report.items():
+        logger.info(f"{name}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from standard_diff import GLOSSARY_COLUMN, KEY_COLUMNS
+
+# columns stored as category codes (a small list of names plus one int32 code per row)
+CATEGORY_COLUMNS = ["DATA DOMAIN", "DATA GROUP", "DATA ENTITY"]
+# columns stored as a UTF-8 blob plus the offset of every row's text in it; a missing glossary
+# reads back as NaN like in the DataFrame, a missing key (DATA ELEMENT) as an empty string
+TEXT_COLUMNS = ["DATA ELEMENT", GLOSSARY_COLUMN]
+
+MANIFEST_FILE = "manifest.json"
+
+def _file_name(column, part):
+    return f"{column.strip().replace('/', '_').replace(' ', '_').lower()}_{part}.npy"
+
+def build_store(standard, directory, features=None):
+    """
+    Writes the data standard as a read-only store that worker processes memory-map by path.
+
+    Parameters:
+        standard (pandas.DataFrame): The (domain filtered) data standard.
+        directory (str): Directory the store is written to, created if missing.
+        features (dict): Optional name -> numpy array with one row per data element, e.g. embeddings.
+
+    Returns:
+        str: `directory`, to pass to open_store.
+    """
+    os.makedirs(directory, exist_ok=True)
+    standard = standard.reset_index(drop=True)
+    manifest = {"rows": len(standard), "categories": {}, "text": {}, "features": {}}
+
+    for column in CATEGORY_COLUMNS:
+        codes, categories = pd.factorize(standard[column].astype(object).fillna("").astype(str))
+        np.save(os.path.join(directory, _file_name(column, "codes")), codes.astype(np.int32))
+        manifest["categories"][column] = {"file": _file_name(column, "codes"), "names": list(categories)}
+
+    for column in TEXT_COLUMNS:
+        missing = standard[column].isna().values & (column not in KEY_COLUMNS)
+        encoded = [text.encode("utf-8") for text in standard[column].astype(object).fillna("").astype(str)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        np.save(os.path.join(directory, _file_name(column, "offsets")), offsets)
+        np.save(os.path.join(directory, _file_name(column, "blob")), blob)
+        np.save(os.path.join(directory, _file_name(column, "missing")), missing)
+        manifest["text"][column] = {
+            "offsets": _file_name(column, "offsets"),
+            "blob": _file_name(column, "blob"),
+            "missing": _file_name(column, "missing"),
+        }
+
+    for name, values in (features or {}).items():
+        values = np.asarray(values)
+        if len(values) != len(standard):
+            raise ValueError(f"Feature '{name}' has {len(values)} rows but the data standard has {len(standard)}")
+        np.save(os.path.join(directory, _file_name(name, "feature")), values)
+        manifest["features"][name] = _file_name(name, "feature")
+
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    return directory
+
+class StandardStore:
+    """
+    Read-only view of a store written by build_store.
+
+    Arrays are opened with np.load(mmap_mode="r"), so every process opening the same directory
+    shares the operating system's page cache instead of holding its own copy of the standard,
+    and only the path has to be sent to a worker.
+
+    Example usage:
+        store = StandardStore("results/standard_store")
+        for data_domain, data_group, data_entity, data_element, glossary in store.rows("Drilling"):
+            ...
+    """
+    def __init__(self, directory):
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        def load(file_name):
+            return np.load(os.path.join(directory, file_name), mmap_mode="r")
+
+        self.directory = directory
+        self.size = manifest["rows"]
+        self.codes = {column: load(entry["file"]) for column, entry in manifest["categories"].items()}
+        self.categories = {column: entry["names"] for column, entry in manifest["categories"].items()}
+        self.offsets = {column: load(entry["offsets"]) for column, entry in manifest["text"].items()}
+        self.blobs = {column: load(entry["blob"]) for column, entry in manifest["text"].items()}
+        self.missing = {column: load(entry["missing"]) for column, entry in manifest["text"].items()}
+        self.features = {name: load(file_name) for name, file_name in manifest["features"].items()}
+
+    def __len__(self):
+        return self.size
+
+    def text(self, column, row):
+        if self.missing[column][row]:
+            return float("nan")
+        offsets = self.offsets[column]
+        return self.blobs[column][offsets[row]:offsets[row + 1]].tobytes().decode("utf-8")
+
+    def category(self, column, row):
+        return self.categories[column][self.codes[column][row]]
+
+    def domain_rows(self, domain):
+        """Row numbers of a data domain (compared stripped), or every row for "All"."""
+        if domain == "All":
+            return np.arange(self.size)
+        codes = [code for code, name in enumerate(self.categories["DATA DOMAIN"]) if name.strip() == domain]
+        return np.flatnonzero(np.isin(self.codes["DATA DOMAIN"], codes))
+
+    def rows(self, domain="All"):
+        """Yields (domain, group, entity, data element, glossary) for each data element of a domain."""
+        for row in self.domain_rows(domain):
+            yield (
+                *(self.category(column, row) for column in CATEGORY_COLUMNS),
+                *(self.text(column, row) for column in TEXT_COLUMNS),
+            )
+
+def open_store(directory):
+    return StandardStore(directory)
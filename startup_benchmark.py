@@ -0,0 +1,83 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+# set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+APPS = ["main_streamlit_finalized.py", "main_streamlit_combine.py", "main_streamlit_rm_OpenAI.py"]
+STARTUP_HISTORY_PATH = "results/startup_history.csv"
+STARTUP_HISTORY_COLUMNS = ["TIMESTAMP", "APP", "IMPORT SECONDS", "FIRST RENDER SECONDS"]
+
+# each measure runs in a fresh interpreter, so nothing is already imported (a cold start)
+IMPORT_SCRIPT = """
+import importlib, json, time
+start = time.perf_counter()
+importlib.import_module({module!r})
+print(json.dumps(time.perf_counter() - start))
+"""
+
+RENDER_SCRIPT = """
+import json, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+app = AppTest.from_file({path!r}, default_timeout={timeout})
+app.run()
+print(json.dumps({{"seconds": time.perf_counter() - start, "exceptions": [str(e.value) for e in app.exception]}}))
+"""
+
+def _run_python(script):
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def measure_startup(app, timeout=60):
+    """
+    Measures the cold start of a Streamlit app.
+
+    Returns:
+        dict: seconds to import the app module, and seconds until its first render is done
+        (the script run by streamlit's AppTest, without a browser).
+    """
+    module = os.path.splitext(os.path.basename(app))[0]
+    import_seconds = _run_python(IMPORT_SCRIPT.format(module=module))
+    render = _run_python(RENDER_SCRIPT.format(path=app, timeout=timeout))
+
+    for exception in render["exceptions"]:
+        logger.warning(f"{app} raised during its first render: {exception}")
+
+    return {"APP": app, "IMPORT SECONDS": round(import_seconds, 3), "FIRST RENDER SECONDS": round(render["seconds"], 3)}
+
+def record_startup(results, history_path=STARTUP_HISTORY_PATH):
+    """Appends the measures to the startup history, to follow startup time from one change to the next."""
+    os.makedirs(os.path.dirname(history_path) or ".", exist_ok=True)
+    history = pd.DataFrame(results, columns=STARTUP_HISTORY_COLUMNS[1:])
+    history.insert(0, "TIMESTAMP", time.strftime("%Y-%m-%d %H:%M:%S"))
+    history.to_csv(history_path, mode="a", header=not os.path.exists(history_path), index=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and first render time of the Streamlit apps.")
+    parser.add_argument("apps", nargs="*", default=APPS, help="app scripts to measure (default: the three Streamlit apps)")
+    parser.add_argument("--repeat", type=int, default=3, help="cold starts measured per app, the fastest is kept")
+    parser.add_argument("--no-record", action="store_true", help=f"don't append the results to {STARTUP_HISTORY_PATH}")
+    args = parser.parse_args()
+
+    results = []
+    for app in args.apps:
+        runs = [measure_startup(app) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["FIRST RENDER SECONDS"])
+        best["IMPORT SECONDS"] = min(run["IMPORT SECONDS"] for run in runs)
+        results.append(best)
+        logger.info(f"{app}: import {best['IMPORT SECONDS']}s, first render {best['FIRST RENDER SECONDS']}s")
+
+    if not args.no_record:
+        record_startup(results)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
-from sentence_transformers import SentenceTransformer, util
-import torch
+from resources import sentence_transformer
 
 class SemanticSimilarityMatcher:
     def __init__(self, model_name='paraphrase-MiniLM-L6-v2'):
-        self.model = SentenceTransformer(model_name)
+        # sentence_transformers (and torch) are imported here, from the local bundle when present
+        self.model = sentence_transformer(model_name)
 
     def encode_text(self, text):
         return self.model.encode(text, convert_to_tensor=True)
@@ -14,6 +14,7 @@ class SemanticSimilarityMatcher:
         embeddings2 = self.encode_text(text2)
 
         # Calculate cosine similarity
+        from sentence_transformers import util
         similarity_score = util.pytorch_cos_sim(embeddings1, embeddings2)[0][0].item()
         return similarity_score
 
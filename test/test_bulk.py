@@ -0,0 +1,26 @@
+import pandas as pd
+
+from bulk import score_units
+from normalize import normalize_standard
+from planner import CallCounter
+
+STANDARD = normalize_standard(pd.DataFrame([
+    ["Upstream", "G1", "E1", "Water Depth", "depth of water below the surface"],
+    ["Upstream", "G1", "E2", "Flow Rate", "rate of flow of the fluid"],
+    ["Downstream", "G3", "E3", "Tank Level", "level of the product in the tank"],
+], columns=["DATA DOMAIN", "DATA GROUP", "DATA ENTITY", "DATA ELEMENT", "BUSINESS DEFINITION/ GLOSSARY"]))
+
+def test_score_units_counts_the_calls_made():
+    units = [
+        ("WTR_DPTH", "water depth", "Upstream"),
+        # same description and domain, answered by the comparisons of WTR_DPTH
+        ("WATER_DEPTH", "water depth", "Upstream"),
+        ("WTR_DPTH", "water depth", "All"),
+    ]
+    score_fn = CallCounter(lambda field_desc, text: len(text) / 100)
+    scores, report = score_units(units, STANDARD, lambda pairs: [score_fn(*pair) for pair in pairs])
+
+    assert len(scores) == 2 + 2 + 3
+    assert report["comparisons"] == 2 * (2 + 2 + 3)
+    # what run_bulk_job records: one call per distinct (description, text) pair
+    assert score_fn.calls == report["distinct comparisons scored"] == 2 * 3
@@ -0,0 +1,73 @@
+import argparse
+
+import pandas as pd
+
+from cde_cli import cmd_merge, run_units, unit_shard
+from outputs import read_scores, write_scores
+from standard_diff import SCORE_COLUMNS
+
+STANDARD = pd.DataFrame([
+    ["Upstream", "G1", "E1", "Water Depth", "depth of water below the surface"],
+    ["Upstream", "G1", "E2", "Flow Rate", "rate of flow of the fluid"],
+    ["Downstream", "G3", "E3", "Tank Level", "level of the product in the tank"],
+    # the same key twice, both rows are kept by a full run
+    ["Downstream", "G3", "E3", "Tank Level", "tank level"],
+    ["Downstream", "G3", "E4", "Temperature", "temperature of the product"],
+], columns=["DATA DOMAIN", "DATA GROUP", "DATA ENTITY", "DATA ELEMENT", "BUSINESS DEFINITION/ GLOSSARY"])
+
+UNITS = [
+    ("WTR_DPTH", "water depth", "Upstream"),
+    ("FLOW_RT", "flow rate", "Upstream"),
+    ("TANK_LVL", "tank level", "Downstream"),
+    ("TEMP_C", "temperature", "Downstream"),
+    ("PRD_NM", "product name", "Downstream"),
+    ("WELL_NM", "well name", "Upstream"),
+]
+
+def sort_scores(scores):
+    return scores[SCORE_COLUMNS].sort_values(SCORE_COLUMNS).reset_index(drop=True)
+
+def merge(paths, output):
+    cmd_merge(argparse.Namespace(shards=[str(path) for path in paths], output=str(output)))
+    return read_scores(str(output))
+
+def test_unit_shard_is_a_stable_partition():
+    for num_shards in (1, 2, 3, 7):
+        shards = [unit_shard(attribute, domain, num_shards) for attribute, _, domain in UNITS]
+        assert all(1 <= shard <= num_shards for shard in shards)
+        assert shards == [unit_shard(attribute, domain, num_shards) for attribute, _, domain in UNITS]
+
+def test_shards_merge_to_the_full_run(tmp_path):
+    full = run_units(UNITS, STANDARD, "jaccard", workers=1)
+    # three attributes per domain, two Upstream and three Downstream data elements
+    assert len(full) == 3 * 2 + 3 * 3
+
+    paths = []
+    for index in (1, 2):
+        units = [unit for unit in UNITS if unit_shard(unit[0], unit[2], 2) == index]
+        assert units, "both shards should get units"
+        path = tmp_path / f"shard_{index}.csv"
+        write_scores(run_units(units, STANDARD, "jaccard", workers=1), str(path))
+        paths.append(path)
+
+    merged = merge(paths, tmp_path / "merged.parquet")
+    pd.testing.assert_frame_equal(sort_scores(merged), sort_scores(full), check_dtype=False)
+
+    # a re-run shard replaces its units instead of adding them twice, repeated keys included
+    merged = merge(paths + [paths[0]], tmp_path / "merged_rerun.parquet")
+    pd.testing.assert_frame_equal(sort_scores(merged), sort_scores(full), check_dtype=False)
+    assert (merged["DATA ELEMENT"] == "Tank Level").sum() == 2 * 3
+
+def test_summary_mode_spills_each_run_apart(tmp_path):
+    spill_dir = tmp_path / "spill"
+    full = run_units(UNITS, STANDARD, "jaccard", workers=1)
+
+    for _ in range(2):
+        summary = run_units(UNITS, STANDARD, "jaccard", workers=1, mode="summary", top_k=2, spill_dir=str(spill_dir))
+        assert len(summary) == 2 * len(UNITS)
+
+    runs = sorted(spill_dir.iterdir())
+    assert len(runs) == 2
+    for run in runs:
+        spilled = pd.concat([pd.read_csv(path) for path in run.glob("*.csv")], ignore_index=True)
+        pd.testing.assert_frame_equal(sort_scores(spilled), sort_scores(full), check_dtype=False)
@@ -0,0 +1,54 @@
+import random
+import re
+
+import numpy as np
+import pandas as pd
+
+from dictionary_filter import DEFAULT_RULES, TermMatcher, apply_rules
+
+TERMS = ['key', 'description', 'date', 'status', 'code', 'ID', 'System', 'Number', 'Label', 'Caption', 'NaN']
+
+def regex_search(terms, text):
+    # the exclusion of main.py before the rule engine
+    return bool(re.search('|'.join(map(re.escape, terms)), text, flags=re.IGNORECASE))
+
+def test_term_matcher_matches_the_regex():
+    rng = random.Random(0)
+    # overlapping terms and a small alphabet exercise the failure links
+    term_lists = [TERMS, ["he", "she", "his", "hers"], ["a", "ab", "bab", "bc", "bca", "c", "caa"], ["abcd", "bcd", "cd", "x"]]
+    for terms in term_lists:
+        matcher = TermMatcher(terms)
+        alphabet = "".join(sorted(set("".join(terms).lower()))) + "A Z"
+        for _ in range(2000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            assert matcher.search(text) == regex_search(terms, text), (terms, text)
+
+def test_term_matcher_edge_cases():
+    assert not TermMatcher([]).search("anything")
+    assert not TermMatcher([""]).search("anything")
+    assert TermMatcher(["Number"]).search("Serial NUMBER")
+    assert not TermMatcher(["Number"]).search("numb er")
+
+def test_default_rules_match_main_filter():
+    data = pd.DataFrame({
+        "CRITICAL DATA ELEMENT (CDE)": ["Yes", "Yes", "No", "Yes", "Yes", None, "Yes", "Yes"],
+        "FIELD DESCRIPTION": ["water depth", "equipment key", "flow rate", None, "Inspection DATE", "pressure", "tank level", "valid"],
+    }, index=[0, 3, 4, 7, 8, 9, 12, 13])
+
+    kept, report = apply_rules(data, DEFAULT_RULES)
+
+    exclude_pattern = '|'.join(map(re.escape, TERMS))
+    expected = data[data["CRITICAL DATA ELEMENT (CDE)"] == "Yes"]
+    expected = expected[~(expected["FIELD DESCRIPTION"].str.contains(exclude_pattern, case=False, na=False) | expected["FIELD DESCRIPTION"].isna())]
+
+    pd.testing.assert_frame_equal(kept, expected)
+    # "valid" contains "id"
+    assert kept["FIELD DESCRIPTION"].tolist() == ["water depth", "tank level"]
+    assert report == {
+        "rows read": 8,
+        "not a critical data element": 2,
+        "missing field description": 1,
+        "generic field description": 3,
+        "rows kept": 2,
+    }
+    assert np.array_equal(apply_rules(data.iloc[:0], DEFAULT_RULES)[0].columns, data.columns)
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from ingest import DICTIONARY_COLUMNS, ingest_directory
+from normalize import normalized_column
+
+ROWS = [
+    ["WTR_DPTH", "Water depth", "WELL", "Wells", "Yes", "Upstream"],
+    [None, None, None, None, None, None],
+    ["FLOW_RT", "Flow rate", "PIPE", "Pipes", "Yes", "Upstream"],
+    [None, None, None, None, None, None],
+    ["TEMP_C", "Temperature", "TANK", "Tanks", "Yes", "Downstream"],
+]
+
+def descriptions(table):
+    return dict(zip(table["FIELD NAME/DATA ATTRIBUTE(S)"], table[normalized_column("FIELD DESCRIPTION")]))
+
+def test_blank_rows_keep_descriptions_on_their_attribute(tmp_path):
+    source = tmp_path / "dictionaries"
+    source.mkdir()
+    pd.DataFrame(ROWS, columns=DICTIONARY_COLUMNS).to_excel(source / "dictionary.xlsx", index=False)
+
+    output = tmp_path / "combined.parquet"
+    report = ingest_directory(str(source), str(output), workers=1)
+    assert report["rows added"] == 3
+
+    combined = pd.read_parquet(output)
+    assert descriptions(combined) == {"WTR_DPTH": "water depth", "FLOW_RT": "flow rate", "TEMP_C": "temperature"}
+    assert combined[normalized_column("TABLE NAME")].tolist() == ["well", "pipe", "tank"]
+
+def test_existing_table_is_repaired(tmp_path):
+    source = tmp_path / "dictionaries"
+    source.mkdir()
+    pd.DataFrame(ROWS, columns=DICTIONARY_COLUMNS).to_csv(source / "dictionary.csv", index=False)
+
+    output = tmp_path / "combined.parquet"
+    ingest_directory(str(source), str(output), workers=1)
+
+    # normalized text shifted by one row, as written before the normalized columns were built by position
+    combined = pd.read_parquet(output)
+    column = normalized_column("FIELD DESCRIPTION")
+    combined[column] = combined[column].shift(1)
+    combined.to_parquet(output, index=False)
+
+    report = ingest_directory(str(source), str(output), workers=1)
+    assert report["files skipped"] == 1
+    assert report["normalized columns repaired"]
+    repaired = pd.read_parquet(output)
+    assert descriptions(repaired) == {"WTR_DPTH": "water depth", "FLOW_RT": "flow rate", "TEMP_C": "temperature"}
+    assert list(repaired.columns) == list(combined.columns)
+
+    assert not ingest_directory(str(source), str(output), workers=1)["normalized columns repaired"]
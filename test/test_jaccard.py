@@ -1,5 +1,4 @@
 import re
-import nltk
 
 # Function to preprocess and calculate Jaccard similarity
 def jaccard_similarity(str1, str2):
@@ -0,0 +1,193 @@
+import itertools
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import job_queue
+from job_queue import (
+    MAX_QUEUED_JOBS_PER_USER, MAX_RUNNING_JOBS_PER_USER, QuotaExceededException, cancel_job, claim_next_job, get_job,
+    queue_position, submit_job,
+)
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # one second between two submits, so jobs are ordered by when they were queued
+    clock = itertools.count(1000)
+    monkeypatch.setattr(job_queue.time, "time", lambda: float(next(clock)))
+    return str(tmp_path / "jobs.sqlite")
+
+def submit(db_path, user, kind="bulk", comparisons=0):
+    return submit_job(kind, {"comparisons": comparisons, "name": f"{user}-{kind}"}, user=user, db_path=db_path)
+
+def claim_all(db_path):
+    claimed = []
+    while True:
+        row = claim_next_job(db_path)
+        if row is None:
+            return claimed
+        claimed.append(row["id"])
+
+def finish(db_path, job_id, done, seconds):
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("UPDATE jobs SET status = 'done', done = ?, finished = started + ? WHERE id = ?", (done, seconds, job_id))
+
+def test_claim_order_interleaves_users_and_puts_interactive_first(db_path):
+    alice = [submit(db_path, "alice") for _ in range(2)]
+    bob = submit(db_path, "bob")
+    carol = submit(db_path, "carol", kind="compare")
+
+    # the interactive job first, then one job of each user before alice's second one
+    assert claim_all(db_path) == [carol, alice[0], bob, alice[1]]
+    assert get_job(alice[1], db_path)["status"] == "running"
+
+def test_running_jobs_per_user_are_capped(db_path):
+    alice = [submit(db_path, "alice") for _ in range(MAX_RUNNING_JOBS_PER_USER + 1)]
+
+    assert claim_all(db_path) == alice[:MAX_RUNNING_JOBS_PER_USER]
+    assert get_job(alice[-1], db_path)["status"] == "queued"
+
+    # another user's job still starts
+    bob = submit(db_path, "bob")
+    assert claim_next_job(db_path)["id"] == bob
+
+    # and alice's next job starts once one of hers is finished
+    finish(db_path, alice[0], 10, 5)
+    assert claim_next_job(db_path)["id"] == alice[-1]
+
+def test_queue_position_and_wait(db_path):
+    running = submit(db_path, "alice", comparisons=100)
+    assert claim_next_job(db_path)["id"] == running
+    finish(db_path, running, 100, 50)
+
+    first = submit(db_path, "alice", comparisons=40)
+    second = submit(db_path, "alice", comparisons=60)
+    other = submit(db_path, "bob", comparisons=20)
+
+    # bob's job goes before alice's second one; 2 comparisons per second over the finished job
+    assert queue_position(first, db_path) == (0, 0.0)
+    assert queue_position(other, db_path) == (1, 40 / 2)
+    assert queue_position(second, db_path) == (2, (40 + 20) / 2)
+
+    # no longer queued
+    assert claim_next_job(db_path)["id"] == first
+    assert queue_position(first, db_path) is None
+
+def test_queued_jobs_per_user_are_capped(db_path):
+    jobs = [submit(db_path, "alice") for _ in range(MAX_QUEUED_JOBS_PER_USER)]
+    with pytest.raises(QuotaExceededException):
+        submit(db_path, "alice")
+
+    # the quota is per user, and counts only waiting jobs
+    submit(db_path, "bob")
+    cancel_job(jobs[0], db_path)
+    assert get_job(jobs[0], db_path)["status"] == "cancelled"
+    submit(db_path, "alice")
+
+def queued_calls(users_and_priorities):
+    # a pool without threads, its calls are taken one by one with _next_call
+    pool = job_queue.ScoringPool(workers=0)
+    for user, priority, name in users_and_priorities:
+        pool.submit(str, name, user=user, priority=priority)
+    return pool
+
+def call_order(pool):
+    order = []
+    while True:
+        call = pool._next_call()
+        if call is None:
+            return order
+        order.append(call[2][0])
+
+def test_calls_of_two_users_interleave():
+    pool = queued_calls([("alice", "bulk", f"a{i}") for i in range(3)] + [("bob", "bulk", f"b{i}") for i in range(3)])
+    assert call_order(pool) == ["a0", "b0", "a1", "b1", "a2", "b2"]
+
+def test_higher_priority_goes_first():
+    pool = queued_calls([("alice", "bulk", "a0"), ("alice", "bulk", "a1"), ("bob", "interactive", "b0"), ("carol", "interactive", "c0")])
+    assert call_order(pool) == ["b0", "c0", "a0", "a1"]
+
+def test_idle_user_starts_level_with_the_waiting_users():
+    pool = queued_calls([("alice", "bulk", f"a{i}") for i in range(6)])
+    for _ in range(3):
+        pool._next_call()
+    # bob arrives after alice was served 3 times: he gets no credit for being idle
+    pool.submit(str, "b0", user="bob", priority="bulk")
+    pool.submit(str, "b1", user="bob", priority="bulk")
+    assert pool.served["bob"] == pool.served["alice"]
+    assert call_order(pool) == ["a3", "b0", "a4", "b1", "a5"]
+
+def test_calls_ahead_counts_only_other_users():
+    pool = queued_calls(
+        [("alice", "interactive", f"a{i}") for i in range(3)]
+        + [("alice", "bulk", "a3")]
+        + [("bob", "interactive", "b0"), ("bob", "bulk", "b1"), ("bob", "bulk", "b2")]
+    )
+    # a new interactive call of alice waits for bob's one interactive call, not for her own
+    assert pool.calls_ahead("alice", "interactive") == 1
+    # bob's next interactive call waits for about one turn of alice per call he has waiting
+    assert pool.calls_ahead("bob", "interactive") == 2
+    # a bulk call waits for the other users' interactive calls and their bulk turns
+    assert pool.calls_ahead("alice", "bulk") == 1 + 2
+    assert pool.calls_ahead("bob", "bulk") == 3 + 1
+    # a new user waits for one turn of each user
+    assert pool.calls_ahead("carol", "interactive") == 1 + 1
+
+def test_submit_rejects_unknown_priority():
+    with pytest.raises(ValueError):
+        job_queue.ScoringPool(workers=0).submit(str, "x", priority="urgent")
+
+def test_map_runs_every_call_in_order():
+    pool = job_queue.ScoringPool(workers=2)
+    assert pool.map(lambda x: x * x, range(10), user="alice") == [x * x for x in range(10)]
+    assert pool.throughput() is not None
+
+def test_job_map_cancel_drops_the_queued_calls(db_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "POLL_SECONDS", 0)
+    job_id = submit(db_path, "alice")
+    row = claim_next_job(db_path)
+    assert row["id"] == job_id
+
+    pool = job_queue.ScoringPool(workers=1)
+    job = job_queue.Job(row, pool, db_path)
+    release = threading.Event()
+    calls = []
+
+    def score(i):
+        calls.append(i)
+        if i == 0:
+            return "first"
+        # the user cancels while the second comparison is being scored, once the first was saved
+        deadline = time.monotonic() + 5
+        while get_job(job_id, db_path)["done"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        cancel_job(job_id, db_path)
+        release.wait(5)
+        return "late"
+
+    items = [(i,) for i in range(20)]
+    results = job.map(score, items)
+    release.set()
+    time.sleep(0.1)
+
+    assert job.cancelled()
+    assert results[0] == "first"
+    assert results[1:] == [None] * 19
+    # the call being scored finishes in the background, the queued ones were dropped
+    assert calls == [0, 1]
+    assert not any(pool.queues.values())
+    assert get_job(job_id, db_path)["done"] == 1
+
+def test_rate_limiter_spaces_calls():
+    limiter = job_queue.RateLimiter(calls_per_minute=60 * 50)
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.wait()
+    # the first call starts at once, the next five 1/50 second apart
+    assert time.monotonic() - start >= 5 / 50 - 0.005
+
+    start = time.monotonic()
+    for _ in range(100):
+        job_queue.RateLimiter().wait()
+    assert time.monotonic() - start < 0.05
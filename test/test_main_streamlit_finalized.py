@@ -0,0 +1,44 @@
+from unittest import mock
+
+import pytest
+
+# the app imports the OpenAI client, not installed everywhere the other checks run
+pytest.importorskip("openai")
+
+import main_streamlit_finalized as app
+from job_queue import QuotaExceededException
+
+def test_refused_job_is_not_run_in_the_page():
+    compare = mock.Mock()
+    with mock.patch.object(app, "submit_job", side_effect=QuotaExceededException("alice already has 5 jobs waiting")), \
+            mock.patch.object(app, "session_user", return_value="alice"), \
+            mock.patch.object(app.st, "error") as error, \
+            mock.patch.object(app.st, "rerun") as rerun:
+        assert app.start_comparison(True, lambda: {"comparisons": 10}, compare) is False
+
+    compare.assert_not_called()
+    rerun.assert_not_called()
+    assert "5 jobs waiting" in error.call_args[0][0]
+
+def test_queued_job_is_followed_and_not_run_in_the_page():
+    compare = mock.Mock()
+    with mock.patch.object(app, "submit_job", return_value="job-1") as submit, \
+            mock.patch.object(app, "session_user", return_value="alice"), \
+            mock.patch.object(app, "set_job_param") as set_job_param, \
+            mock.patch.object(app.st, "rerun") as rerun:
+        assert app.start_comparison(True, lambda: {"comparisons": 10}, compare) is True
+
+    compare.assert_not_called()
+    submit.assert_called_once_with("compare", {"comparisons": 10}, user="alice")
+    set_job_param.assert_called_once_with("job-1")
+    rerun.assert_called_once()
+
+def test_foreground_comparison_runs_in_the_page():
+    compare = mock.Mock()
+    job_params = mock.Mock()
+    with mock.patch.object(app, "submit_job") as submit:
+        assert app.start_comparison(False, job_params, compare) is True
+
+    compare.assert_called_once()
+    job_params.assert_not_called()
+    submit.assert_not_called()
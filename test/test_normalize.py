@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from normalize import LETTERS_COLUMN, normalize_dictionary, normalize_standard, normalized_column
+
+DICTIONARY = pd.DataFrame({
+    "FIELD NAME/DATA ATTRIBUTE(S)": ["WTR_DPTH", "FLOW_RT", np.nan, "TEMP_C"],
+    "FIELD DESCRIPTION": ["System generated field: Water depth (m)", "Flow rate, m3/h", "Pressure", None],
+    "TABLE NAME": ["WELL", "PIPE-01", "VESSEL", "TANK"],
+    "TABLE DESCRIPTION/SUB FOLDER NAME ": ["Wells", "Pipes", np.nan, "Tanks"],
+})
+
+def preprocess_reference(data):
+    # preprocess_data of main.py before the columns were normalized with Arrow
+    expected = {}
+    for column in DICTIONARY.columns:
+        values = data[column]
+        if column == "FIELD DESCRIPTION":
+            values = values.str.replace(r'System generated field:', '', case=False, regex=True)
+        expected[column] = values.str.lower().str.replace(r'[^a-zA-Z\s]', ' ', regex=True)
+    return expected
+
+def check_dictionary(table):
+    normalized = normalize_dictionary(table.copy())
+    for column, expected in preprocess_reference(table).items():
+        pd.testing.assert_series_equal(normalized[normalized_column(column)], expected.astype(object), check_names=False)
+
+def test_matches_preprocess_data():
+    check_dictionary(DICTIONARY)
+
+def test_keeps_rows_of_a_gapped_index():
+    # e.g. a filtered table, or a sheet after its blank rows were dropped
+    check_dictionary(DICTIONARY.iloc[[0, 2]])
+    check_dictionary(DICTIONARY.set_axis([5, 6, 7, 8]))
+    check_dictionary(DICTIONARY.set_axis(["a", "b", "c", "d"]).iloc[::-1])
+
+def test_letters_of_a_gapped_index():
+    standard = pd.DataFrame({
+        "DATA ELEMENT": ["Water Depth", "Flow-Rate", None],
+        "BUSINESS DEFINITION/ GLOSSARY": ["depth of water", "rate of flow", "pressure"],
+    }, index=[3, 1, 7])
+    normalized = normalize_standard(standard)
+    assert normalized[LETTERS_COLUMN].tolist() == ["waterdepth", "flowrate", ""]
+    assert normalized[normalized_column("DATA ELEMENT")].loc[1] == "flow rate"
+    assert normalized[normalized_column("BUSINESS DEFINITION/ GLOSSARY")].loc[7] == "pressure"
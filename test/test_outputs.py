@@ -0,0 +1,50 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from outputs import read_scores, summarize, top_matches_of, write_scores
+from standard_diff import SCORE_COLUMNS
+
+SCORES = pd.DataFrame([
+    ["Upstream", "G1", "E1", "Water Depth", "WTR_DPTH", 0.9, 0.7, 0.8],
+    ["Upstream", "G1", "E2", "Flow Rate", "WTR_DPTH", 0.2, 0.4, 0.3],
+    ["Downstream", "G3", "E3", "Tank Level", "WTR_DPTH", 0.5, 0.5, 0.5],
+    ["Upstream", "G1", "E1", "Water Depth", "FLOW_RT", 0.1, 0.3, 0.2],
+    ["Upstream", "G1", "E2", "Flow Rate", "FLOW_RT", 1.0, 0.8, 0.9],
+], columns=SCORE_COLUMNS)
+
+@pytest.mark.parametrize("file_name", ["scores.parquet", "scores.csv.gz", "scores.csv", "scores.sqlite", "scores.db"])
+def test_scores_round_trip(tmp_path, file_name):
+    path = str(tmp_path / "out" / file_name)
+    write_scores(SCORES, path, top_matches=2)
+    pd.testing.assert_frame_equal(read_scores(path), SCORES, check_dtype=False)
+
+def test_sqlite_summary_table(tmp_path):
+    path = str(tmp_path / "scores.sqlite")
+    write_scores(SCORES, path, top_matches=2)
+    # written twice, the tables are replaced rather than appended to
+    write_scores(SCORES, path, top_matches=2)
+
+    assert len(read_scores(path)) == len(SCORES)
+    with sqlite3.connect(path) as connection:
+        summary = pd.read_sql("SELECT * FROM summary", connection)
+    pd.testing.assert_frame_equal(summary, summarize(SCORES, 2), check_dtype=False)
+    assert summary[["DATA ATTRIBUTE", "Data Element 1", "Score 1"]].values.tolist() == [
+        ["WTR_DPTH", "Water Depth", 0.8],
+        ["FLOW_RT", "Flow Rate", 0.9],
+    ]
+
+def test_workbook(tmp_path):
+    path = str(tmp_path / "scores.xlsx")
+    write_scores(SCORES, path, top_matches=2)
+
+    sheets = pd.read_excel(path, sheet_name=None)
+    assert list(sheets) == ["summary", "top_matches"]
+    pd.testing.assert_frame_equal(sheets["summary"], summarize(SCORES, 2), check_dtype=False)
+    pd.testing.assert_frame_equal(sheets["top_matches"], top_matches_of(SCORES, 2), check_dtype=False)
+    assert sheets["top_matches"]["DATA ELEMENT"].tolist() == ["Flow Rate", "Water Depth", "Water Depth", "Tank Level"]
+
+    # the workbook only holds the top matches, it cannot be read back as scores
+    with pytest.raises(ValueError):
+        read_scores(path)
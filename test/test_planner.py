@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from planner import CallCounter, count_comparisons, load_history, record_run
+
+STANDARD = pd.DataFrame({"DATA DOMAIN": ["Upstream", "Upstream ", "Downstream"]})
+
+def test_count_comparisons():
+    units = [
+        ("WTR_DPTH", "water depth", "Upstream"),
+        ("WATER_DEPTH", "water depth", "Upstream"),
+        ("WTR_DPTH", "water depth", "All"),
+        ("TANK_LVL", "tank level", "Downstream"),
+    ]
+    counts = count_comparisons(units, STANDARD)
+    assert counts == {
+        "attributes": 4,
+        "unique descriptions": 3,
+        "comparisons": 2 * (2 + 2 + 3 + 1),
+        "comparisons of repeated descriptions": 2 * 2,
+    }
+
+    counts = count_comparisons(units, STANDARD, prefilter_top=1, pairs_per_element=1)
+    assert counts["comparisons"] == 4
+    assert counts["comparisons of repeated descriptions"] == 1
+
+def test_call_counter():
+    counter = CallCounter(lambda a, b: a + b)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(counter, range(100), range(100)))
+
+    assert results == [2 * i for i in range(100)]
+    assert counter.calls == 100
+
+def test_record_run(tmp_path):
+    history_path = str(tmp_path / "run_history.csv")
+    record_run("jaccard", 2, 40, 1.5, history_path)
+    # runs that made no scorer call (e.g. answered from the cache) are not recorded
+    record_run("jaccard", 2, 0, 1.5, history_path)
+
+    runs = load_history("jaccard", history_path)
+    assert runs[["WORKERS", "COMPARISONS", "SECONDS"]].values.tolist() == [[2, 40, 1.5]]
@@ -1,15 +1,14 @@
-import spacy
-
-# load the spaCy model
-nlp = spacy.load("en_core_web_lg")
+from resources import spacy_model
 
 def semantic_similarity(text1, text2):
+    # the spaCy model is loaded on the first comparison, from the local bundle when present
+    nlp = spacy_model("en_core_web_lg")
     doc1 = nlp(text1)
     doc2 = nlp(text2)
     return doc1.similarity(doc2)
 
-text1 = "irritation"
-text2 = "irritating"
-similarity = semantic_similarity(text1, text2)
-print(similarity)
-
+if __name__ == "__main__":
+    text1 = "irritation"
+    text2 = "irritating"
+    similarity = semantic_similarity(text1, text2)
+    print(similarity)
@@ -0,0 +1,86 @@
+import pandas as pd
+
+from standard_diff import SCORE_COLUMNS, diff_standards, rescore_incremental
+
+def standard(rows):
+    return pd.DataFrame(rows, columns=["DATA DOMAIN", "DATA GROUP", "DATA ENTITY", "DATA ELEMENT", "BUSINESS DEFINITION/ GLOSSARY"])
+
+OLD = standard([
+    ["Upstream", "G1", "E1", "Water Depth", "depth of water"],
+    ["Upstream", "G1", "E1", "Well Name", "name of the well"],
+    ["Upstream", "G1", "E2", "Flow Rate", "rate of flow"],
+    ["Upstream", "G1", "E2", "Flow Rate", "second flow rate"],
+])
+NEW = standard([
+    ["Upstream", "G1", "E1", "Water Depth", "Depth of  water "],
+    ["Upstream", "G1", "E1", "Well Name", "official name of the well"],
+    ["Upstream", "G1", "E2", "Flow Rate", "rate of flow"],
+    ["Upstream", "G1", "E2", "Flow Rate", "second flow rate"],
+    ["Upstream", "G1", "E3", "Temperature", "temperature of the fluid"],
+])
+ATTRIBUTES = pd.DataFrame({"DATA ATTRIBUTE": ["WTR_DPTH", "TEMP_C"], "FIELD DESCRIPTION": ["water depth", "temperature"]})
+
+def score(field_desc, text):
+    # deterministic stand-in for the model: length of the common prefix over the text length
+    common = 0
+    for a, b in zip(field_desc.lower(), text.lower()):
+        if a != b:
+            break
+        common += 1
+    return common / max(len(text), 1)
+
+def full_scores(standard, attributes):
+    frames = []
+    for attribute, field_desc in zip(attributes["DATA ATTRIBUTE"], attributes["FIELD DESCRIPTION"]):
+        frame = standard[["DATA DOMAIN", "DATA GROUP", "DATA ENTITY", "DATA ELEMENT"]].copy()
+        frame["DATA ATTRIBUTE"] = attribute
+        frame["ELEMENT SCORE"] = [round(score(field_desc, text), 4) for text in standard["DATA ELEMENT"]]
+        frame["GLOSSARY SCORE"] = [round(score(field_desc, text), 4) for text in standard["BUSINESS DEFINITION/ GLOSSARY"]]
+        frames.append(frame)
+    scores = pd.concat(frames, ignore_index=True)
+    scores["COMBINED SCORE"] = round((scores["ELEMENT SCORE"] + scores["GLOSSARY SCORE"]) / 2, 4)
+    return scores[SCORE_COLUMNS]
+
+def test_diff_standards():
+    diff = diff_standards(OLD, NEW)
+    changes = dict(zip(zip(diff["DATA ELEMENT"], diff.groupby(["DATA ELEMENT"]).cumcount()), diff["CHANGE"]))
+    # case and whitespace of a glossary are not a change, repeated keys are matched one to one
+    assert changes == {
+        ("Water Depth", 0): "unchanged",
+        ("Well Name", 0): "changed",
+        ("Flow Rate", 0): "unchanged",
+        ("Flow Rate", 1): "unchanged",
+        ("Temperature", 0): "added",
+    }
+
+def test_rescore_incremental_matches_full_run():
+    # only WTR_DPTH was scored on the old release
+    previous = full_scores(OLD, ATTRIBUTES.iloc[:1])
+    calls = []
+
+    def counting_score(field_desc, text):
+        calls.append((field_desc, text))
+        return score(field_desc, text)
+
+    scores, report = rescore_incremental(ATTRIBUTES, NEW, OLD, previous, counting_score)
+
+    expected = full_scores(NEW, ATTRIBUTES)
+    pd.testing.assert_frame_equal(scores.reset_index(drop=True), expected, check_dtype=False)
+
+    # WTR_DPTH: the new element twice and one changed glossary; TEMP_C: every element twice
+    assert len(calls) == 2 + 1 + 2 * len(NEW)
+    assert report["comparisons scored"] == len(calls)
+    assert report["comparisons total"] == 2 * 2 * len(NEW)
+    assert report["comparisons reused"] == report["comparisons total"] - len(calls)
+    assert report["data elements added"] == 1
+    assert report["glossaries changed"] == 1
+    assert report["data elements removed"] == 0
+
+def test_rescore_incremental_drops_removed_elements():
+    previous = full_scores(NEW, ATTRIBUTES)
+    scores, report = rescore_incremental(ATTRIBUTES, OLD, NEW, previous, score)
+
+    assert report["data elements removed"] == 1
+    assert report["comparisons scored"] == 2
+    assert "Temperature" not in set(scores["DATA ELEMENT"])
+    pd.testing.assert_frame_equal(scores.reset_index(drop=True), full_scores(OLD, ATTRIBUTES), check_dtype=False)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from standard_store import CATEGORY_COLUMNS, TEXT_COLUMNS, build_store, open_store
+
+COLUMNS = CATEGORY_COLUMNS + TEXT_COLUMNS
+
+STANDARD = pd.DataFrame([
+    ["Upstream", "G1", "E1", "Water Depth", "depth of water below the surface"],
+    ["Downstream", "G3", "E3", "Tank Level", None],
+    # the same domain with a trailing space, read with the stripped name
+    ["Upstream ", "G2", "E2", "Débit", "débit du fluide – m³/h"],
+    [None, "G3", "E4", None, ""],
+    ["Downstream", "G3", "E3", "Tank Level", "level of the product in the tank"],
+], columns=COLUMNS, index=[10, 3, 7, 0, 5])
+
+def read_back(store, domain="All"):
+    return pd.DataFrame(list(store.rows(domain)), columns=COLUMNS)
+
+def test_round_trip(tmp_path):
+    embeddings = np.arange(10, dtype=np.float32).reshape(5, 2)
+    store = open_store(build_store(STANDARD, str(tmp_path / "store"), {"embeddings": embeddings}))
+
+    assert len(store) == len(STANDARD)
+    # rows come back in the order of the DataFrame, not of its index; a missing category or
+    # data element as an empty string, a missing glossary as NaN
+    rows = list(store.rows())
+    assert all(len(row) == len(COLUMNS) for row in rows)
+    assert pd.isna(rows[1][-1])
+    assert all(type(value) is str for row in rows for value in row if not pd.isna(value))
+    pd.testing.assert_frame_equal(read_back(store), pd.DataFrame([
+        ["Upstream", "G1", "E1", "Water Depth", "depth of water below the surface"],
+        ["Downstream", "G3", "E3", "Tank Level", float("nan")],
+        ["Upstream ", "G2", "E2", "Débit", "débit du fluide – m³/h"],
+        ["", "G3", "E4", "", ""],
+        ["Downstream", "G3", "E3", "Tank Level", "level of the product in the tank"],
+    ], columns=COLUMNS))
+
+    assert store.features["embeddings"].dtype == np.float32
+    assert np.array_equal(store.features["embeddings"], embeddings)
+
+def test_domain_rows(tmp_path):
+    store = open_store(build_store(STANDARD, str(tmp_path / "store")))
+
+    assert store.domain_rows("Upstream").tolist() == [0, 2]
+    assert store.domain_rows("Downstream").tolist() == [1, 4]
+    assert store.domain_rows("").tolist() == [3]
+    assert store.domain_rows("Midstream").tolist() == []
+    assert store.domain_rows("All").tolist() == [0, 1, 2, 3, 4]
+    assert read_back(store, "Upstream")["DATA ELEMENT"].tolist() == ["Water Depth", "Débit"]
+
+def test_feature_rows_must_match(tmp_path):
+    with pytest.raises(ValueError):
+        build_store(STANDARD, str(tmp_path / "store"), {"embeddings": np.zeros((4, 2))})
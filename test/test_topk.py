@@ -0,0 +1,35 @@
+import random
+
+import pandas as pd
+
+from topk import TopKAccumulator
+
+def test_matches_nlargest_per_key():
+    rng = random.Random(0)
+    # few distinct scores, so ties are common
+    rows = [(rng.choice("abcd"), rng.choice([0.1, 0.25, 0.5, 0.75, 0.9]), position) for position in range(500)]
+
+    for k in (1, 3, 10):
+        top = TopKAccumulator(k)
+        for key, score, position in rows:
+            top.push(key, score, position)
+
+        frame = pd.DataFrame(rows, columns=["key", "score", "position"])
+        for key, group in frame.groupby("key"):
+            expected = group.nlargest(k, "score", keep="first")
+            assert top.items(key) == list(zip(expected["score"], expected["position"]))
+
+        assert sorted(top.keys()) == sorted(frame["key"].unique())
+        assert top.pushed == len(rows)
+
+def test_push_reports_whether_kept():
+    top = TopKAccumulator(2)
+    assert top.push("a", 0.5, "first")
+    assert top.push("a", 0.5, "second")
+    # an equal score comes after the items already kept
+    assert not top.push("a", 0.5, "third")
+    assert top.push("a", 0.6, "fourth")
+    assert not top.push("a", 0.1, "fifth")
+    assert top.items("a") == [(0.6, "fourth"), (0.5, "first")]
+    assert top.items("missing") == []
+    assert len(top) == 1
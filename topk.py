@@ -0,0 +1,48 @@
+import heapq
+import itertools
+from collections import defaultdict
+
+class TopKAccumulator:
+    """
+    Keeps the k highest scored items per key as scores stream in.
+
+    Each key holds a bounded min-heap, so memory is O(keys x k) however many scores are pushed.
+    On equal scores the item pushed first is kept, like pandas nlargest.
+
+    Example usage:
+        top = TopKAccumulator(3)
+        top.push("pump speed", 0.91, row)
+        top.items("pump speed")
+    """
+    def __init__(self, k=3):
+        self.k = k
+        self.heaps = defaultdict(list)
+        self.pushed = 0
+        self._order = itertools.count()
+
+    def push(self, key, score, item):
+        """Offers an item; returns True when it is among the current top k of its key."""
+        self.pushed += 1
+        entry = (score, -next(self._order), item)
+        heap = self.heaps[key]
+
+        if len(heap) < self.k:
+            heapq.heappush(heap, entry)
+            return True
+
+        if entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+            return True
+
+        return False
+
+    def items(self, key):
+        """Returns the (score, item) pairs of a key, highest score first."""
+        entries = sorted(self.heaps.get(key, []), key=lambda entry: entry[:2], reverse=True)
+        return [(score, item) for score, _, item in entries]
+
+    def keys(self):
+        return list(self.heaps.keys())
+
+    def __len__(self):
+        return len(self.heaps)